@@ -0,0 +1,145 @@
+"""
+Microbenchmark: response rendering for the feed and learning sections.
+
+Serializes in-memory LearningSection and Post objects once with
+LearningSectionSerializer and PostListSerializer, then compares render
+time and payload size of DRF's JSONRenderer, ORJSONRenderer and (when
+msgpack is installed) MessagePackRenderer. No database is needed.
+
+Run from the backend directory:
+    python -m benchmarks.renderers
+"""
+import os
+import random
+import timeit
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from config.renderers import MessagePackRenderer, ORJSONRenderer, msgpack  # noqa: E402
+from learning.models import LearningSection, LearningTopic  # noqa: E402
+from learning.serializers import LearningSectionSerializer  # noqa: E402
+from posts.models import Post  # noqa: E402
+from posts.serializers import PostListSerializer  # noqa: E402
+from profiles.models import Profile  # noqa: E402
+
+User = get_user_model()
+
+SECTIONS = 8
+TOPICS_PER_SECTION = 12
+POSTS = 500
+REPEAT = 50
+
+WORDS = (
+    'serve spin topspin backhand forehand loop block chop footwork rally '
+    'receive rubber blade smash flick push timing stance drill match'
+).split()
+
+
+def text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def prefetched(model, objects):
+    """A queryset that answers from memory, like a prefetch_related cache."""
+    queryset = model.objects.all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    return queryset
+
+
+def make_sections(rng):
+    sections = []
+    topic_id = 0
+    for index in range(SECTIONS):
+        section = LearningSection(
+            id=index + 1,
+            section_id=f'section-{index}',
+            title=text(rng, 3).title(),
+            description=text(rng, 25),
+            icon='🏓',
+            priority=index,
+            created_at=timezone.now(),
+        )
+        topics = []
+        for _ in range(TOPICS_PER_SECTION):
+            topic_id += 1
+            topic = LearningTopic(
+                id=topic_id,
+                section=section,
+                topic_id=f'topic-{topic_id}',
+                title=text(rng, 4).title(),
+                description=text(rng, 30),
+                ctas={'practice': True, 'community': rng.random() < 0.5, 'struggles': False},
+            )
+            topic._prefetched_objects_cache = {'related_topics': prefetched(LearningTopic, [])}
+            topics.append(topic)
+        section._prefetched_objects_cache = {'topics': prefetched(LearningTopic, topics)}
+        sections.append(section)
+    return sections
+
+
+def make_posts(rng):
+    now = timezone.now()
+    authors = []
+    for index in range(50):
+        user = User(id=index + 1, username=f'player{index}')
+        user.profile = Profile(
+            user=user,
+            display_name=f'Player {index}',
+            avatar=f'avatars/player{index}.png',
+            playing_level='Intermediate',
+        )
+        authors.append(user)
+    posts = []
+    for index in range(POSTS):
+        created_at = now - timedelta(seconds=rng.randint(0, 30 * 86400))
+        posts.append(Post(
+            id=index + 1,
+            author=rng.choice(authors),
+            content=text(rng, rng.randint(10, 80)),
+            post_type=rng.choice(['achievement', 'struggle', 'tip']),
+            related_skill=rng.choice(['serve', 'forehand', 'backhand', None]),
+            comment_count=rng.randint(0, 40),
+            created_at=created_at,
+            updated_at=created_at,
+        ))
+    return posts
+
+
+def best_of(func):
+    return min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+
+def main():
+    rng = random.Random(42)
+    payloads = (
+        ('LearningSectionSerializer', LearningSectionSerializer(make_sections(rng), many=True).data),
+        ('PostListSerializer', {'next': None, 'results': PostListSerializer(make_posts(rng), many=True).data}),
+    )
+    renderers = [('JSONRenderer', JSONRenderer()), ('ORJSONRenderer', ORJSONRenderer())]
+    if msgpack is not None:
+        renderers.append(('MessagePackRenderer', MessagePackRenderer()))
+
+    print(f'best of {REPEAT}:')
+    for label, data in payloads:
+        print(f'  {label}:')
+        baseline = None
+        for name, renderer in renderers:
+            elapsed = best_of(lambda: renderer.render(data))
+            size = len(renderer.render(data))
+            baseline = baseline or elapsed
+            print(
+                f'    {name:20} {elapsed * 1000:7.2f} ms  {size:8d} bytes  '
+                f'{baseline / elapsed:5.2f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Microbenchmark: relative timestamp formatting on a 1,000-row list.
+
+Compares the per-row SerializerMethodField the serializers used to carry
+(function-local import plus timezone.now() per row) with the shared
+RelativeTimestampField. No database is needed.
+
+Run from the backend directory:
+    python -m benchmarks.timestamp_formatting
+"""
+import os
+import random
+import timeit
+from datetime import timedelta
+from types import SimpleNamespace
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework import serializers  # noqa: E402
+from config.serializer_fields import RelativeTimestampField  # noqa: E402
+
+ROWS = 1000
+REPEAT = 50
+
+
+class LegacyTimestampSerializer(serializers.Serializer):
+    formatted_timestamp = serializers.SerializerMethodField()
+
+    def get_formatted_timestamp(self, obj):
+        from django.utils import timezone
+        now = timezone.now()
+        diff = now - obj.created_at
+
+        seconds = diff.total_seconds()
+        if seconds < 60:
+            return 'just now'
+        elif seconds < 3600:
+            minutes = int(seconds / 60)
+            return f'{minutes} {"minute" if minutes == 1 else "minutes"} ago'
+        elif seconds < 86400:
+            hours = int(seconds / 3600)
+            return f'{hours} {"hour" if hours == 1 else "hours"} ago'
+        elif seconds < 604800:
+            days = int(seconds / 86400)
+            return f'{days} {"day" if days == 1 else "days"} ago'
+        else:
+            return obj.created_at.strftime('%B %d, %Y')
+
+
+class SharedTimestampSerializer(serializers.Serializer):
+    formatted_timestamp = RelativeTimestampField()
+
+
+def make_rows():
+    """Feed-like spread: most rows recent, a long tail of older ones."""
+    rng = random.Random(42)
+    now = timezone.now()
+    return [
+        SimpleNamespace(created_at=now - timedelta(seconds=int(rng.expovariate(1 / 200000))))
+        for _ in range(ROWS)
+    ]
+
+
+def best_of(func):
+    return min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+
+def main():
+    rows = make_rows()
+
+    # Formatting cost alone: the method body vs the field's to_representation
+    legacy_serializer = LegacyTimestampSerializer(rows, many=True)
+    legacy_method = legacy_serializer.child.get_formatted_timestamp
+    shared_serializer = SharedTimestampSerializer(rows, many=True)
+    shared_field = shared_serializer.child.fields['formatted_timestamp']
+
+    def format_legacy():
+        for row in rows:
+            legacy_method(row)
+
+    def format_shared():
+        # A fresh context per pass, like a new request
+        shared_serializer._context = {}
+        for row in rows:
+            shared_field.to_representation(row.created_at)
+
+    # End to end through the list serializer
+    def serialize_legacy():
+        LegacyTimestampSerializer(rows, many=True).data
+
+    def serialize_shared():
+        SharedTimestampSerializer(rows, many=True).data
+
+    print(f'{ROWS} rows, best of {REPEAT}:')
+    for label, legacy, shared in (
+        ('formatting only', best_of(format_legacy), best_of(format_shared)),
+        ('full serializer', best_of(serialize_legacy), best_of(serialize_shared)),
+    ):
+        print(f'  {label}:')
+        print(f'    legacy method field: {legacy * 1000:7.2f} ms  ({legacy / ROWS * 1e6:5.2f} us/row)')
+        print(f'    shared field:        {shared * 1000:7.2f} ms  ({shared / ROWS * 1e6:5.2f} us/row)')
+        print(f'    speedup:             {legacy / shared:7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Local background worker pool for request side effects.
+
+Work that does not need to finish before the response (notifications,
+activity rows, timeline fan-out) is handed to a small pool of daemon
+threads in the same process. ``submit_on_commit`` only enqueues once the
+surrounding transaction commits, so workers never see rows that could
+still roll back, and a failed request never sends notifications.
+
+The queue is bounded: when it is full the task runs inline instead of
+being dropped, trading latency for correctness under overload. Failed
+tasks are retried with exponential backoff. With BACKGROUND_TASKS_EAGER
+tasks run inline immediately.
+
+At process exit the queue is drained first and the hooks registered with
+``on_shutdown`` run afterwards, so work that tasks hand on (e.g. buffered
+activity rows) is flushed after the last task has finished.
+"""
+import atexit
+import functools
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQueue:
+    """
+    Bounded task queue served by a fixed number of worker threads.
+
+    Workers start lazily on the first submit, so forked server processes
+    each get their own pool.
+    """
+
+    def __init__(self, workers=2, max_size=1000, max_retries=3, retry_delay=0.5):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.tasks = queue.Queue(maxsize=max_size)
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue ``func(*args, **kwargs)``. Returns False if the queue was full
+        and the task ran inline instead.
+        """
+        self.start()
+        try:
+            self.tasks.put_nowait((func, args, kwargs, time.monotonic()))
+        except queue.Full:
+            metrics.increment('background.overflow')
+            self.run(func, args, kwargs)
+            return False
+        metrics.increment('background.submitted')
+        return True
+
+    def start(self):
+        if self.threads:
+            return
+        with self.lock:
+            if self.threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self.work, name=f'background-{index}', daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    def work(self):
+        while True:
+            func, args, kwargs, queued_at = self.tasks.get()
+            try:
+                metrics.observe('background.queue_wait', time.monotonic() - queued_at)
+                close_old_connections()
+                self.run(func, args, kwargs)
+            finally:
+                close_old_connections()
+                self.tasks.task_done()
+
+    def run(self, func, args, kwargs):
+        """Run one task, retrying failures with exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                if attempt == self.max_retries:
+                    metrics.increment('background.failed')
+                    logger.exception('Background task %s failed', getattr(func, '__name__', func))
+                    return
+                metrics.increment('background.retried')
+                time.sleep(self.retry_delay * 2 ** attempt)
+            else:
+                metrics.increment('background.completed')
+                return
+
+    def join(self, timeout=None):
+        """
+        Wait until every queued task is done (or ``timeout`` seconds pass).
+        Returns True if the queue drained.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.tasks.all_tasks_done:
+            while self.tasks.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.tasks.all_tasks_done.wait(remaining)
+        return True
+
+
+_queue = None
+_queue_lock = threading.Lock()
+_shutdown_hooks = []
+
+
+def get_queue():
+    """Return this process's BackgroundQueue, created from settings."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = BackgroundQueue(
+                    workers=settings.BACKGROUND_WORKERS,
+                    max_size=settings.BACKGROUND_QUEUE_SIZE,
+                    max_retries=settings.BACKGROUND_MAX_RETRIES,
+                    retry_delay=settings.BACKGROUND_RETRY_DELAY,
+                )
+    return _queue
+
+
+def on_shutdown(func, *args):
+    """Call ``func(*args)`` at exit, once the queue has drained."""
+    _shutdown_hooks.append((func, args))
+
+
+def shutdown():
+    """Drain the queue (up to BACKGROUND_SHUTDOWN_TIMEOUT), then run the hooks."""
+    if _queue is not None:
+        _queue.join(settings.BACKGROUND_SHUTDOWN_TIMEOUT)
+    for func, args in _shutdown_hooks:
+        try:
+            func(*args)
+        except Exception:
+            logger.exception('Shutdown hook %s failed', getattr(func, '__name__', func))
+
+
+atexit.register(shutdown)
+
+
+def submit(func, *args, **kwargs):
+    """Run ``func`` in the background (inline in eager mode)."""
+    if settings.BACKGROUND_TASKS_EAGER:
+        func(*args, **kwargs)
+        return
+    get_queue().submit(func, *args, **kwargs)
+
+
+def submit_on_commit(func, *args, using=None, **kwargs):
+    """
+    Run ``func`` in the background once the current transaction commits
+    (inline and immediately in eager mode).
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        func(*args, **kwargs)
+        return
+    transaction.on_commit(functools.partial(submit, func, *args, **kwargs), using=using)
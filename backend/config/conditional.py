@@ -0,0 +1,50 @@
+"""
+Helpers for conditional GET on DRF views.
+
+Views compute their validators from something cheap (a version counter or
+a small aggregate query), call `not_modified_response` before doing any
+real work, and stamp the validators on the full response otherwise.
+"""
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """
+    Build a quoted strong ETag from the given parts. Include the
+    negotiated media type: JSON and msgpack bodies need different tags.
+    """
+    return quote_etag('-'.join(str(part) for part in parts))
+
+
+def not_modified_response(request, etag=None, last_modified=None):
+    """
+    Return a 304 response if the request's If-None-Match/If-Modified-Since
+    headers match the validators, otherwise None.
+    
+    Args:
+        request: DRF request
+        etag: Quoted ETag for the current representation
+        last_modified: Aware datetime of the last change, if known
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    if get_conditional_response(request, etag=etag, last_modified=timestamp) is None:
+        return None
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    return set_validators(response, etag, last_modified)
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """
+    Stamp ETag/Last-Modified on a response and ask clients to revalidate.
+    Responses are content negotiated, so caches must also key on Accept.
+    """
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ('Accept',))
+    return response
@@ -0,0 +1,100 @@
+"""
+Opt-in fast path for hot read-only list endpoints.
+
+A ValuesSerializer mirrors the JSON of a regular ModelSerializer but reads
+plain dicts from ``QuerySet.values()`` (only the needed columns, joined
+fields included) and builds each output dict with one hand-written
+``build_row`` instead of DRF's per-field dispatch, nested serializer
+instances and SerializerMethodField lookups. Output must stay byte-for-byte
+identical to the serializer it mirrors; each one has a parity test.
+"""
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.response import Response
+from .serializer_fields import format_relative_timestamp, get_serialization_now
+
+
+class ValuesSerializer:
+    """
+    Base class for .values() fast-path serializers.
+
+    Subclasses list the columns to select in ``columns`` and implement
+    ``build_row``. ``prepare`` may run batch lookups for a whole page
+    before rows are built.
+    """
+    columns = ()
+
+    def __init__(self, context=None):
+        self.context = context if context is not None else {}
+        self.request = self.context.get('request')
+        self.now = get_serialization_now(self.context)
+        self._datetime_field = serializers.DateTimeField()
+        self._file_urls = {}
+
+    def get_queryset(self, queryset):
+        """Narrow a model queryset to the columns this serializer reads."""
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    def serialize(self, rows):
+        """Return the representation of every row."""
+        rows = list(rows)
+        self.prepare(rows)
+        build_row = self.build_row
+        return [build_row(row) for row in rows]
+
+    def prepare(self, rows):
+        """Hook for per-page batch lookups."""
+
+    def build_row(self, row):
+        raise NotImplementedError('Subclasses must implement build_row()')
+
+    def datetime(self, value):
+        """Format a datetime exactly like DRF's DateTimeField."""
+        if value is None:
+            return None
+        return self._datetime_field.to_representation(value)
+
+    def timestamp(self, value):
+        """Format a relative timestamp like RelativeTimestampField."""
+        return format_relative_timestamp(value, self.now)
+
+    def file_url(self, name, storage):
+        """
+        Return the URL of a stored file like DRF's FileField/ImageField:
+        None when empty, absolute when the context carries a request.
+        """
+        if not name:
+            return None
+        url = self._file_urls.get(name)
+        if url is None:
+            url = storage.url(name)
+            if self.request is not None:
+                url = self.request.build_absolute_uri(url)
+            self._file_urls[name] = url
+        return url
+
+
+class FastListMixin:
+    """
+    ViewSet mixin that serves ``list`` through ``fast_serializer_class``.
+
+    Filtering and pagination run as usual on the narrowed .values()
+    queryset. Views opt in by setting ``fast_serializer_class``; the
+    FAST_LIST_SERIALIZERS setting switches every fast path off at once.
+    """
+    fast_serializer_class = None
+
+    def use_fast_list(self):
+        return self.fast_serializer_class is not None and settings.FAST_LIST_SERIALIZERS
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list():
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.fast_serializer_class(context=self.get_serializer_context())
+        rows = serializer.get_queryset(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(rows))
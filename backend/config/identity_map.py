@@ -0,0 +1,45 @@
+"""
+Request-scoped identity map for nested serializers.
+
+Feed pages, comment threads and inboxes embed the same few users over
+and over. IdentityMapMixin serializes each distinct object once per
+serialization pass and hands the same representation to every later row
+that embeds it, avatar URL included. The map lives in the serializer
+context, so it is shared by every serializer of one response and dropped
+with it.
+
+Hits and misses are counted under ``serializers.identity_map`` in
+config.metrics; the hit ratio reported there is the dedup ratio.
+"""
+from . import metrics
+
+IDENTITY_MAP_CONTEXT_KEY = 'identity_map'
+
+
+class IdentityMapMixin:
+    """
+    Serializer mixin that memoizes ``to_representation`` by primary key.
+
+    Entries are keyed on the serializer class and its (possibly pruned)
+    field names as well, so differently shaped uses never share output.
+    Returned representations are shared between rows and must not be
+    mutated.
+    """
+
+    def to_representation(self, instance):
+        identity_map = self.context.get(IDENTITY_MAP_CONTEXT_KEY)
+        if identity_map is None:
+            identity_map = self.context[IDENTITY_MAP_CONTEXT_KEY] = {}
+
+        shape = getattr(self, '_identity_shape', None)
+        if shape is None:
+            shape = self._identity_shape = (type(self), tuple(self.fields))
+        key = (shape, instance.pk)
+
+        representation = identity_map.get(key)
+        if representation is None:
+            representation = identity_map[key] = super().to_representation(instance)
+            metrics.increment('serializers.identity_map.miss')
+        else:
+            metrics.increment('serializers.identity_map.hit')
+        return representation
@@ -0,0 +1,66 @@
+"""
+Lightweight in-process metrics.
+
+Counters and timing summaries are kept per worker process and exposed to
+staff through the /api/metrics/ endpoint. They are meant for watching the
+effect of caches and background work, not as a replacement for a real
+monitoring stack.
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = {}
+
+
+def increment(name, amount=1):
+    """Add `amount` to the counter called `name`."""
+    with _lock:
+        _counters[name] += amount
+
+
+def observe(name, value):
+    """Record one sample (e.g. a duration in seconds) for `name`."""
+    with _lock:
+        summary = _timings.get(name)
+        if summary is None:
+            _timings[name] = {'count': 1, 'total': value, 'max': value}
+        else:
+            summary['count'] += 1
+            summary['total'] += value
+            summary['max'] = max(summary['max'], value)
+
+
+def get_counter(name):
+    """Return the current value of a counter."""
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot():
+    """
+    Return a copy of every counter and timing summary, plus the hit ratio
+    of every ``<name>.hit`` / ``<name>.miss`` counter pair.
+    """
+    with _lock:
+        timings = {
+            name: dict(summary, avg=summary['total'] / summary['count'])
+            for name, summary in _timings.items()
+        }
+        counters = dict(_counters)
+    hit_ratios = {}
+    for name, hits in counters.items():
+        if name.endswith('.hit'):
+            base = name[:-len('.hit')]
+            total = hits + counters.get(f'{base}.miss', 0)
+            if total:
+                hit_ratios[base] = hits / total
+    return {'counters': counters, 'timings': timings, 'hit_ratios': hit_ratios}
+
+
+def reset():
+    """Clear all metrics (used by tests)."""
+    with _lock:
+        _counters.clear()
+        _timings.clear()
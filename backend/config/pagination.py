@@ -0,0 +1,195 @@
+"""
+Shared pagination classes.
+
+KeysetPagination pages through a queryset ordered on a fixed tuple of
+columns (e.g. ``created_at, id``) and hands out an opaque cursor that
+encodes the position of the last row served. Each page is filtered with
+a comparison against that position instead of an OFFSET, so a page
+reads only its own rows from the index, no matter how deep the client
+has scrolled.
+"""
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on a tuple of columns.
+
+    ``ordering`` lists the keyset columns, most significant first, with a
+    leading ``-`` for descending order. The last column must be unique
+    (normally the primary key) so that every row has a distinct position.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+
+        # Fetch one extra row to find out whether there is a next page
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        # Drop page-number parameters a hybrid client may have sent along
+        url = remove_query_param(url, 'page')
+        cursor = self.encode_cursor(self.get_position(self.page[-1]))
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_position(self, row):
+        """Return the keyset values of a row (model instance or dict)."""
+        fields = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[field] for field in fields]
+        return [getattr(row, field) for field in fields]
+
+    def get_keyset_filter(self, position):
+        """
+        Build the row comparison ``(a, b) < (x, y)`` as an OR of prefixes:
+        ``a < x OR (a = x AND b < y)``. With an index on the keyset columns
+        the planner reads rows in index order and stops after a page.
+        """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            prefix = {
+                other.lstrip('-'): position[i]
+                for i, other in enumerate(self.ordering[:index])
+            }
+            condition |= Q(**prefix, **{f'{name}__{lookup}': position[index]})
+        return condition
+
+    def encode_cursor(self, position):
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in position
+        ]
+        payload = json.dumps(values, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request, queryset=None):
+        """
+        Return the keyset position encoded in the request, or ``None`` for
+        the first page. An empty ``?cursor=`` also means the first page.
+        Every value is converted with the model field (or annotation) it
+        is compared against; anything that does not convert is a 404.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self.parse_position_value(value, field.lstrip('-'), queryset)
+                for value, field in zip(values, self.ordering)
+            ]
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def parse_position_value(self, value, name, queryset=None):
+        """Convert one cursor value to the type of its keyset column."""
+        if value is None or not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            raise ValueError(f'Bad value for {name}')
+        field = self.get_keyset_field(name, queryset)
+        if field is None:
+            parsed = parse_datetime(value) if isinstance(value, str) else None
+            return parsed if parsed is not None else value
+        parsed = field.to_python(value)
+        if parsed is None:
+            raise ValueError(f'Bad value for {name}')
+        return parsed
+
+    def get_keyset_field(self, name, queryset):
+        """Return the model field or annotation output field for a column."""
+        if queryset is None:
+            return None
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+
+class HybridPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset mode.
+
+    Requests that carry the cursor query parameter (even empty) are paged
+    by ``cursor_pagination_class``; everything else keeps the classic
+    ``?page=N`` behaviour so existing clients are unaffected.
+    """
+    cursor_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,137 @@
+"""
+Renderers and parsers used in place of DRF's stdlib-json defaults.
+
+ORJSONRenderer produces the same JSON as rest_framework's JSONRenderer
+(compact, UTF-8, same handling of dates, Decimals, lazy strings, files,
+U+2028/U+2029 escaped) but encodes with orjson, which is several times
+faster on large feed and learning payloads. Integers beyond 64 bits,
+which orjson cannot encode, are rendered by JSONRenderer instead. One
+difference remains: orjson writes NaN and Infinity as null, where
+JSONRenderer raises ValueError under the default STRICT_JSON. The
+MessagePack renderer/parser pair is offered to clients that send
+``Accept: application/msgpack``; it needs the optional ``msgpack``
+package and is only registered when it can be imported.
+"""
+import datetime
+import decimal
+import uuid
+
+import orjson
+from django.db.models.fields.files import FieldFile
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+def encode_default(obj):
+    """
+    Convert values the encoders do not know natively, mirroring
+    rest_framework.utils.encoders.JSONEncoder.
+    """
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, datetime.datetime):
+        representation = obj.isoformat()
+        if representation.endswith('+00:00'):
+            representation = representation[:-6] + 'Z'
+        return representation
+    if isinstance(obj, datetime.date):
+        return obj.isoformat()
+    if isinstance(obj, datetime.time):
+        return obj.isoformat()
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, decimal.Decimal):
+        # Serializers coerce Decimals to strings unless told otherwise
+        return float(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, FieldFile):
+        # ImageField/FileField values that bypassed a serializer field
+        return obj.url if obj else None
+    if isinstance(obj, QuerySet):
+        return tuple(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__getitem__'):
+        try:
+            return dict(obj)
+        except (TypeError, ValueError):
+            pass
+    if hasattr(obj, '__iter__'):
+        return tuple(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not serializable')
+
+
+class ORJSONRenderer(BaseRenderer):
+    """JSON renderer backed by orjson."""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    # datetimes go through encode_default so the format matches DRF's encoder
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        try:
+            content = orjson.dumps(data, default=encode_default, option=options)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits; the stdlib encoder handles them
+            return JSONRenderer().render(data, accepted_media_type, renderer_context)
+        # Valid JSON but not valid JavaScript, so escape them like DRF does
+        if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+            content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return content
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        """
+        Indent when the client (or the browsable API) asks for it; orjson
+        only supports two-space indentation.
+        """
+        if accepted_media_type:
+            params = dict(
+                param.strip().split('=', 1)
+                for param in accepted_media_type.split(';')[1:]
+                if '=' in param
+            )
+            if params.get('indent'):
+                return True
+        return bool(renderer_context.get('indent'))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Binary MessagePack renderer for clients that accept it."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """Parse MessagePack request bodies into Python data."""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except Exception as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
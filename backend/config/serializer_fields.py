@@ -0,0 +1,74 @@
+"""
+Serializer fields shared across apps.
+"""
+from functools import lru_cache
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+from rest_framework import serializers
+
+# Serializer context key holding the reference time for one serialization pass
+NOW_CONTEXT_KEY = 'now'
+_MEMO_CONTEXT_KEY = '_relative_timestamps'
+
+
+@lru_cache(maxsize=None)
+def _elapsed_label(count, unit):
+    """Return e.g. '1 minute ago' or '5 hours ago'."""
+    return f'{count} {unit if count == 1 else unit + "s"} ago'
+
+
+@lru_cache(maxsize=4096)
+def _date_label(date):
+    """Return e.g. 'January 05, 2026'."""
+    return date.strftime('%B %d, %Y')
+
+
+def format_relative_timestamp(value, now):
+    """
+    Return a human-readable timestamp relative to `now`:
+    'just now', 'N minutes/hours/days ago', or the date after a week.
+    """
+    seconds = (now - value).total_seconds()
+    if seconds < 60:
+        return 'just now'
+    elif seconds < 3600:
+        return _elapsed_label(int(seconds / 60), 'minute')
+    elif seconds < 86400:
+        return _elapsed_label(int(seconds / 3600), 'hour')
+    elif seconds < 604800:
+        return _elapsed_label(int(seconds / 86400), 'day')
+    return _date_label(value.date())
+
+
+def get_serialization_now(context):
+    """
+    Return the reference time for a serialization pass, taking it once
+    and storing it in the (shared) serializer context.
+    """
+    now = context.get(NOW_CONTEXT_KEY)
+    if now is None:
+        now = context[NOW_CONTEXT_KEY] = timezone.now()
+    return now
+
+
+@extend_schema_field(OpenApiTypes.STR)
+class RelativeTimestampField(serializers.ReadOnlyField):
+    """
+    Read-only field rendering a datetime (default source: `created_at`) as
+    a relative timestamp. "Now" is read once per serialization pass from
+    the context, and labels are memoized per row and per elapsed bucket.
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'created_at')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        context = self.context
+        memo = context.get(_MEMO_CONTEXT_KEY)
+        if memo is None:
+            memo = context[_MEMO_CONTEXT_KEY] = {}
+        label = memo.get(value)
+        if label is None:
+            label = memo[value] = format_relative_timestamp(value, get_serialization_now(context))
+        return label
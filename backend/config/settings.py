@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import importlib.util
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
@@ -39,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
@@ -101,6 +103,62 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The default is per-process memory. Point CACHE_BACKEND/CACHE_LOCATION at a
+# shared cache (e.g. Redis) in production so invalidation reaches every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='spinforge'),
+    }
+}
+
+# Seconds an anonymous feed page stays cached (writes invalidate it sooner)
+FEED_CACHE_TIMEOUT = config('FEED_CACHE_TIMEOUT', default=60, cast=int)
+
+# Seconds a serialized feed row stays cached; keys change with every edit
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Background worker pool for notification/activity side effects
+# (see config/background.py); eager mode runs tasks inline. The test
+# runner turns it on for every test run (see config/test_runner.py)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
+BACKGROUND_WORKERS = config('BACKGROUND_WORKERS', default=2, cast=int)
+BACKGROUND_QUEUE_SIZE = config('BACKGROUND_QUEUE_SIZE', default=1000, cast=int)
+BACKGROUND_MAX_RETRIES = config('BACKGROUND_MAX_RETRIES', default=3, cast=int)
+BACKGROUND_RETRY_DELAY = config('BACKGROUND_RETRY_DELAY', default=0.5, cast=float)
+BACKGROUND_SHUTDOWN_TIMEOUT = config('BACKGROUND_SHUTDOWN_TIMEOUT', default=10, cast=float)
+
+TEST_RUNNER = 'config.test_runner.InlineSideEffectsTestRunner'
+
+# Activity rows are buffered per process and written in batches (see
+# notifications/activity_buffer.py); the test runner turns it off. Set
+# ACTIVITY_BUFFER_SPOOL_DIR to spool pending records to local files
+ACTIVITY_BUFFER_ENABLED = config('ACTIVITY_BUFFER_ENABLED', default=True, cast=bool)
+ACTIVITY_BUFFER_SIZE = config('ACTIVITY_BUFFER_SIZE', default=500, cast=int)
+ACTIVITY_BUFFER_INTERVAL = config('ACTIVITY_BUFFER_INTERVAL', default=2.0, cast=float)
+ACTIVITY_BUFFER_MAX_PENDING = config('ACTIVITY_BUFFER_MAX_PENDING', default=10000, cast=int)
+ACTIVITY_BUFFER_SPOOL_DIR = config('ACTIVITY_BUFFER_SPOOL_DIR', default='')
+
+# Notification event stream (SSE, ASGI only): 'inprocess' for a single
+# server process, 'postgres' (LISTEN/NOTIFY) when running several
+NOTIFICATION_STREAM_BROKER = config('NOTIFICATION_STREAM_BROKER', default='inprocess')
+NOTIFICATION_STREAM_HEARTBEAT = config('NOTIFICATION_STREAM_HEARTBEAT', default=15, cast=float)
+NOTIFICATION_STREAM_RETRY_MS = config('NOTIFICATION_STREAM_RETRY_MS', default=5000, cast=int)
+
+
+# Days notifications are kept, per type and read state (None keeps them
+# forever); 'default' covers types without their own entry. Expired rows
+# are deleted by `manage.py prune_notifications`
+NOTIFICATION_RETENTION_DAYS = {
+    'default': {'read': 90, 'unread': 365},
+    'new_learning_content': {'read': 30, 'unread': 90},
+}
+# Must stay longer than posts.trending.TRENDING_WINDOW
+ACTIVITY_RETENTION_DAYS = config('ACTIVITY_RETENTION_DAYS', default=365, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -156,8 +214,25 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# MessagePack (Accept/Content-Type: application/msgpack) when msgpack is installed
+if importlib.util.find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'config.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'config.renderers.MessagePackParser')
+
+# Serve opted-in list endpoints through their .values() fast-path serializers
+FAST_LIST_SERIALIZERS = config('FAST_LIST_SERIALIZERS', default=True, cast=bool)
+
 # CORS configuration
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS',
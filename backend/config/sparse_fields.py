@@ -0,0 +1,227 @@
+"""
+Sparse fieldsets: ``?fields=`` and ``?omit=`` on read endpoints.
+
+Both parameters take a comma separated list of field names; nested
+fields use dotted paths, e.g. ``?fields=id,author.username,content`` or
+``?omit=author.avatar,formatted_timestamp``. Unknown names are ignored.
+
+Pruning happens in two places:
+
+* SparseFieldsetMixin drops serializer fields before any of them is
+  evaluated, so a skipped field costs no serialization time.
+* SparseFieldsetViewMixin asks the pruned serializer which ORM lookups it
+  still reads and narrows the list queryset to them with ``only()``,
+  ``select_related()`` and the matching prefetches, so a skipped field
+  costs no column and no join either.
+"""
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+FIELDS_QUERY_PARAM = 'fields'
+OMIT_QUERY_PARAM = 'omit'
+SPARSE_CONTEXT_KEY = 'sparse_fieldset'
+
+
+def parse_field_tree(value):
+    """
+    Parse ``'id,author.username'`` into ``{'id': None, 'author': {'username': None}}``.
+
+    ``None`` stands for the whole field; a dict for a subset of a nested
+    serializer's fields. Naming a field whole wins over naming parts of it.
+    """
+    tree = {}
+    for path in value.split(','):
+        parts = [part.strip() for part in path.split('.')]
+        if not all(parts):
+            continue
+        node = tree
+        for part in parts[:-1]:
+            if part in node and node[part] is None:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def get_sparse_fieldset(request):
+    """
+    Return ``(include, omit)`` field trees for a request, or ``None`` when
+    it asks for the full representation. ``include`` is ``None`` when only
+    ``?omit=`` was given.
+    """
+    if request is None:
+        return None
+    fields = request.query_params.get(FIELDS_QUERY_PARAM)
+    omit = request.query_params.get(OMIT_QUERY_PARAM)
+    if not fields and not omit:
+        return None
+    include = parse_field_tree(fields) if fields else None
+    return include, parse_field_tree(omit) if omit else {}
+
+
+def prune_fields(fields, include, omit):
+    """
+    Drop entries of a serializer ``fields`` dict according to the field
+    trees, and hand the sub-trees down to nested sparse serializers.
+    """
+    for name in list(fields):
+        if include is not None and name not in include:
+            del fields[name]
+            continue
+        if name in omit and omit[name] is None:
+            del fields[name]
+            continue
+
+        sub_include = include.get(name) if include is not None else None
+        sub_omit = omit.get(name) or {}
+        if sub_include is None and not sub_omit:
+            continue
+        field = fields[name]
+        target = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(target, SparseFieldsetMixin):
+            target.sparse_fieldset = (sub_include, sub_omit)
+    return fields
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that honours the sparse fieldset in its context.
+
+    The root serializer reads the fieldset the view put in the context;
+    nested sparse serializers receive their part of it from their parent.
+    ``Meta.sparse_sources`` maps SerializerMethodFields to the ORM lookups
+    they read, so the view can narrow the query to the remaining fields.
+    """
+    sparse_fieldset = None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is None:
+            return fields
+        include, omit = fieldset
+        return prune_fields(fields, include, omit)
+
+    def get_sparse_fieldset(self):
+        if self.sparse_fieldset is not None:
+            return self.sparse_fieldset
+        parent = self.parent
+        if parent is None or (
+            isinstance(parent, serializers.ListSerializer) and parent.parent is None
+        ):
+            return self.context.get(SPARSE_CONTEXT_KEY)
+        return None
+
+    def get_sparse_lookups(self, prefix=''):
+        """
+        Return the set of ORM lookups the remaining fields read, or ``None``
+        if some field reads something that cannot be worked out (a method
+        field without a ``sparse_sources`` entry, a ``source='*'`` field).
+        """
+        sources = getattr(self.Meta, 'sparse_sources', {})
+        lookups = set()
+        for name, field in self.fields.items():
+            if name in sources:
+                lookups.update(prefix + source for source in sources[name])
+                continue
+            if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+                return None
+            path = prefix + '__'.join(field.source_attrs)
+            target = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(target, SparseFieldsetMixin):
+                nested = target.get_sparse_lookups(path + '__')
+                if nested is None:
+                    return None
+                lookups.add(path)
+                lookups.update(nested)
+            elif isinstance(target, serializers.BaseSerializer):
+                return None
+            else:
+                lookups.add(path)
+        return lookups
+
+
+def build_query_plan(model, lookups):
+    """
+    Split ORM lookups into ``only()`` columns, ``select_related()`` paths
+    and prefetch roots by walking the model relations they traverse.
+    """
+    only, select_related, prefetch = set(), set(), set()
+    for lookup in lookups:
+        parts = lookup.split('__')
+        current = model
+        for index, part in enumerate(parts):
+            field = current._meta.get_field(part)
+            path = '__'.join(parts[:index + 1])
+            if field.many_to_many or field.one_to_many:
+                prefetch.add(path)
+                break
+            if field.is_relation and index < len(parts) - 1:
+                select_related.add(path)
+                current = field.related_model
+                continue
+            if field.concrete:
+                only.add(path)
+            break
+    return only, select_related, prefetch
+
+
+class SparseFieldsetViewMixin:
+    """
+    ViewSet mixin that passes the request's sparse fieldset to serializers
+    and narrows the list queryset to the columns the pruned serializer reads.
+
+    ``sparse_required_fields`` lists columns the view itself reads from
+    list rows (e.g. keyset pagination columns). List requests with a
+    fieldset skip the .values() fast path of FastListMixin, whose rows are
+    built by hand.
+    """
+    sparse_required_fields = ()
+
+    def get_sparse_fieldset(self):
+        if not hasattr(self, '_sparse_fieldset'):
+            self._sparse_fieldset = get_sparse_fieldset(getattr(self, 'request', None))
+        return self._sparse_fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is not None:
+            context[SPARSE_CONTEXT_KEY] = fieldset
+        return context
+
+    def use_fast_list(self):
+        return self.get_sparse_fieldset() is None and super().use_fast_list()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list' and self.get_sparse_fieldset() is not None:
+            queryset = self.prune_queryset(queryset)
+        return queryset
+
+    def prune_queryset(self, queryset):
+        """Narrow a queryset to the lookups the pruned list serializer reads."""
+        serializer = self.get_serializer()
+        if not isinstance(serializer, SparseFieldsetMixin):
+            return queryset
+        lookups = serializer.get_sparse_lookups()
+        if lookups is None:
+            return queryset
+
+        only, select_related, prefetch = build_query_plan(queryset.model, lookups)
+        queryset = queryset.select_related(None)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        roots = {path.split('__')[0] for path in prefetch}
+        prefetches = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if self.get_prefetch_root(lookup) in roots
+        ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*prefetches)
+        return queryset.only(*only, *self.sparse_required_fields)
+
+    @staticmethod
+    def get_prefetch_root(lookup):
+        path = lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+        return path.split('__')[0]
@@ -0,0 +1,28 @@
+"""
+Test runner that runs request side effects inline.
+
+Tests assert on notifications and activity rows right after the request
+that caused them, so for the whole run, whatever the environment sets,
+background tasks run eagerly and activities skip the write buffer. Tests
+of the queue or the buffer switch them back with ``override_settings``.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class InlineSideEffectsTestRunner(DiscoverRunner):
+    """DiscoverRunner with eager tasks and unbuffered activities."""
+
+    test_settings = {
+        'BACKGROUND_TASKS_EAGER': True,
+        'ACTIVITY_BUFFER_ENABLED': False,
+    }
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.settings_override = override_settings(**self.test_settings)
+        self.settings_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.settings_override.disable()
+        super().teardown_test_environment(**kwargs)
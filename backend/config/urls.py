@@ -17,11 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
-from .views import health_check
+from .views import health_check, metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/health/', health_check, name='health-check'),
+    path('api/metrics/', metrics, name='metrics'),
     # API v1 endpoints
     path('api/v1/auth/', include('users.urls')),
     path('api/v1/profiles/', include('profiles.urls')),
@@ -1,6 +1,8 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
+from . import metrics as process_metrics
 
 
 @api_view(['GET'])
@@ -14,3 +16,11 @@ def health_check(request):
         'version': '1.0.0'
     }, status=status.HTTP_200_OK)
 
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """
+    Counters and timings collected by this worker process (staff only).
+    """
+    return Response(process_metrics.snapshot(), status=status.HTTP_200_OK)
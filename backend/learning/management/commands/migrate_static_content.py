@@ -5,6 +5,7 @@ import json
 import re
 from django.core.management.base import BaseCommand
 from learning.models import Sport, Rule, Technique, LearningSection, LearningTopic
+from notifications.broadcasts import suppress_broadcasts
 
 
 class Command(BaseCommand):
@@ -43,7 +44,8 @@ class Command(BaseCommand):
         
         # Migrate learning content
         learn_file = options['learn_file']
-        self.migrate_learning_content(learn_file)
+        with suppress_broadcasts():
+            self.migrate_learning_content(learn_file)
         
         self.stdout.write(self.style.SUCCESS('Migration completed successfully!'))
 
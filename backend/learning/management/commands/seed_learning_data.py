@@ -3,6 +3,7 @@ Management command to seed learning content data.
 """
 from django.core.management.base import BaseCommand
 from learning.models import Sport, Rule, Technique, LearningSection, LearningTopic
+from notifications.broadcasts import suppress_broadcasts
 
 
 class Command(BaseCommand):
@@ -22,8 +23,9 @@ class Command(BaseCommand):
         # Seed some sample rules
         self.seed_sample_rules(sport)
         
-        # Seed learning sections and topics
-        self.seed_learning_content()
+        # Seed learning sections and topics (bootstrap content, not news)
+        with suppress_broadcasts():
+            self.seed_learning_content()
         
         self.stdout.write(self.style.SUCCESS('Seeding completed successfully!'))
 
@@ -1,4 +1,7 @@
 from rest_framework import serializers
+from django.db.models import Count
+from config.fastpath import ValuesSerializer
+from config.sparse_fields import SparseFieldsetMixin
 from .models import Sport, Rule, Technique, LearningSection, LearningTopic
 
 
@@ -11,7 +14,7 @@ class SportSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at')
 
 
-class RuleListSerializer(serializers.ModelSerializer):
+class RuleListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Rule list view."""
     sport_name = serializers.CharField(source='sport.name', read_only=True)
     related_rules_count = serializers.SerializerMethodField()
@@ -24,12 +27,51 @@ class RuleListSerializer(serializers.ModelSerializer):
             'is_legal', 'related_rules_count', 'created_at'
         )
         read_only_fields = ('id', 'created_at')
+        sparse_sources = {'related_rules_count': ('related_rules',)}
     
     def get_related_rules_count(self, obj):
         """Return count of related rules."""
         return obj.related_rules.count()
 
 
+class RuleListValuesSerializer(ValuesSerializer):
+    """
+    Fast path for the rule list: same JSON as RuleListSerializer, built from
+    .values() rows with related rule counts fetched in one grouped query.
+    """
+    columns = (
+        'id', 'rule_id', 'title', 'description', 'sport_id', 'sport__name',
+        'category', 'is_myth', 'difficulty_level', 'priority', 'is_legal', 'created_at',
+    )
+    
+    def prepare(self, rows):
+        """Count related rules for the whole page at once."""
+        through = Rule.related_rules.through
+        self.related_counts = dict(
+            through.objects.filter(from_rule_id__in=[row['id'] for row in rows])
+            .order_by()
+            .values_list('from_rule_id')
+            .annotate(total=Count('id'))
+        )
+    
+    def build_row(self, row):
+        return {
+            'id': row['id'],
+            'rule_id': row['rule_id'],
+            'title': row['title'],
+            'description': row['description'],
+            'sport': row['sport_id'],
+            'sport_name': row['sport__name'],
+            'category': row['category'],
+            'is_myth': row['is_myth'],
+            'difficulty_level': row['difficulty_level'],
+            'priority': row['priority'],
+            'is_legal': row['is_legal'],
+            'related_rules_count': self.related_counts.get(row['id'], 0),
+            'created_at': self.datetime(row['created_at']),
+        }
+
+
 class RuleDetailSerializer(serializers.ModelSerializer):
     """Serializer for Rule detail view with full information."""
     sport_name = serializers.CharField(source='sport.name', read_only=True)
@@ -56,7 +98,7 @@ class RuleDetailSerializer(serializers.ModelSerializer):
         } for rule in related]
 
 
-class TechniqueListSerializer(serializers.ModelSerializer):
+class TechniqueListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Technique list view."""
     sport_name = serializers.CharField(source='sport.name', read_only=True)
     related_techniques_count = serializers.SerializerMethodField()
@@ -69,6 +111,7 @@ class TechniqueListSerializer(serializers.ModelSerializer):
             'related_techniques_count', 'created_at'
         )
         read_only_fields = ('id', 'created_at')
+        sparse_sources = {'related_techniques_count': ('related_techniques',)}
     
     def get_related_techniques_count(self, obj):
         """Return count of related techniques."""
@@ -101,7 +144,7 @@ class TechniqueDetailSerializer(serializers.ModelSerializer):
         } for technique in related]
 
 
-class LearningTopicSerializer(serializers.ModelSerializer):
+class LearningTopicSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for LearningTopic within a section."""
     related_topics_count = serializers.SerializerMethodField()
     
@@ -112,13 +155,14 @@ class LearningTopicSerializer(serializers.ModelSerializer):
             'related_topics_count', 'ctas'
         )
         read_only_fields = ('id',)
+        sparse_sources = {'related_topics_count': ('related_topics',)}
     
     def get_related_topics_count(self, obj):
         """Return count of related topics."""
         return obj.related_topics.count()
 
 
-class LearningSectionSerializer(serializers.ModelSerializer):
+class LearningSectionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for LearningSection with nested topics."""
     topics = LearningTopicSerializer(many=True, read_only=True)
     topics_count = serializers.SerializerMethodField()
@@ -130,6 +174,7 @@ class LearningSectionSerializer(serializers.ModelSerializer):
             'priority', 'topics_count', 'topics', 'created_at'
         )
         read_only_fields = ('id', 'created_at')
+        sparse_sources = {'topics_count': ('topics',)}
     
     def get_topics_count(self, obj):
         """Return count of topics in this section."""
@@ -1,3 +1,56 @@
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from .models import Sport, Rule
+from .serializers import RuleListSerializer, RuleListValuesSerializer
 
-# Create your tests here.
+
+def make_rule(sport, rule_id, **kwargs):
+    defaults = {
+        'title': rule_id.replace('-', ' ').title(),
+        'description': f'Description of {rule_id}',
+        'category': 'serving',
+        'legal_text': 'Legal',
+        'legal_details': 'Legal details',
+        'illegal_text': 'Illegal',
+        'illegal_details': 'Illegal details',
+        'why_this_rule': 'Because',
+    }
+    defaults.update(kwargs)
+    return Rule.objects.create(sport=sport, rule_id=rule_id, **defaults)
+
+
+class RuleFastPathTests(TestCase):
+    """Tests for the .values() fast path of the rule list."""
+
+    def setUp(self):
+        sport = Sport.objects.create(name='Table Tennis')
+        first = make_rule(sport, 'ball-toss-height', priority=10)
+        second = make_rule(sport, 'visible-ball', is_legal=False, is_myth=True, category='myth')
+        make_rule(sport, 'net-serve', difficulty_level='advanced')
+        first.related_rules.add(second)
+
+    def test_values_serializer_matches_rule_list_serializer(self):
+        """Test that fast-path JSON is byte-identical to the regular serializer."""
+        request = Request(APIRequestFactory().get('/api/v1/learn/rules/'))
+        queryset = Rule.objects.select_related('sport').prefetch_related('related_rules').order_by('id')
+        slow = RuleListSerializer(queryset, many=True, context={'request': request}).data
+        fast_serializer = RuleListValuesSerializer(context={'request': request})
+        fast = fast_serializer.serialize(fast_serializer.get_queryset(queryset))
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(slow))
+
+    def test_rule_list_endpoint_uses_constant_queries(self):
+        """Test that the fast rule list does not count relations per row."""
+        # count, page rows, related rule counts
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/learn/rules/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['related_rules_count'], 1)
+
+    def test_sparse_fieldset_skips_related_rule_prefetch(self):
+        """Test that dropping related_rules_count drops its prefetch too."""
+        # count, page rows
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/learn/rules/?fields=rule_id,sport_name')
+        self.assertEqual(response.json()['results'][0], {'rule_id': 'ball-toss-height', 'sport_name': 'Table Tennis'})
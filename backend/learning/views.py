@@ -1,9 +1,12 @@
 from rest_framework import viewsets, permissions, filters
 from django_filters.rest_framework import DjangoFilterBackend
+from config.fastpath import FastListMixin
+from config.sparse_fields import SparseFieldsetViewMixin
 from .models import Sport, Rule, Technique, LearningSection, LearningTopic
 from .serializers import (
     SportSerializer,
     RuleListSerializer,
+    RuleListValuesSerializer,
     RuleDetailSerializer,
     TechniqueListSerializer,
     TechniqueDetailSerializer,
@@ -35,7 +38,7 @@ class SportViewSet(viewsets.ReadOnlyModelViewSet):
     lookup_field = 'slug'
 
 
-class RuleViewSet(viewsets.ReadOnlyModelViewSet):
+class RuleViewSet(SparseFieldsetViewMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for Rule model.
     Supports filtering by sport, difficulty, category, is_legal, is_myth.
@@ -49,6 +52,7 @@ class RuleViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['priority', 'created_at', 'title']
     ordering = ['-priority', 'title']
     lookup_field = 'rule_id'
+    fast_serializer_class = RuleListValuesSerializer
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
@@ -57,7 +61,7 @@ class RuleViewSet(viewsets.ReadOnlyModelViewSet):
         return RuleListSerializer
 
 
-class TechniqueViewSet(viewsets.ReadOnlyModelViewSet):
+class TechniqueViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for Technique model.
     Supports filtering by sport, skill_type, difficulty.
@@ -79,7 +83,7 @@ class TechniqueViewSet(viewsets.ReadOnlyModelViewSet):
         return TechniqueListSerializer
 
 
-class LearningSectionViewSet(viewsets.ReadOnlyModelViewSet):
+class LearningSectionViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for LearningSection model.
     Returns sections with nested topics.
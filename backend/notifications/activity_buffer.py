@@ -0,0 +1,262 @@
+"""
+Per-process write buffer for Activity rows.
+
+Activities are an append-only audit trail that nothing reads back right
+away, so instead of one INSERT per post or comment they are collected in
+memory and written with one bulk_create when ACTIVITY_BUFFER_SIZE
+records are pending, every ACTIVITY_BUFFER_INTERVAL seconds, and at
+process exit (after the background queue has drained, since its tasks
+append records too).
+
+A failed flush keeps its records for the next attempt, so a database
+outage loses nothing, but at most ACTIVITY_BUFFER_MAX_PENDING records
+are held and beyond that the oldest are dropped, so it cannot exhaust
+memory either. Records the database rejects (e.g. an actor deleted in
+the meantime) are written one by one and the rejects dropped, instead of
+holding up every later flush. Both kinds of drop are counted under
+``activities.buffer.dropped``.
+
+With ACTIVITY_BUFFER_SPOOL_DIR set, every record is also appended to a
+spool file of this process before it is acknowledged, and the file is
+cut back to the still-pending records after each flush. A new process
+adopts the spool files of processes that are gone (including the one
+of its own pid, left by a predecessor) and writes their records, so a
+crash loses nothing (a crash between a flush and the spool cut can write
+a few records twice).
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from config import background, metrics
+from .models import Activity
+
+logger = logging.getLogger(__name__)
+
+SPOOL_PREFIX = 'activities-'
+
+
+class ActivityBuffer:
+    """
+    Collects activity records and writes them in batches.
+
+    The flush timer starts lazily on the first append, so forked server
+    processes each get their own thread.
+    """
+
+    def __init__(self, max_size=500, interval=2.0, max_pending=10000, spool_dir=None):
+        self.max_size = max_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.spool_dir = spool_dir or None
+        self.records = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.timer = None
+        self.spool = None
+        if self.spool_dir:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self.spool_path = os.path.join(self.spool_dir, f'{SPOOL_PREFIX}{os.getpid()}.jsonl')
+            # A restarted process often gets its predecessor's pid (e.g. in
+            # containers): whatever that one left behind is still pending
+            if os.path.exists(self.spool_path):
+                self.records = read_spool(self.spool_path)
+                self.trim()
+                metrics.increment('activities.buffer.recovered', len(self.records))
+            self.spool = open(self.spool_path, 'a', encoding='utf-8')
+            self.adopt_spools()
+
+    def append(self, actor_id, action_type, target_type, target_id, created_at=None):
+        """Buffer one activity; flushes inline once the batch is full."""
+        record = {
+            'actor_id': actor_id,
+            'action_type': action_type,
+            'target_type': target_type,
+            'target_id': target_id,
+            'created_at': (created_at or timezone.now()).isoformat(),
+        }
+        self.start()
+        with self.lock:
+            if self.spool is not None:
+                self.spool.write(json.dumps(record) + '\n')
+                self.spool.flush()
+            self.records.append(record)
+            self.trim()
+            full = len(self.records) >= self.max_size
+        metrics.increment('activities.buffer.appended')
+        if full:
+            self.flush()
+
+    def trim(self):
+        """Drop the oldest records beyond max_pending (lock held)."""
+        overflow = len(self.records) - self.max_pending
+        if overflow > 0:
+            del self.records[:overflow]
+            metrics.increment('activities.buffer.dropped', overflow)
+
+    def flush(self):
+        """
+        Write every pending record with one bulk_create.
+        Returns the number of records written.
+        """
+        with self.flush_lock:
+            with self.lock:
+                records, self.records = self.records, []
+            if not records:
+                return 0
+
+            started = time.monotonic()
+            written = len(records)
+            try:
+                self.write(records)
+            except IntegrityError:
+                # A bad record (e.g. its actor was deleted meanwhile) must
+                # not block the rest: write one by one and drop rejects
+                written = self.write_each(records)
+            except Exception:
+                metrics.increment('activities.buffer.failed')
+                logger.exception('Flushing %d buffered activities failed', len(records))
+                with self.lock:
+                    self.records[:0] = records
+                    self.trim()
+                return 0
+
+            metrics.observe('activities.buffer.flush_latency', time.monotonic() - started)
+            metrics.increment('activities.buffer.flushed', written)
+            with self.lock:
+                self.rewrite_spool()
+            return written
+
+    def write(self, records):
+        """Insert records with one bulk_create, all or nothing."""
+        with transaction.atomic():
+            Activity.objects.bulk_create([
+                Activity(
+                    actor_id=record['actor_id'],
+                    action_type=record['action_type'],
+                    target_type=record['target_type'],
+                    target_id=record['target_id'],
+                    created_at=parse_datetime(record['created_at']),
+                )
+                for record in records
+            ], batch_size=self.max_size)
+            # Foreign keys are deferred; check them before the savepoint ends
+            connection.check_constraints(table_names=[Activity._meta.db_table])
+
+    def write_each(self, records):
+        """
+        Insert records one at a time, dropping those the database rejects.
+        Returns the number of records written.
+        """
+        rejected = 0
+        for record in records:
+            try:
+                self.write([record])
+            except IntegrityError:
+                rejected += 1
+        if rejected:
+            metrics.increment('activities.buffer.dropped', rejected)
+            logger.warning('Dropped %d buffered activities rejected by the database', rejected)
+        return len(records) - rejected
+
+    def rewrite_spool(self):
+        """Cut the spool file back to the pending records (lock held)."""
+        if self.spool is None:
+            return
+        self.spool.close()
+        temporary = f'{self.spool_path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as spool:
+            spool.writelines(json.dumps(record) + '\n' for record in self.records)
+        os.replace(temporary, self.spool_path)
+        self.spool = open(self.spool_path, 'a', encoding='utf-8')
+
+    def adopt_spools(self):
+        """Take over the records spooled by processes that have exited."""
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not (name.startswith(SPOOL_PREFIX) and name.endswith('.jsonl')):
+                continue
+            try:
+                pid = int(name[len(SPOOL_PREFIX):-len('.jsonl')])
+            except ValueError:
+                continue
+            # Our own pid's file was loaded in __init__
+            if pid == os.getpid() or process_alive(pid):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            claimed = f'{path}.{os.getpid()}.claimed'
+            try:
+                # Atomic, so two new processes never adopt the same file
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            records = read_spool(claimed)
+            with self.lock:
+                for record in records:
+                    self.spool.write(json.dumps(record) + '\n')
+                self.spool.flush()
+                self.records.extend(records)
+                self.trim()
+            os.remove(claimed)
+            metrics.increment('activities.buffer.recovered', len(records))
+
+    def start(self):
+        if self.timer is not None:
+            return
+        with self.lock:
+            if self.timer is None:
+                self.timer = threading.Thread(
+                    target=self.run_timer, name='activity-buffer', daemon=True
+                )
+                self.timer.start()
+
+    def run_timer(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                close_old_connections()
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+def read_spool(path):
+    with open(path, encoding='utf-8') as spool:
+        return [json.loads(line) for line in spool if line.strip()]
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """Return this process's ActivityBuffer, created from settings."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ActivityBuffer(
+                    max_size=settings.ACTIVITY_BUFFER_SIZE,
+                    interval=settings.ACTIVITY_BUFFER_INTERVAL,
+                    max_pending=settings.ACTIVITY_BUFFER_MAX_PENDING,
+                    spool_dir=settings.ACTIVITY_BUFFER_SPOOL_DIR,
+                )
+                # Runs after the background queue drains, not before it
+                background.on_shutdown(_buffer.flush)
+    return _buffer
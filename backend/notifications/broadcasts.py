@@ -0,0 +1,133 @@
+"""
+Bulk broadcast notifications (e.g. new learning content for everyone).
+
+Recipients are streamed by primary key keyset and inserted with one
+multi-row INSERT per batch. The Broadcast row records the last delivered
+recipient id and is locked while a batch is written, so a delivery can
+be interrupted and resumed (or run twice concurrently) without skipping
+or duplicating anyone. The unique_broadcast_notification constraint
+backs that up: conflicting rows are ignored.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from config import metrics
+from .counters import increment_unread_counts
+from .models import Broadcast, Notification
+
+User = get_user_model()
+
+# Recipients per INSERT; large enough to amortize round trips, small
+# enough to keep each transaction and its row locks short
+BROADCAST_BATCH_SIZE = 1000
+
+_suppressed = threading.local()
+
+
+@contextmanager
+def suppress_broadcasts():
+    """Skip publish-time broadcasts (e.g. while seeding content)."""
+    _suppressed.depth = getattr(_suppressed, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _suppressed.depth -= 1
+
+
+def broadcasts_suppressed():
+    return getattr(_suppressed, 'depth', 0) > 0
+
+
+def get_or_create_broadcast(notification_type, message, related_object=None):
+    """
+    Return the broadcast for a notification type and related object,
+    creating it if needed. One object is only ever broadcast once.
+
+    Args:
+        notification_type: Type of notification (from NOTIFICATION_TYPES)
+        message: Message text for the notifications
+        related_object: Optional related object (learning topic, etc.)
+
+    Returns:
+        Broadcast instance
+    """
+    lookup = {'notification_type': notification_type}
+    if related_object is not None:
+        lookup['content_type'] = ContentType.objects.get_for_model(related_object)
+        lookup['object_id'] = related_object.pk
+    broadcast, _ = Broadcast.objects.get_or_create(**lookup, defaults={'message': message})
+    return broadcast
+
+
+def deliver_broadcast(broadcast, batch_size=BROADCAST_BATCH_SIZE):
+    """
+    Deliver a broadcast to every active user, starting after its checkpoint.
+
+    Args:
+        broadcast: Broadcast to deliver (resumed if partly delivered)
+        batch_size: Recipients handled per INSERT
+
+    Returns:
+        tuple: (recipients handled in this run, elapsed seconds)
+    """
+    recipients = User.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+    delivered = 0
+    started = time.monotonic()
+
+    while True:
+        with transaction.atomic():
+            state = Broadcast.objects.select_for_update().get(pk=broadcast.pk)
+            if state.status == 'completed':
+                break
+            ids = list(recipients.filter(pk__gt=state.last_recipient_id)[:batch_size])
+            if not ids:
+                Broadcast.objects.filter(pk=state.pk).update(
+                    status='completed', completed_at=timezone.now()
+                )
+                break
+
+            # Skip recipients that already have it (e.g. a rerun), so the
+            # unread counters below are only bumped for new rows
+            existing = set(
+                Notification.objects.filter(
+                    recipient_id__in=ids,
+                    actor__isnull=True,
+                    notification_type=state.notification_type,
+                    content_type_id=state.content_type_id,
+                    object_id=state.object_id,
+                ).values_list('recipient_id', flat=True)
+            )
+            new_ids = [recipient_id for recipient_id in ids if recipient_id not in existing]
+            Notification.objects.bulk_create(
+                [
+                    Notification(
+                        recipient_id=recipient_id,
+                        notification_type=state.notification_type,
+                        message=state.message,
+                        content_type_id=state.content_type_id,
+                        object_id=state.object_id,
+                    )
+                    for recipient_id in new_ids
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            increment_unread_counts(new_ids)
+            Broadcast.objects.filter(pk=state.pk).update(
+                status='running',
+                last_recipient_id=ids[-1],
+                delivered_count=F('delivered_count') + len(ids),
+            )
+        delivered += len(ids)
+
+    elapsed = time.monotonic() - started
+    metrics.increment('notifications.broadcast.rows', delivered)
+    if delivered and elapsed > 0:
+        metrics.observe('notifications.broadcast.rows_per_second', delivered / elapsed)
+    broadcast.refresh_from_db()
+    return delivered, elapsed
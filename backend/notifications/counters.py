@@ -0,0 +1,60 @@
+"""
+Per-user unread notification counters.
+
+UnreadCounter rows are adjusted with F() expressions wherever unread
+notifications appear or disappear (inserts, broadcasts, mark-read,
+deletes), so reading the count is a single primary key lookup. Every
+change is also published to the user's notification streams. Paths
+that bypass these helpers (admin edits, raw SQL) cause drift that
+reconcile_unread_count / the reconcile_unread_counts command repair.
+"""
+from django.db.models import F
+from django.db.models.functions import Greatest
+from .events import publish_unread_counts
+from .models import Notification, UnreadCounter
+
+
+def adjust_unread_count(user_id, delta):
+    """
+    Add `delta` to a user's unread counter (never below zero).
+    A counter missing on an increment is rebuilt from the notifications
+    table. Decrements never recreate it: during a user delete the cascade
+    removes the counter before the notifications, and read_unread_count
+    rebuilds a missing counter lazily anyway.
+    """
+    if not delta:
+        return
+    updated = UnreadCounter.objects.filter(user_id=user_id).update(
+        count=Greatest(F('count') + delta, 0)
+    )
+    if not updated and delta > 0:
+        reconcile_unread_count(user_id)
+    publish_unread_counts([user_id])
+
+
+def increment_unread_counts(user_ids):
+    """Add one unread notification to each of several users in one UPDATE."""
+    if user_ids:
+        UnreadCounter.objects.filter(user_id__in=user_ids).update(count=F('count') + 1)
+        publish_unread_counts(user_ids)
+
+
+def reconcile_unread_count(user_id):
+    """
+    Recount a user's unread notifications and store the result.
+
+    Returns:
+        Integer count of unread notifications
+    """
+    count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+    UnreadCounter.objects.update_or_create(user_id=user_id, defaults={'count': count})
+    publish_unread_counts([user_id])
+    return count
+
+
+def read_unread_count(user_id):
+    """Return a user's stored unread count, rebuilding a missing counter."""
+    count = UnreadCounter.objects.filter(user_id=user_id).values_list('count', flat=True).first()
+    if count is None:
+        count = reconcile_unread_count(user_id)
+    return count
@@ -0,0 +1,121 @@
+"""
+Digest notifications ("Alice and 4 others commented on your post").
+
+Notifications of one type about one target are folded into a single
+unread row per recipient instead of one row per actor. The row is
+written with one INSERT ... ON CONFLICT DO UPDATE against the
+unique_unread_digest index on (recipient, group_key): the first actor
+inserts it, later ones bump its actor count, push themselves onto its
+recent actors, rewrite its message and move it back to the top of the
+inbox. Once the recipient reads it, the next actor opens a new digest.
+
+The actor count is of distinct actors as far as the recent actors list
+can tell: someone acting again while still in that list is not counted
+twice.
+"""
+import json
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.utils import timezone
+from .counters import adjust_unread_count
+from .events import publish_notification
+from .models import Notification
+
+# Actors kept on a digest, newest first
+DIGEST_RECENT_ACTORS = 3
+
+# Actor count once the current actor is folded in
+_ACTOR_COUNT = """
+    n.actor_count + CASE
+        WHEN n.recent_actors @> jsonb_build_array(jsonb_build_object('id', EXCLUDED.actor_id))
+        THEN 0 ELSE 1
+    END
+"""
+
+UPSERT_DIGEST_SQL = f"""
+    INSERT INTO {Notification._meta.db_table} AS n (
+        recipient_id, actor_id, notification_type, message, is_read,
+        content_type_id, object_id, group_key, actor_count, recent_actors, created_at
+    )
+    VALUES (
+        %(recipient_id)s, %(actor_id)s, %(notification_type)s, %(message)s, false,
+        %(content_type_id)s, %(object_id)s, %(group_key)s, 1, %(recent_actors)s::jsonb, %(now)s
+    )
+    ON CONFLICT (recipient_id, group_key) WHERE is_read = false AND group_key IS NOT NULL
+    DO UPDATE SET
+        actor_id = EXCLUDED.actor_id,
+        actor_count = {_ACTOR_COUNT},
+        message = CASE
+            WHEN {_ACTOR_COUNT} = 2 THEN LEFT(%(actor_name)s || ' and 1 other ' || %(verb)s, 255)
+            WHEN {_ACTOR_COUNT} > 2 THEN LEFT(
+                %(actor_name)s || ' and ' || ({_ACTOR_COUNT} - 1) || ' others ' || %(verb)s, 255
+            )
+            ELSE EXCLUDED.message
+        END,
+        recent_actors = (
+            SELECT jsonb_agg(elem ORDER BY ord)
+            FROM (
+                SELECT elem, ord
+                FROM jsonb_array_elements(EXCLUDED.recent_actors || n.recent_actors)
+                    WITH ORDINALITY AS recent(elem, ord)
+                WHERE ord = 1 OR elem -> 'id' <> EXCLUDED.recent_actors -> 0 -> 'id'
+                ORDER BY ord
+                LIMIT %(recent_limit)s
+            ) AS latest
+        ),
+        created_at = EXCLUDED.created_at
+    RETURNING id, (xmax = 0) AS inserted
+"""
+
+
+def digest_group_key(notification_type, target):
+    """Return the key that digest notifications about `target` share."""
+    content_type = ContentType.objects.get_for_model(target)
+    return f'{notification_type}:{content_type.model}:{target.pk}'
+
+
+def upsert_digest_notification(recipient, actor, notification_type, verb, target):
+    """
+    Fold an actor into the recipient's unread digest for a target,
+    opening a new digest if there is none.
+
+    Args:
+        recipient: User who will receive the notification
+        actor: User who triggered the notification (needs a profile)
+        notification_type: Type of notification (from NOTIFICATION_TYPES)
+        verb: Message text after the actor names, e.g. "commented on your post"
+        target: Object the notifications are grouped by (post, comment, etc.)
+
+    Returns:
+        tuple: (notification id, whether a new row was created), or None
+        if the actor is the recipient
+    """
+    if actor == recipient:
+        return None
+
+    actor_name = actor.profile.display_name
+    recent_actor = {'id': actor.pk, 'username': actor.username, 'display_name': actor_name}
+    params = {
+        'recipient_id': recipient.pk,
+        'actor_id': actor.pk,
+        'notification_type': notification_type,
+        'message': f'{actor_name} {verb}'[:255],
+        'content_type_id': ContentType.objects.get_for_model(target).pk,
+        'object_id': target.pk,
+        'group_key': digest_group_key(notification_type, target),
+        'recent_actors': json.dumps([recent_actor]),
+        'now': timezone.now(),
+        'actor_name': actor_name,
+        'verb': verb,
+        'recent_limit': DIGEST_RECENT_ACTORS,
+    }
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(UPSERT_DIGEST_SQL, params)
+            notification_id, created = cursor.fetchone()
+        if created:
+            adjust_unread_count(recipient.pk, 1)
+        publish_notification(recipient.pk, notification_id, updated=not created)
+    return notification_id, created
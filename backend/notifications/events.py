@@ -0,0 +1,205 @@
+"""
+Pub/sub for the notification event stream (see views.notification_stream).
+
+Publishers (signals, counters) announce *that* something changed for a
+set of users after their transaction commits; the stream looks the
+details up itself. Events are small dicts:
+
+    {'type': 'notification', 'users': [recipient_id], 'id': notification_id}
+    {'type': 'notification', 'users': [recipient_id], 'id': notification_id, 'updated': True}
+    {'type': 'unread_count', 'users': [user_id, ...]}
+
+Two brokers are available, picked by NOTIFICATION_STREAM_BROKER:
+
+* ``inprocess`` hands events straight to the streams served by this
+  process. It is the fallback for single-node deployments.
+* ``postgres`` sends events through Postgres LISTEN/NOTIFY, so every
+  server process receives them; one listener thread per process feeds
+  its local streams.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from config import metrics
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per open stream before it is closed as too slow; the
+# client reconnects with Last-Event-ID and catches up from the database
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+# Stream end marker put on an overflowing subscription
+OVERFLOW = object()
+
+
+class Subscription:
+    """Event queue of one open stream, bound to the stream's event loop."""
+
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event):
+        """Hand an event over from any thread."""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            metrics.increment('notifications.stream.overflow')
+            self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """Delivers events to the subscriptions of this process only."""
+
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Subscribe the running event loop to a user's events."""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self.lock:
+            self.subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.user_id]
+
+    def publish(self, event):
+        self.dispatch(event)
+
+    def dispatch(self, event):
+        """Hand an event to every local subscription of its users."""
+        with self.lock:
+            targets = [
+                subscription
+                for user_id in event['users']
+                for subscription in self.subscriptions.get(user_id, ())
+            ]
+        for subscription in targets:
+            subscription.put(event)
+
+
+class PostgresBroker(InProcessBroker):
+    """Fans events out to every process through LISTEN/NOTIFY."""
+    channel = 'notification_events'
+    # NOTIFY payloads are limited to 8000 bytes
+    max_users_per_notify = 500
+
+    def __init__(self):
+        super().__init__()
+        self.listener = None
+
+    def subscribe(self, user_id):
+        self.start_listener()
+        return super().subscribe(user_id)
+
+    def publish(self, event):
+        users = event['users']
+        with connection.cursor() as cursor:
+            for start in range(0, len(users), self.max_users_per_notify):
+                payload = dict(event, users=users[start:start + self.max_users_per_notify])
+                cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, json.dumps(payload)])
+
+    def start_listener(self):
+        if self.listener is not None:
+            return
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(
+                    target=self.listen, name='notification-events', daemon=True
+                )
+                self.listener.start()
+
+    def listen(self):
+        """Listener thread: relay notifications to local subscriptions."""
+        import psycopg2
+
+        delay = 1
+        while True:
+            try:
+                db = settings.DATABASES['default']
+                conn = psycopg2.connect(
+                    dbname=db['NAME'],
+                    user=db.get('USER') or None,
+                    password=db.get('PASSWORD') or None,
+                    host=db.get('HOST') or None,
+                    port=db.get('PORT') or None,
+                )
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                delay = 1
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.dispatch(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                logger.exception('Notification event listener failed; reconnecting')
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+BROKERS = {
+    'inprocess': InProcessBroker,
+    'postgres': PostgresBroker,
+}
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return this process's broker, created from settings."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = BROKERS[settings.NOTIFICATION_STREAM_BROKER]()
+    return _broker
+
+
+def publish_on_commit(event):
+    """Publish an event once the current transaction commits."""
+    transaction.on_commit(lambda: get_broker().publish(event))
+
+
+def publish_notification(recipient_id, notification_id, updated=False):
+    """Announce a new notification, or an update to a digest."""
+    event = {'type': 'notification', 'users': [recipient_id], 'id': notification_id}
+    if updated:
+        event['updated'] = True
+    publish_on_commit(event)
+
+
+def publish_unread_counts(user_ids):
+    user_ids = list(user_ids)
+    if user_ids:
+        publish_on_commit({'type': 'unread_count', 'users': user_ids})
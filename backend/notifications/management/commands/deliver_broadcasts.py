@@ -0,0 +1,31 @@
+"""
+Management command to deliver (or resume) broadcast notifications.
+Picks up every broadcast that has not completed, e.g. after a worker
+restart interrupted a delivery.
+"""
+from django.core.management.base import BaseCommand
+from notifications.broadcasts import BROADCAST_BATCH_SIZE, deliver_broadcast
+from notifications.models import Broadcast
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending and interrupted broadcast notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BROADCAST_BATCH_SIZE,
+            help='Number of recipients inserted per batch',
+        )
+
+    def handle(self, *args, **options):
+        broadcasts = Broadcast.objects.exclude(status='completed').order_by('created_at')
+        for broadcast in broadcasts:
+            resumed_from = broadcast.last_recipient_id
+            delivered, elapsed = deliver_broadcast(broadcast, batch_size=options['batch_size'])
+            rate = delivered / elapsed if elapsed else 0
+            self.stdout.write(self.style.SUCCESS(
+                f'{broadcast}: delivered to {delivered} user(s) after id {resumed_from} '
+                f'in {elapsed:.2f}s ({rate:.0f} rows/s).'
+            ))
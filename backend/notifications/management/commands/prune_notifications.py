@@ -0,0 +1,73 @@
+"""
+Management command to delete notifications and activities past their
+retention (NOTIFICATION_RETENTION_DAYS / ACTIVITY_RETENTION_DAYS).
+Deletes in small primary key ordered chunks with a pause in between,
+so it is safe to run while the site is busy.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+from notifications.models import Activity, Notification
+from notifications.retention import (
+    PRUNE_BATCH_SIZE,
+    activity_retention_filter,
+    notification_retention_filter,
+    prune_activities,
+    prune_notifications,
+)
+
+
+class Command(BaseCommand):
+    help = 'Delete notifications and activities older than their retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=PRUNE_BATCH_SIZE,
+            help='Number of rows deleted per transaction',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.1,
+            help='Seconds to sleep between batches',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options['dry_run']:
+            self.report(now)
+            return
+
+        for label, prune in (('notification', prune_notifications), ('activity', prune_activities)):
+            deleted, elapsed = prune(
+                batch_size=options['batch_size'], pause=options['pause'], now=now
+            )
+            rate = deleted / elapsed if elapsed else 0
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {deleted} {label} row(s) in {elapsed:.2f}s ({rate:.0f} rows/s).'
+            ))
+
+    def report(self, now):
+        expired = notification_retention_filter(now)
+        if expired is not None:
+            breakdown = (
+                Notification.objects.filter(expired)
+                .order_by('notification_type', 'is_read')
+                .values_list('notification_type', 'is_read')
+                .annotate(total=Count('id'))
+            )
+            for notification_type, is_read, total in breakdown:
+                state = 'read' if is_read else 'unread'
+                self.stdout.write(f'Would delete {total} {state} {notification_type} notification(s).')
+
+        expired = activity_retention_filter(now)
+        total = Activity.objects.filter(expired).count() if expired is not None else 0
+        self.stdout.write(f'Would delete {total} activity row(s).')
+        self.stdout.write(self.style.SUCCESS('Dry run: nothing was deleted.'))
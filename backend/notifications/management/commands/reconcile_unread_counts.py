@@ -0,0 +1,67 @@
+"""
+Management command to repair drift in the per-user unread counters.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from notifications.models import Notification, UnreadCounter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recount unread notifications per user in batches and fix drifted counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of users to reconcile per batch',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        checked = 0
+        fixed = 0
+
+        while True:
+            # Walk users by primary key so each batch is an index range scan
+            user_ids = list(
+                User.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            checked += len(user_ids)
+
+            stored = dict(
+                UnreadCounter.objects.filter(user_id__in=user_ids).values_list('user_id', 'count')
+            )
+            actual = dict(
+                Notification.objects.filter(recipient_id__in=user_ids, is_read=False)
+                .order_by()
+                .values_list('recipient_id')
+                .annotate(total=Count('id'))
+            )
+            missing = [
+                UnreadCounter(user_id=pk, count=actual.get(pk, 0))
+                for pk in user_ids if pk not in stored
+            ]
+            fixed += len(UnreadCounter.objects.bulk_create(missing, ignore_conflicts=True))
+            for pk, count in stored.items():
+                expected = actual.get(pk, 0)
+                if count == expected:
+                    continue
+                # Only overwrite the value we read, so a notification that
+                # lands mid-batch (and bumps the counter itself) is not clobbered
+                fixed += UnreadCounter.objects.filter(user_id=pk, count=count).update(
+                    count=expected
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} user(s), fixed {fixed} drifted unread counter(s).'
+        ))
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.6 on 2026-10-18 00:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Broadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('comment_on_post', 'Comment on Post'), ('comment_reply', 'Comment Reply'), ('post_feedback', 'Post Feedback'), ('new_learning_content', 'New Learning Content')], help_text='Type of the delivered notifications', max_length=50)),
+                ('message', models.CharField(help_text='Notification message text', max_length=255)),
+                ('object_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed')], default='pending', max_length=20)),
+                ('last_recipient_id', models.PositiveBigIntegerField(default=0, help_text='Highest recipient id delivered so far')),
+                ('delivered_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'notification_broadcasts',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('actor__isnull', True)), fields=('recipient', 'notification_type', 'content_type', 'object_id'), name='unique_broadcast_notification'),
+        ),
+        migrations.AddField(
+            model_name='broadcast',
+            name='content_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype'),
+        ),
+        migrations.AddConstraint(
+            model_name='broadcast',
+            constraint=models.UniqueConstraint(fields=('notification_type', 'content_type', 'object_id'), name='unique_broadcast'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
 
 
 class Activity(models.Model):
@@ -34,7 +35,8 @@ class Activity(models.Model):
     target_id = models.PositiveIntegerField(
         help_text="ID of the target object"
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered activities keep the time they happened
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'activities'
@@ -100,6 +102,24 @@ class Notification(models.Model):
     object_id = models.PositiveIntegerField(null=True, blank=True)
     related_object = GenericForeignKey('content_type', 'object_id')
     
+    # Digest aggregation (see notifications.digests): unread notifications
+    # sharing a group key are folded into one row
+    group_key = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        help_text="Type and target shared by the notifications folded into this one"
+    )
+    actor_count = models.PositiveIntegerField(
+        default=1,
+        help_text="Number of distinct actors folded into this notification"
+    )
+    recent_actors = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Most recent actors, newest first"
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -109,15 +129,109 @@ class Notification(models.Model):
             models.Index(fields=['recipient', 'is_read', 'created_at']),
             models.Index(fields=['notification_type']),
             models.Index(fields=['created_at']),
+            # Unread inbox section: small, and a tight range per recipient
+            models.Index(
+                fields=['recipient', 'created_at', 'id'],
+                condition=models.Q(is_read=False),
+                name='notifications_unread_inbox'
+            ),
         ]
         # Prevent duplicate notifications
         constraints = [
             models.UniqueConstraint(
                 fields=['recipient', 'actor', 'notification_type', 'object_id'],
-                condition=models.Q(is_read=False),
+                condition=models.Q(is_read=False, group_key__isnull=True),
                 name='unique_unread_notification'
-            )
+            ),
+            # At most one open digest per recipient and group; it is the
+            # conflict target of the digest upsert
+            models.UniqueConstraint(
+                fields=['recipient', 'group_key'],
+                condition=models.Q(is_read=False, group_key__isnull=False),
+                name='unique_unread_digest'
+            ),
+            # NULL actors never collide above; broadcasts are deduplicated
+            # here so a resumed delivery cannot notify anyone twice
+            models.UniqueConstraint(
+                fields=['recipient', 'notification_type', 'content_type', 'object_id'],
+                condition=models.Q(actor__isnull=True),
+                name='unique_broadcast_notification'
+            ),
         ]
     
     def __str__(self):
         return f"Notification for {self.recipient.username}: {self.notification_type}"
+
+
+class Broadcast(models.Model):
+    """
+    A notification delivered to every active user in resumable batches.
+    last_recipient_id is the keyset checkpoint: every user up to it has
+    been handled.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+    ]
+    
+    notification_type = models.CharField(
+        max_length=50,
+        choices=Notification.NOTIFICATION_TYPES,
+        help_text="Type of the delivered notifications"
+    )
+    message = models.CharField(
+        max_length=255,
+        help_text="Notification message text"
+    )
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True
+    )
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    related_object = GenericForeignKey('content_type', 'object_id')
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    last_recipient_id = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Highest recipient id delivered so far"
+    )
+    delivered_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'notification_broadcasts'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['notification_type', 'content_type', 'object_id'],
+                name='unique_broadcast'
+            )
+        ]
+    
+    def __str__(self):
+        return f"Broadcast {self.notification_type} ({self.status})"
+
+
+class UnreadCounter(models.Model):
+    """
+    Denormalized number of unread notifications per user, so the unread
+    count poll is a primary key lookup instead of a COUNT(*).
+    Maintained by notifications.counters; reconcile_unread_counts repairs drift.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='unread_counter'
+    )
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'notification_unread_counters'
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.count} unread"
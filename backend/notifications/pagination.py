@@ -0,0 +1,17 @@
+from config.pagination import HybridPagination, KeysetPagination
+
+
+class InboxCursorPagination(KeysetPagination):
+    """
+    Keyset pagination over one section of the inbox (see
+    NotificationViewSet), newest first. The unread section is a range
+    scan of the notifications_unread_inbox partial index.
+    """
+    ordering = ('-created_at', '-id')
+
+
+class InboxPagination(HybridPagination):
+    """
+    Page numbers for existing clients, keyset cursors with ``?cursor=``.
+    """
+    cursor_pagination_class = InboxCursorPagination
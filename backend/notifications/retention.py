@@ -0,0 +1,147 @@
+"""
+Retention policy for notifications and activities.
+
+NOTIFICATION_RETENTION_DAYS maps notification types to how many days
+their read and unread rows are kept ('default' covers every type without
+its own entry, None keeps rows forever); ACTIVITY_RETENTION_DAYS does the
+same for activities. Expired rows are deleted by the prune_notifications
+command in primary key order, one short transaction per chunk with an
+optional pause in between, so pruning never holds many row locks at
+once and gives replicas time to catch up.
+"""
+import time
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from config import metrics
+from .counters import adjust_unread_count
+from .models import Activity, Notification
+
+# Rows deleted per transaction
+PRUNE_BATCH_SIZE = 1000
+
+READ_STATES = {'read': True, 'unread': False}
+
+
+def notification_retention_filter(now=None):
+    """
+    Return a Q matching notifications past their retention, or None if
+    every notification is kept forever.
+    """
+    now = now or timezone.now()
+    policy = settings.NOTIFICATION_RETENTION_DAYS
+    default = policy.get('default', {})
+    listed = [notification_type for notification_type in policy if notification_type != 'default']
+    rules = [(Q(notification_type=t), policy[t]) for t in listed]
+    rules.append((~Q(notification_type__in=listed), default))
+
+    expired = Q()
+    matched = False
+    for type_filter, days in rules:
+        for state, is_read in READ_STATES.items():
+            if days.get(state) is None:
+                continue
+            expired |= type_filter & Q(
+                is_read=is_read, created_at__lt=now - timedelta(days=days[state])
+            )
+            matched = True
+    return expired if matched else None
+
+
+def activity_retention_filter(now=None):
+    """Return a Q matching expired activities, or None to keep them all."""
+    days = settings.ACTIVITY_RETENTION_DAYS
+    if days is None:
+        return None
+    return Q(created_at__lt=(now or timezone.now()) - timedelta(days=days))
+
+
+def delete_notifications(ids):
+    """
+    Delete notifications by id and uncount the unread ones, in one
+    statement instead of a post_delete signal per row.
+
+    Returns:
+        Number of rows deleted
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {Notification._meta.db_table} WHERE id = ANY(%s) '
+            f'RETURNING recipient_id, is_read',
+            [list(ids)],
+        )
+        rows = cursor.fetchall()
+    unread = Counter(recipient_id for recipient_id, is_read in rows if not is_read)
+    for recipient_id, count in unread.items():
+        adjust_unread_count(recipient_id, -count)
+    return len(rows)
+
+
+def delete_activities(ids):
+    """Delete activities by id (no signals or cascades: one DELETE)."""
+    deleted, _ = Activity.objects.filter(id__in=ids).delete()
+    return deleted
+
+
+def prune(queryset, delete, batch_size=PRUNE_BATCH_SIZE, pause=0, metric=None):
+    """
+    Delete the rows of `queryset` in primary key order.
+
+    Args:
+        queryset: Rows to delete
+        delete: Function deleting a list of ids, returning the number deleted
+        batch_size: Rows deleted per transaction
+        pause: Seconds to sleep between transactions
+        metric: Metric name prefix for rows and rows_per_second
+
+    Returns:
+        tuple: (rows deleted, elapsed seconds)
+    """
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last_id = 0
+    deleted = 0
+    started = time.monotonic()
+
+    while True:
+        with transaction.atomic():
+            batch = list(ids.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            deleted += delete(batch)
+        last_id = batch[-1]
+        if len(batch) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    elapsed = time.monotonic() - started
+    if metric:
+        metrics.increment(f'{metric}.rows', deleted)
+        if deleted and elapsed > 0:
+            metrics.observe(f'{metric}.rows_per_second', deleted / elapsed)
+    return deleted, elapsed
+
+
+def prune_notifications(batch_size=PRUNE_BATCH_SIZE, pause=0, now=None):
+    """Delete expired notifications. Returns (rows deleted, elapsed seconds)."""
+    expired = notification_retention_filter(now)
+    if expired is None:
+        return 0, 0.0
+    return prune(
+        Notification.objects.filter(expired), delete_notifications,
+        batch_size=batch_size, pause=pause, metric='notifications.prune'
+    )
+
+
+def prune_activities(batch_size=PRUNE_BATCH_SIZE, pause=0, now=None):
+    """Delete expired activities. Returns (rows deleted, elapsed seconds)."""
+    expired = activity_retention_filter(now)
+    if expired is None:
+        return 0, 0.0
+    return prune(
+        Activity.objects.filter(expired), delete_activities,
+        batch_size=batch_size, pause=pause, metric='activities.prune'
+    )
@@ -1,11 +1,16 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from config.fastpath import ValuesSerializer
+from config.identity_map import IdentityMapMixin
+from config.serializer_fields import RelativeTimestampField
+from config.sparse_fields import SparseFieldsetMixin
+from profiles.models import Profile
 from .models import Notification, Activity
 
 User = get_user_model()
 
 
-class NotificationActorSerializer(serializers.ModelSerializer):
+class NotificationActorSerializer(IdentityMapMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Nested serializer for notification actor information.
     """
@@ -17,44 +22,26 @@ class NotificationActorSerializer(serializers.ModelSerializer):
         fields = ('username', 'display_name', 'avatar')
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for Notification model.
     Includes actor info and formatted timestamp.
     """
     actor = NotificationActorSerializer(read_only=True)
-    formatted_timestamp = serializers.SerializerMethodField()
+    formatted_timestamp = RelativeTimestampField()
     related_object_type = serializers.SerializerMethodField()
     related_object_id = serializers.IntegerField(source='object_id', read_only=True)
     
     class Meta:
         model = Notification
         fields = (
-            'id', 'actor', 'notification_type', 'message', 'is_read',
+            'id', 'actor', 'actor_count', 'recent_actors', 'notification_type', 'message', 'is_read',
             'related_object_type', 'related_object_id', 'created_at', 'formatted_timestamp'
         )
-        read_only_fields = ('id', 'created_at', 'actor', 'notification_type', 'message')
-    
-    def get_formatted_timestamp(self, obj):
-        """Return human-readable timestamp."""
-        from django.utils import timezone
-        now = timezone.now()
-        diff = now - obj.created_at
-        
-        seconds = diff.total_seconds()
-        if seconds < 60:
-            return 'just now'
-        elif seconds < 3600:
-            minutes = int(seconds / 60)
-            return f'{minutes} {"minute" if minutes == 1 else "minutes"} ago'
-        elif seconds < 86400:
-            hours = int(seconds / 3600)
-            return f'{hours} {"hour" if hours == 1 else "hours"} ago'
-        elif seconds < 604800:
-            days = int(seconds / 86400)
-            return f'{days} {"day" if days == 1 else "days"} ago'
-        else:
-            return obj.created_at.strftime('%B %d, %Y')
+        read_only_fields = (
+            'id', 'created_at', 'actor', 'actor_count', 'recent_actors', 'notification_type', 'message'
+        )
+        sparse_sources = {'related_object_type': ('content_type__model',)}
     
     def get_related_object_type(self, obj):
         """Return the type of related object."""
@@ -63,6 +50,45 @@ class NotificationSerializer(serializers.ModelSerializer):
         return None
 
 
+class NotificationValuesSerializer(ValuesSerializer):
+    """
+    Fast path for the inbox: same JSON as NotificationSerializer, built
+    from .values() rows.
+    """
+    columns = (
+        'id', 'actor_count', 'recent_actors', 'notification_type', 'message', 'is_read',
+        'object_id', 'created_at',
+        'content_type__model', 'actor_id', 'actor__username', 'actor__profile__id',
+        'actor__profile__display_name', 'actor__profile__avatar',
+    )
+    avatar_storage = Profile._meta.get_field('avatar').storage
+    
+    def build_actor(self, row):
+        if row['actor_id'] is None:
+            return None
+        actor = {'username': row['actor__username']}
+        # DRF skips profile-sourced fields when the profile row is missing
+        if row['actor__profile__id'] is not None:
+            actor['display_name'] = row['actor__profile__display_name']
+            actor['avatar'] = self.file_url(row['actor__profile__avatar'], self.avatar_storage)
+        return actor
+    
+    def build_row(self, row):
+        return {
+            'id': row['id'],
+            'actor': self.build_actor(row),
+            'actor_count': row['actor_count'],
+            'recent_actors': row['recent_actors'],
+            'notification_type': row['notification_type'],
+            'message': row['message'],
+            'is_read': row['is_read'],
+            'related_object_type': row['content_type__model'],
+            'related_object_id': row['object_id'],
+            'created_at': self.datetime(row['created_at']),
+            'formatted_timestamp': self.timestamp(row['created_at']),
+        }
+
+
 class ActivitySerializer(serializers.ModelSerializer):
     """
     Serializer for Activity model.
@@ -80,3 +106,20 @@ class NotificationMarkReadSerializer(serializers.Serializer):
     Serializer for marking notifications as read.
     """
     is_read = serializers.BooleanField(default=True)
+
+
+class NotificationBulkReadSerializer(serializers.Serializer):
+    """
+    Serializer for marking several notifications as read: a list of ids,
+    or a watermark (everything up to a notification id or a time).
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=500
+    )
+    up_to_id = serializers.IntegerField(required=False, min_value=1)
+    up_to = serializers.DateTimeField(required=False)
+    
+    def validate(self, attrs):
+        if len(attrs) != 1:
+            raise serializers.ValidationError('Provide exactly one of ids, up_to_id or up_to.')
+        return attrs
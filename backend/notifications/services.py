@@ -2,10 +2,47 @@
 Service layer for notification creation and management.
 Handles business logic for creating notifications and activities.
 """
+import functools
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from django.db import IntegrityError
+from django.db import IntegrityError, connection, transaction
+from profiles.models import Profile
+from .activity_buffer import get_buffer
+from .counters import adjust_unread_count, read_unread_count
 from .models import Notification, Activity
 
+User = get_user_model()
+
+# Flips the matching unread rows and returns them joined with what the
+# inbox JSON shows, keyed like NotificationValuesSerializer.columns
+MARK_READ_SQL = f"""
+    WITH updated AS (
+        UPDATE {Notification._meta.db_table}
+        SET is_read = true
+        WHERE recipient_id = %s AND is_read = false AND {{conditions}}
+        RETURNING id, actor_id, actor_count, recent_actors, notification_type, message,
+                  is_read, content_type_id, object_id, created_at
+    )
+    SELECT updated.id, updated.actor_count, updated.recent_actors::text, updated.notification_type,
+           updated.message, updated.is_read, updated.object_id, updated.created_at,
+           content_type.model, updated.actor_id, actor.username,
+           profile.id, profile.display_name, profile.avatar
+    FROM updated
+    LEFT JOIN {ContentType._meta.db_table} content_type ON content_type.id = updated.content_type_id
+    LEFT JOIN {User._meta.db_table} actor ON actor.id = updated.actor_id
+    LEFT JOIN {Profile._meta.db_table} profile ON profile.user_id = updated.actor_id
+    ORDER BY updated.created_at DESC, updated.id DESC
+"""
+
+MARK_READ_COLUMNS = (
+    'id', 'actor_count', 'recent_actors', 'notification_type', 'message', 'is_read',
+    'object_id', 'created_at', 'content_type__model', 'actor_id', 'actor__username',
+    'actor__profile__id', 'actor__profile__display_name', 'actor__profile__avatar',
+)
+
 
 def create_notification(recipient, actor, notification_type, message, related_object=None):
     """
@@ -38,7 +75,9 @@ def create_notification(recipient, actor, notification_type, message, related_ob
         notification_data['object_id'] = related_object.id
     
     try:
-        notification = Notification.objects.create(**notification_data)
+        # Savepoint, so a duplicate does not abort a surrounding transaction
+        with transaction.atomic():
+            notification = Notification.objects.create(**notification_data)
         return notification
     except IntegrityError:
         # Duplicate notification (constraint violation)
@@ -67,6 +106,26 @@ def create_activity(actor, action_type, target_type, target_id):
     return activity
 
 
+def record_activity(actor, action_type, target_type, target_id):
+    """
+    Record an activity through the per-process write buffer once the
+    current transaction commits, or write it immediately when
+    ACTIVITY_BUFFER_ENABLED is off.
+    
+    Args:
+        actor: User who performed the action
+        action_type: Type of action (from ACTION_TYPES)
+        target_type: Type of target object
+        target_id: ID of target object
+    """
+    if not settings.ACTIVITY_BUFFER_ENABLED:
+        create_activity(actor, action_type, target_type, target_id)
+        return
+    transaction.on_commit(
+        functools.partial(get_buffer().append, actor.pk, action_type, target_type, target_id)
+    )
+
+
 def mark_notification_as_read(notification_id, user):
     """
     Mark a notification as read.
@@ -78,13 +137,53 @@ def mark_notification_as_read(notification_id, user):
     Returns:
         True if successful, False otherwise
     """
-    try:
-        notification = Notification.objects.get(id=notification_id, recipient=user)
-        notification.is_read = True
-        notification.save(update_fields=['is_read'])
-        return True
-    except Notification.DoesNotExist:
-        return False
+    notifications = Notification.objects.filter(id=notification_id, recipient=user)
+    with transaction.atomic():
+        # Only an unread -> read transition changes the unread counter
+        if notifications.filter(is_read=False).update(is_read=True):
+            adjust_unread_count(user.id, -1)
+            return True
+    return notifications.exists()
+
+
+def mark_notifications_as_read(user, ids=None, up_to_id=None, up_to=None):
+    """
+    Mark several unread notifications as read with one UPDATE ... RETURNING.
+    Selects by id list and/or a watermark (every notification up to an id
+    or a creation time).
+    
+    Args:
+        user: User who owns the notifications (for security)
+        ids: Optional list of notification ids
+        up_to_id: Optional highest notification id to mark
+        up_to: Optional latest creation time to mark
+    
+    Returns:
+        List of the updated rows as dicts for NotificationValuesSerializer,
+        newest first
+    """
+    conditions = []
+    params = [user.id]
+    if ids is not None:
+        conditions.append('id = ANY(%s)')
+        params.append(list(ids))
+    if up_to_id is not None:
+        conditions.append('id <= %s')
+        params.append(up_to_id)
+    if up_to is not None:
+        conditions.append('created_at <= %s')
+        params.append(up_to)
+    if not conditions:
+        raise ValueError('Pass ids, up_to_id or up_to')
+    
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(MARK_READ_SQL.format(conditions=' AND '.join(conditions)), params)
+            rows = [dict(zip(MARK_READ_COLUMNS, row)) for row in cursor.fetchall()]
+        adjust_unread_count(user.id, -len(rows))
+    for row in rows:
+        row['recent_actors'] = json.loads(row['recent_actors'])
+    return rows
 
 
 def mark_all_notifications_as_read(user):
@@ -97,16 +196,19 @@ def mark_all_notifications_as_read(user):
     Returns:
         Number of notifications marked as read
     """
-    count = Notification.objects.filter(
-        recipient=user,
-        is_read=False
-    ).update(is_read=True)
+    with transaction.atomic():
+        count = Notification.objects.filter(
+            recipient=user,
+            is_read=False
+        ).update(is_read=True)
+        adjust_unread_count(user.id, -count)
     return count
 
 
 def get_unread_count(user):
     """
     Get count of unread notifications for a user.
+    Reads the maintained counter (one primary key lookup).
     
     Args:
         user: User to get count for
@@ -114,7 +216,4 @@ def get_unread_count(user):
     Returns:
         Integer count of unread notifications
     """
-    return Notification.objects.filter(
-        recipient=user,
-        is_read=False
-    ).count()
+    return read_unread_count(user.id)
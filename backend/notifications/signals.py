@@ -1,87 +1,70 @@
 """
 Signal handlers for automatic notification creation.
-Listens to model events and creates notifications accordingly.
+Listens to model events and queues the notification and activity work
+(see tasks.py) to run in the background once the write has committed.
 """
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from config.background import submit_on_commit
+from learning.models import LearningTopic
 from posts.models import Comment, Post
-from .services import create_notification, create_activity
+from .broadcasts import broadcasts_suppressed
+from .counters import adjust_unread_count
+from .events import publish_notification
+from .models import Notification, UnreadCounter
+from .tasks import broadcast_new_topic, process_comment_created, process_post_created
+
+User = get_user_model()
 
 
 @receiver(post_save, sender=Comment)
 def handle_comment_created(sender, instance, created, **kwargs):
     """
     Handle comment creation.
-    Creates notifications for:
-    1. Post author (someone commented on your post)
-    2. Previous commenter (if this is a reply to their comment)
+    Queues the activity record and the post/parent author notifications.
     """
-    if not created:
-        return
-    
-    comment = instance
-    post = comment.post
-    commenter = comment.author
-    
-    # Create activity record
-    create_activity(
-        actor=commenter,
-        action_type='comment_created',
-        target_type='comment',
-        target_id=comment.id
-    )
-    
-    # Notify post author (if not commenting on own post)
-    if post.author != commenter:
-        message = f"{commenter.profile.display_name} commented on your post"
-        create_notification(
-            recipient=post.author,
-            actor=commenter,
-            notification_type='comment_on_post',
-            message=message,
-            related_object=comment
-        )
-    
-    # Check if this is a reply to another comment
-    # Get all comments on this post before this one
-    previous_comments = Comment.objects.filter(
-        post=post,
-        created_at__lt=comment.created_at
-    ).select_related('author').order_by('-created_at')
-    
-    # If there are previous comments and this isn't the first comment
-    if previous_comments.exists():
-        # Get the most recent commenter (likely being replied to)
-        # This is a simple heuristic - in a full implementation you'd parse @mentions or have explicit reply links
-        most_recent_commenter = previous_comments.first().author
-        
-        # Notify if replying to someone else's comment
-        if most_recent_commenter != commenter and most_recent_commenter != post.author:
-            message = f"{commenter.profile.display_name} replied to your comment"
-            create_notification(
-                recipient=most_recent_commenter,
-                actor=commenter,
-                notification_type='comment_reply',
-                message=message,
-                related_object=comment
-            )
+    if created:
+        submit_on_commit(process_comment_created, instance.id, using=kwargs.get('using'))
 
 
 @receiver(post_save, sender=Post)
 def handle_post_created(sender, instance, created, **kwargs):
     """
     Handle post creation.
-    Creates activity record for post creation.
+    Queues the activity record and the fan-out to home timelines.
+    """
+    if created:
+        submit_on_commit(process_post_created, instance.id, using=kwargs.get('using'))
+
+
+@receiver(post_save, sender=LearningTopic)
+def handle_topic_published(sender, instance, created, raw=False, **kwargs):
+    """
+    Handle learning topic publication.
+    Queues a broadcast of the new topic to every active user.
     """
-    if not created:
-        return
-    
-    post = instance
-    
-    # Create activity record
-    create_activity(
-        actor=post.author,
-        action_type='post_created',
-        target_type='post',
-        target_id=post.id
-    )
+    if created and not raw and not broadcasts_suppressed():
+        submit_on_commit(broadcast_new_topic, instance.id, using=kwargs.get('using'))
+
+
+@receiver(post_save, sender=User)
+def create_unread_counter(sender, instance, created, raw=False, **kwargs):
+    """Give every new user an unread notification counter."""
+    if created and not raw:
+        UnreadCounter.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, raw=False, **kwargs):
+    """Count a newly inserted unread notification and push it to streams."""
+    if created and not raw and not instance.is_read:
+        adjust_unread_count(instance.recipient_id, 1)
+        publish_notification(instance.recipient_id, instance.id)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    """Stop counting a deleted unread notification."""
+    if not instance.is_read:
+        adjust_unread_count(instance.recipient_id, -1)
@@ -0,0 +1,98 @@
+"""
+Background tasks for notification and activity side effects.
+
+Signal handlers enqueue these with config.background.submit_on_commit,
+so they run after the triggering request has committed. Tasks take ids
+rather than instances and reload what they need; each one runs in its
+own transaction so a retry never leaves half of its rows behind.
+"""
+from django.db import transaction
+from posts.models import Comment, Post
+from learning.models import LearningTopic
+from posts.timelines import fan_out_post
+from .broadcasts import deliver_broadcast, get_or_create_broadcast
+from .digests import upsert_digest_notification
+from .services import record_activity
+
+
+def process_comment_created(comment_id):
+    """
+    Record the activity for a new comment and create notifications for:
+    1. Post author (someone commented on your post)
+    2. Parent comment author (if this is a reply to their comment)
+    
+    Both are digests: every comment on a post lands in one notification
+    for its author, every reply to a comment in one for the parent's author.
+    """
+    comment = Comment.objects.select_related(
+        'post__author', 'author__profile', 'parent__author'
+    ).filter(pk=comment_id).first()
+    if comment is None:
+        # Deleted before the task ran
+        return
+    
+    post = comment.post
+    commenter = comment.author
+    
+    with transaction.atomic():
+        record_activity(
+            actor=commenter,
+            action_type='comment_created',
+            target_type='comment',
+            target_id=comment.id
+        )
+        
+        # Notify post author (if not commenting on own post)
+        if post.author != commenter:
+            upsert_digest_notification(
+                recipient=post.author,
+                actor=commenter,
+                notification_type='comment_on_post',
+                verb='commented on your post',
+                target=post
+            )
+        
+        # Notify the author of the comment being replied to
+        if comment.parent_id:
+            parent_author = comment.parent.author
+            
+            # Post author was already notified above
+            if parent_author != commenter and parent_author != post.author:
+                upsert_digest_notification(
+                    recipient=parent_author,
+                    actor=commenter,
+                    notification_type='comment_reply',
+                    verb='replied to your comment',
+                    target=comment.parent
+                )
+
+
+def process_post_created(post_id):
+    """
+    Record the activity for a new post and fan it out to home timelines.
+    """
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is None:
+        return
+    
+    with transaction.atomic():
+        record_activity(
+            actor=post.author,
+            action_type='post_created',
+            target_type='post',
+            target_id=post.id
+        )
+        fan_out_post(post)
+
+
+def broadcast_new_topic(topic_id):
+    """
+    Tell every active user about a newly published learning topic.
+    """
+    topic = LearningTopic.objects.select_related('section').filter(pk=topic_id).first()
+    if topic is None:
+        return
+    
+    message = f"New in {topic.section.title}: {topic.title}"[:255]
+    broadcast = get_or_create_broadcast('new_learning_content', message, related_object=topic)
+    deliver_broadcast(broadcast)
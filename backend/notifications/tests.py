@@ -1,8 +1,43 @@
-from django.test import TestCase
+from unittest import mock
+from io import StringIO
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+from config import background, metrics
+from config.background import BackgroundQueue
+from learning.models import LearningSection, LearningTopic
 from posts.models import Post, Comment
-from .models import Notification, Activity
-from .services import create_notification, create_activity, get_unread_count
+from .activity_buffer import ActivityBuffer, get_buffer
+from .broadcasts import deliver_broadcast, get_or_create_broadcast, suppress_broadcasts
+from .digests import upsert_digest_notification
+from .events import get_broker
+from .retention import prune_activities, prune_notifications
+from .models import Broadcast, Notification, Activity, UnreadCounter
+from .serializers import NotificationSerializer, NotificationValuesSerializer
+from .views import notification_stream
+from .services import (
+    create_notification,
+    create_activity,
+    get_unread_count,
+    mark_all_notifications_as_read,
+    mark_notification_as_read,
+)
 
 User = get_user_model()
 
@@ -54,3 +89,784 @@ class NotificationServiceTests(TestCase):
             message='Test'
         )
         self.assertIsNone(notification)
+
+
+class CommentReplyNotificationTests(TestCase):
+    """Tests for reply notifications driven by explicit parent links."""
+    
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', email='author@test.com', password='pass')
+        self.user1 = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.user2 = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        self.post = Post.objects.create(author=self.author, content='Post')
+    
+    def test_reply_notifies_parent_author(self):
+        """Test that a reply notifies the author of the parent comment."""
+        parent = Comment.objects.create(post=self.post, author=self.user1, content='First')
+        Comment.objects.create(post=self.post, author=self.user2, content='Reply', parent=parent)
+        self.assertTrue(Notification.objects.filter(
+            recipient=self.user1, actor=self.user2, notification_type='comment_reply'
+        ).exists())
+    
+    def test_top_level_comment_is_not_a_reply(self):
+        """Test that a new top-level comment does not notify earlier commenters."""
+        Comment.objects.create(post=self.post, author=self.user1, content='First')
+        Comment.objects.create(post=self.post, author=self.user2, content='Second')
+        self.assertFalse(Notification.objects.filter(notification_type='comment_reply').exists())
+
+
+class NotificationFastPathTests(TestCase):
+    """Tests for the .values() fast path of the notification list."""
+    
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.user2 = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        self.user2.profile.avatar = 'avatars/user2.png'
+        self.user2.profile.save()
+        post = Post.objects.create(author=self.user1, content='Post')
+        comment = Comment.objects.create(post=post, author=self.user2, content='Comment')
+        create_notification(self.user1, None, 'new_learning_content', 'New topic')
+        Notification.objects.filter(recipient=self.user1, actor=self.user2).update(is_read=True)
+        self.assertTrue(Notification.objects.filter(object_id=post.id, actor_count=1).exists())
+    
+    def test_values_serializer_matches_notification_serializer(self):
+        """Test that fast-path JSON is byte-identical to NotificationSerializer."""
+        request = Request(APIRequestFactory().get('/api/v1/notifications/'))
+        now = timezone.now()
+        queryset = Notification.objects.filter(recipient=self.user1).select_related(
+            'actor', 'actor__profile', 'content_type'
+        ).order_by('is_read', '-created_at')
+        slow = NotificationSerializer(queryset, many=True, context={'request': request, 'now': now}).data
+        fast_serializer = NotificationValuesSerializer(context={'request': request, 'now': now})
+        fast = fast_serializer.serialize(fast_serializer.get_queryset(queryset))
+        self.assertEqual(len(fast), 2)
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(slow))
+    
+    def test_sparse_fieldset_skips_fast_path_and_joins(self):
+        """Test that ?fields= prunes the inbox and its joins."""
+        client = APIClient()
+        client.force_authenticate(self.user1)
+        with self.assertNumQueries(2):
+            response = client.get('/api/v1/notifications/?fields=id,is_read,actor.username')
+        results = response.json()['results']
+        self.assertEqual(list(results[0]), ['id', 'actor', 'is_read'])
+        self.assertEqual({result['actor']['username'] for result in results if result['actor']}, {'user2'})
+        
+        response = client.get('/api/v1/notifications/?omit=actor,related_object_type')
+        self.assertNotIn('actor', response.json()['results'][0])
+        self.assertIn('message', response.json()['results'][0])
+
+
+class BackgroundSideEffectTests(TestCase):
+    """Tests for notification side effects running after commit."""
+    
+    def setUp(self):
+        metrics.reset()
+        self.user1 = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.user2 = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        self.post = Post.objects.create(author=self.user1, content='Post')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user2)
+    
+    @override_settings(BACKGROUND_TASKS_EAGER=False)
+    def test_comment_side_effects_wait_for_commit(self):
+        """Test that the comment request only queues its side effects."""
+        # No worker threads: tasks stay queued until run by hand
+        pool = BackgroundQueue(workers=0)
+        pool.start = lambda: None
+        with mock.patch('config.background.get_queue', return_value=pool):
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post(
+                    f'/api/v1/posts/{self.post.id}/comments/', {'content': 'Nice'}
+                )
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(callbacks), 1)
+            self.assertFalse(Notification.objects.filter(recipient=self.user1).exists())
+            
+            callbacks[0]()
+            self.assertEqual(pool.tasks.qsize(), 1)
+            func, args, kwargs, _ = pool.tasks.get_nowait()
+            pool.run(func, args, kwargs)
+        
+        self.assertTrue(Notification.objects.filter(
+            recipient=self.user1, notification_type='comment_on_post'
+        ).exists())
+        self.assertTrue(Activity.objects.filter(action_type='comment_created').exists())
+    
+    def test_failed_task_is_retried(self):
+        """Test that a failing task is retried until it succeeds."""
+        attempts = []
+        
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RuntimeError('transient')
+        
+        BackgroundQueue(max_retries=3, retry_delay=0).run(flaky, (), {})
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(metrics.get_counter('background.retried'), 2)
+        self.assertEqual(metrics.get_counter('background.completed'), 1)
+    
+    def test_full_queue_runs_inline(self):
+        """Test that overflow runs the task instead of dropping it."""
+        pool = BackgroundQueue(workers=0, max_size=1)
+        ran = []
+        self.assertTrue(pool.submit(ran.append, 1))
+        self.assertFalse(pool.submit(ran.append, 2))
+        self.assertEqual(ran, [2])
+        self.assertEqual(metrics.get_counter('background.overflow'), 1)
+    
+    def test_worker_drains_queue(self):
+        """Test that worker threads run queued tasks."""
+        pool = BackgroundQueue(workers=1)
+        ran = []
+        for i in range(5):
+            pool.submit(ran.append, i)
+        self.assertTrue(pool.join(timeout=5))
+        self.assertEqual(ran, [0, 1, 2, 3, 4])
+
+
+class BroadcastTests(TestCase):
+    """Tests for bulk broadcast notifications."""
+    
+    def setUp(self):
+        metrics.reset()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@test.com', password='pass')
+            for i in range(4)
+        ]
+        User.objects.filter(pk=self.users[3].pk).update(is_active=False)
+        self.section = LearningSection.objects.create(
+            section_id='basics', title='Basics', description='Start here', icon='🏓'
+        )
+    
+    def make_topic(self, topic_id='grip'):
+        return LearningTopic.objects.create(
+            section=self.section, topic_id=topic_id, title='Grip', description='How to hold', content='...'
+        )
+    
+    def test_publishing_topic_notifies_active_users(self):
+        """Test that a new topic reaches every active user once."""
+        topic = self.make_topic()
+        notifications = Notification.objects.filter(notification_type='new_learning_content')
+        self.assertEqual(
+            set(notifications.values_list('recipient', flat=True)),
+            {user.pk for user in self.users[:3]}
+        )
+        self.assertEqual(notifications.first().message, 'New in Basics: Grip')
+        self.assertEqual(notifications.first().related_object, topic)
+        broadcast = Broadcast.objects.get()
+        self.assertEqual(broadcast.status, 'completed')
+        self.assertEqual(broadcast.delivered_count, 3)
+        self.assertEqual(metrics.get_counter('notifications.broadcast.rows'), 3)
+    
+    def test_delivery_resumes_from_checkpoint(self):
+        """Test that an interrupted broadcast continues after its checkpoint."""
+        with suppress_broadcasts():
+            topic = self.make_topic()
+        self.assertFalse(Notification.objects.exists())
+        broadcast = get_or_create_broadcast('new_learning_content', 'New topic', related_object=topic)
+        Broadcast.objects.filter(pk=broadcast.pk).update(
+            status='running', last_recipient_id=self.users[0].pk
+        )
+        
+        delivered, _ = deliver_broadcast(broadcast, batch_size=1)
+        self.assertEqual(delivered, 2)
+        self.assertFalse(Notification.objects.filter(recipient=self.users[0]).exists())
+        self.assertEqual(broadcast.status, 'completed')
+        self.assertEqual(deliver_broadcast(broadcast)[0], 0)
+    
+    def test_rerun_does_not_duplicate(self):
+        """Test that already delivered recipients are skipped by the constraint."""
+        with suppress_broadcasts():
+            topic = self.make_topic()
+        broadcast = get_or_create_broadcast('new_learning_content', 'New topic', related_object=topic)
+        deliver_broadcast(broadcast)
+        Broadcast.objects.filter(pk=broadcast.pk).update(status='pending', last_recipient_id=0)
+        deliver_broadcast(broadcast)
+        self.assertEqual(Notification.objects.count(), 3)
+    
+    def test_command_resumes_pending_broadcasts(self):
+        """Test that deliver_broadcasts finishes incomplete broadcasts."""
+        with suppress_broadcasts():
+            topic = self.make_topic()
+        get_or_create_broadcast('new_learning_content', 'New topic', related_object=topic)
+        out = StringIO()
+        call_command('deliver_broadcasts', stdout=out)
+        self.assertIn('delivered to 3 user(s)', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 3)
+
+
+class UnreadCounterTests(TestCase):
+    """Tests for the maintained per-user unread counter."""
+    
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.user2 = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        self.first = create_notification(self.user1, self.user2, 'comment_on_post', 'First')
+        self.second = create_notification(self.user1, None, 'new_learning_content', 'Second')
+    
+    def stored_count(self, user):
+        return UnreadCounter.objects.get(user=user).count
+    
+    def test_new_user_gets_counter(self):
+        """Test that signup creates a zeroed counter."""
+        self.assertEqual(self.stored_count(self.user2), 0)
+    
+    def test_endpoint_reads_counter(self):
+        """Test that the unread-count endpoint is one primary key lookup."""
+        client = APIClient()
+        client.force_authenticate(self.user1)
+        with self.assertNumQueries(1):
+            response = client.get('/api/v1/notifications/unread-count/')
+        self.assertEqual(response.json(), {'count': 2})
+    
+    def test_deleting_user_with_unread_notifications(self):
+        """Test that the cascade does not recreate the deleted user's counter."""
+        post = Post.objects.create(author=self.user1, content='Post')
+        Comment.objects.create(post=post, author=self.user2, content='Comment')
+        self.user1.delete()
+        self.assertFalse(UnreadCounter.objects.filter(user_id=self.user1.id).exists())
+        self.assertFalse(Notification.objects.filter(recipient_id=self.user1.id).exists())
+    
+    def test_mark_read_paths_update_counter(self):
+        """Test that only unread -> read transitions decrement."""
+        self.assertTrue(mark_notification_as_read(self.first.id, self.user1))
+        self.assertEqual(self.stored_count(self.user1), 1)
+        self.assertTrue(mark_notification_as_read(self.first.id, self.user1))
+        self.assertEqual(self.stored_count(self.user1), 1)
+        self.assertFalse(mark_notification_as_read(self.first.id, self.user2))
+        
+        create_notification(self.user1, self.user2, 'comment_reply', 'Third')
+        self.assertEqual(mark_all_notifications_as_read(self.user1), 2)
+        self.assertEqual(self.stored_count(self.user1), 0)
+    
+    def test_deleting_unread_notification_decrements(self):
+        """Test that deleting an unread notification is uncounted."""
+        self.second.delete()
+        self.assertEqual(get_unread_count(self.user1), 1)
+    
+    def test_broadcast_counts_new_rows(self):
+        """Test that bulk broadcasts bump counters for new rows only."""
+        section = LearningSection.objects.create(section_id='basics', title='Basics', description='-', icon='-')
+        topic = LearningTopic.objects.create(
+            section=section, topic_id='grip', title='Grip', description='-', content='-'
+        )
+        self.assertEqual(self.stored_count(self.user1), 3)
+        self.assertEqual(self.stored_count(self.user2), 1)
+        broadcast = Broadcast.objects.get()
+        Broadcast.objects.filter(pk=broadcast.pk).update(status='pending', last_recipient_id=0)
+        deliver_broadcast(broadcast)
+        self.assertEqual(self.stored_count(self.user1), 3)
+        self.assertEqual(topic.pk, broadcast.object_id)
+    
+    def test_reconcile_fixes_drift(self):
+        """Test that reconcile_unread_counts repairs drifted and missing counters."""
+        UnreadCounter.objects.filter(user=self.user1).update(count=7)
+        UnreadCounter.objects.filter(user=self.user2).delete()
+        out = StringIO()
+        call_command('reconcile_unread_counts', stdout=out)
+        self.assertIn('fixed 2', out.getvalue())
+        self.assertEqual(self.stored_count(self.user1), 2)
+        self.assertEqual(self.stored_count(self.user2), 0)
+    
+    def test_missing_counter_is_rebuilt_on_read(self):
+        """Test that a missing counter row is recounted on demand."""
+        UnreadCounter.objects.filter(user=self.user1).delete()
+        self.assertEqual(get_unread_count(self.user1), 2)
+        self.assertEqual(self.stored_count(self.user1), 2)
+
+
+def parse_sse(chunk):
+    """Return the fields of one SSE chunk as a dict."""
+    fields = {}
+    for line in chunk.decode().strip().split('\n'):
+        name, _, value = line.partition(': ')
+        fields[name] = value
+    if 'data' in fields:
+        fields['data'] = json.loads(fields['data'])
+    return fields
+
+
+class DigestNotificationTests(TestCase):
+    """Tests for folding notifications about one target into a digest."""
+    
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', email='author@test.com', password='pass')
+        self.commenters = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@test.com', password='pass')
+            for i in range(5)
+        ]
+        self.post = Post.objects.create(author=self.author, content='Post')
+    
+    def comment(self, user, parent=None):
+        return Comment.objects.create(post=self.post, author=user, content='Comment', parent=parent)
+    
+    def test_comments_fold_into_one_notification(self):
+        """Test that five commenters produce one row with an actor count."""
+        for user in self.commenters:
+            self.comment(user)
+        
+        notification = Notification.objects.get(recipient=self.author)
+        last = self.commenters[-1]
+        self.assertEqual(notification.actor_count, 5)
+        self.assertEqual(notification.actor, last)
+        self.assertEqual(notification.related_object, self.post)
+        self.assertEqual(
+            notification.message, f'{last.profile.display_name} and 4 others commented on your post'
+        )
+        self.assertEqual(
+            [actor['username'] for actor in notification.recent_actors], ['user4', 'user3', 'user2']
+        )
+        self.assertEqual(get_unread_count(self.author), 1)
+    
+    def test_repeat_actor_is_counted_once(self):
+        """Test that an actor commenting again does not inflate the count."""
+        first, second = self.commenters[:2]
+        self.comment(first)
+        self.comment(second)
+        self.comment(first)
+        
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.message, f'{first.profile.display_name} and 1 other commented on your post')
+        self.assertEqual([actor['username'] for actor in notification.recent_actors], ['user0', 'user1'])
+    
+    def test_read_digest_is_not_reopened(self):
+        """Test that a comment after the digest was read starts a new one."""
+        self.comment(self.commenters[0])
+        notification = Notification.objects.get(recipient=self.author)
+        mark_notification_as_read(notification.id, self.author)
+        self.comment(self.commenters[1])
+        
+        self.assertEqual(Notification.objects.filter(recipient=self.author).count(), 2)
+        latest = Notification.objects.get(recipient=self.author, is_read=False)
+        self.assertEqual(latest.actor_count, 1)
+        self.assertEqual(get_unread_count(self.author), 1)
+    
+    def test_replies_fold_per_parent_comment(self):
+        """Test that replies are grouped by the comment they answer."""
+        parent = self.comment(self.commenters[0])
+        other = self.comment(self.commenters[0])
+        self.comment(self.commenters[1], parent=parent)
+        self.comment(self.commenters[2], parent=parent)
+        self.comment(self.commenters[3], parent=other)
+        
+        replies = Notification.objects.filter(
+            recipient=self.commenters[0], notification_type='comment_reply'
+        ).order_by('actor_count')
+        self.assertEqual([(n.object_id, n.actor_count) for n in replies], [(other.id, 1), (parent.id, 2)])
+
+
+class RetentionTests(TestCase):
+    """Tests for the notification and activity retention policy."""
+    
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.user2 = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        self.now = timezone.now()
+    
+    def notification(self, notification_type, message, days_old, is_read=False):
+        notification = create_notification(self.user1, self.user2, notification_type, message)
+        if is_read:
+            mark_notification_as_read(notification.id, self.user1)
+        Notification.objects.filter(pk=notification.pk).update(
+            created_at=self.now - timedelta(days=days_old)
+        )
+        return notification
+    
+    def test_prunes_by_type_and_read_state(self):
+        """Test that each type and read state has its own retention."""
+        self.notification('comment_on_post', 'Old read', 100, is_read=True)
+        self.notification('comment_on_post', 'Old unread', 100)
+        self.notification('comment_reply', 'Ancient unread', 400)
+        self.notification('comment_reply', 'Recent read', 10, is_read=True)
+        self.notification('new_learning_content', 'Old news', 40, is_read=True)
+        self.assertEqual(get_unread_count(self.user1), 2)
+        
+        deleted, _ = prune_notifications(batch_size=1, now=self.now)
+        
+        self.assertEqual(deleted, 3)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('message', flat=True)), ['Old unread', 'Recent read']
+        )
+        self.assertEqual(get_unread_count(self.user1), 1)
+    
+    @override_settings(ACTIVITY_RETENTION_DAYS=30)
+    def test_prunes_activities(self):
+        """Test that activities past their retention are deleted."""
+        old = create_activity(self.user1, 'post_created', 'post', 1)
+        create_activity(self.user1, 'post_created', 'post', 2)
+        Activity.objects.filter(pk=old.pk).update(created_at=self.now - timedelta(days=31))
+        
+        deleted, _ = prune_activities(now=self.now)
+        self.assertEqual(deleted, 1)
+        self.assertEqual(list(Activity.objects.values_list('target_id', flat=True)), [2])
+    
+    def test_dry_run_deletes_nothing(self):
+        """Test that --dry-run only reports what would be deleted."""
+        self.notification('comment_on_post', 'Old read', 100, is_read=True)
+        out = StringIO()
+        call_command('prune_notifications', '--dry-run', stdout=out)
+        self.assertIn('Would delete 1 read comment_on_post notification(s).', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 1)
+        
+        out = StringIO()
+        call_command('prune_notifications', '--pause', '0', stdout=out)
+        self.assertIn('Deleted 1 notification row(s)', out.getvalue())
+        self.assertFalse(Notification.objects.exists())
+
+
+class InboxCursorTests(TestCase):
+    """Tests for keyset pagination of the unread and read inbox sections."""
+    
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.user2 = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        self.unread = [
+            create_notification(self.user1, None, 'new_learning_content', f'Unread {i}') for i in range(5)
+        ]
+        self.read = [
+            create_notification(self.user1, None, 'new_learning_content', f'Read {i}') for i in range(3)
+        ]
+        Notification.objects.filter(pk__in=[n.pk for n in self.read]).update(is_read=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user1)
+    
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.json()['results'])
+            url = response.json()['next']
+        return ids
+    
+    def test_sections_have_separate_cursors(self):
+        """Test that each section pages newest first and holds only its rows."""
+        unread = self.walk('/api/v1/notifications/?section=unread&cursor=&page_size=2')
+        read = self.walk('/api/v1/notifications/?section=read&cursor=&page_size=2')
+        self.assertEqual(unread, [n.id for n in reversed(self.unread)])
+        self.assertEqual(read, [n.id for n in reversed(self.read)])
+    
+    def test_cursor_pages_with_sparse_fieldset(self):
+        """Test that pruned rows still carry the keyset columns."""
+        response = self.client.get('/api/v1/notifications/?section=unread&cursor=&page_size=2&fields=id')
+        self.assertEqual(response.json()['results'], [{'id': self.unread[4].id}, {'id': self.unread[3].id}])
+        self.assertIsNotNone(response.json()['next'])
+    
+    def test_page_numbers_still_work(self):
+        """Test that clients without a cursor keep page-number pagination."""
+        response = self.client.get('/api/v1/notifications/')
+        self.assertEqual(response.json()['count'], 8)
+        self.assertFalse(response.json()['results'][0]['is_read'])
+        self.assertTrue(response.json()['results'][-1]['is_read'])
+    
+    def test_rejects_unknown_section(self):
+        """Test that an unknown section is a validation error."""
+        response = self.client.get('/api/v1/notifications/?section=archived')
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkMarkReadTests(TestCase):
+    """Tests for marking notifications as read by ids and by watermark."""
+    
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.user2 = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        post = Post.objects.create(author=self.user1, content='Post')
+        Comment.objects.create(post=post, author=self.user2, content='Comment')
+        self.notifications = list(Notification.objects.filter(recipient=self.user1)) + [
+            create_notification(self.user1, None, 'new_learning_content', f'New {i}') for i in range(3)
+        ]
+        self.others = create_notification(self.user2, None, 'new_learning_content', 'Not yours')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user1)
+    
+    def test_marks_ids_and_returns_rows(self):
+        """Test that the updated rows come back exactly as the list shows them."""
+        ids = [self.notifications[0].id, self.notifications[2].id, self.others.id]
+        response = self.client.post('/api/v1/notifications/read/', {'ids': ids}, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+        listed = {item['id']: item for item in self.client.get('/api/v1/notifications/').json()['results']}
+        self.assertEqual(response.json()['results'], [listed[ids[1]], listed[ids[0]]])
+        self.assertTrue(listed[ids[0]]['is_read'])
+        self.assertEqual(listed[ids[0]]['actor']['username'], 'user2')
+        self.assertEqual(get_unread_count(self.user1), 2)
+        self.assertFalse(Notification.objects.get(pk=self.others.pk).is_read)
+    
+    def test_marks_up_to_watermark(self):
+        """Test that id and timestamp watermarks mark everything up to them."""
+        response = self.client.post(
+            '/api/v1/notifications/read/', {'up_to_id': self.notifications[1].id}, format='json'
+        )
+        self.assertEqual(response.json()['count'], 2)
+        
+        response = self.client.post(
+            '/api/v1/notifications/read/', {'up_to': timezone.now().isoformat()}, format='json'
+        )
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(get_unread_count(self.user1), 0)
+        self.assertFalse(Notification.objects.get(pk=self.others.pk).is_read)
+    
+    def test_requires_exactly_one_selector(self):
+        """Test that ids and watermarks cannot be combined or left out."""
+        for body in ({}, {'ids': [1], 'up_to_id': 1}, {'ids': []}):
+            response = self.client.post('/api/v1/notifications/read/', body, format='json')
+            self.assertEqual(response.status_code, 400)
+    
+    def test_single_mark_as_read(self):
+        """Test that PATCH .../read/ flips one row and tolerates repeats."""
+        notification = self.notifications[0]
+        for _ in range(2):
+            response = self.client.patch(f'/api/v1/notifications/{notification.id}/read/')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()['is_read'])
+            self.assertEqual(response.json()['id'], notification.id)
+        self.assertEqual(get_unread_count(self.user1), 3)
+        
+        response = self.client.patch(f'/api/v1/notifications/{self.others.id}/read/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ActivityBufferTests(TestCase):
+    """Tests for the batched activity writer."""
+    
+    def setUp(self):
+        metrics.reset()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir)
+    
+    def make_buffer(self, **kwargs):
+        buffer = ActivityBuffer(**kwargs)
+        # No timer thread: flushes happen on size or by hand
+        buffer.start = lambda: None
+        return buffer
+    
+    def test_flushes_when_full(self):
+        """Test that a full batch is written with one bulk insert."""
+        buffer = self.make_buffer(max_size=3)
+        buffer.append(self.user.id, 'post_created', 'post', 1)
+        buffer.append(self.user.id, 'post_created', 'post', 2)
+        self.assertEqual(Activity.objects.count(), 0)
+        
+        with CaptureQueriesContext(connection) as queries:
+            buffer.append(self.user.id, 'post_created', 'post', 3)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Activity.objects.count(), 3)
+        self.assertEqual(metrics.get_counter('activities.buffer.flushed'), 3)
+        self.assertIn('activities.buffer.flush_latency', metrics.snapshot()['timings'])
+    
+    def test_keeps_original_timestamps(self):
+        """Test that flushed rows keep the time they were recorded."""
+        buffer = self.make_buffer()
+        happened = timezone.now() - timedelta(minutes=5)
+        buffer.append(self.user.id, 'post_created', 'post', 1, created_at=happened)
+        buffer.flush()
+        self.assertEqual(Activity.objects.get().created_at, happened)
+    
+    def test_failed_flush_retains_and_bounds_records(self):
+        """Test that records survive a failed flush, up to max_pending."""
+        buffer = self.make_buffer(max_pending=2)
+        for target_id in range(3):
+            buffer.append(self.user.id, 'post_created', 'post', target_id)
+        self.assertEqual(metrics.get_counter('activities.buffer.dropped'), 1)
+        
+        with mock.patch.object(Activity.objects, 'bulk_create', side_effect=RuntimeError('down')):
+            with self.assertLogs('notifications.activity_buffer', 'ERROR'):
+                self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(sorted(Activity.objects.values_list('target_id', flat=True)), [1, 2])
+    
+    def test_rejected_record_does_not_block_others(self):
+        """Test that a record with a deleted actor is dropped, not retried forever."""
+        buffer = self.make_buffer()
+        buffer.append(self.user.id + 1000, 'post_created', 'post', 1)
+        buffer.append(self.user.id, 'post_created', 'post', 2)
+        with self.assertLogs('notifications.activity_buffer', 'WARNING'):
+            self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(buffer.records, [])
+        self.assertEqual(list(Activity.objects.values_list('target_id', flat=True)), [2])
+        self.assertEqual(metrics.get_counter('activities.buffer.dropped'), 1)
+    
+    def test_spool_of_same_pid_predecessor_is_recovered(self):
+        """Test that a restart with the same pid keeps the old spool's records."""
+        buffer = self.make_buffer(spool_dir=self.spool_dir)
+        buffer.append(self.user.id, 'comment_created', 'comment', 7)
+        buffer.spool.close()
+        
+        restarted = self.make_buffer(spool_dir=self.spool_dir)
+        self.assertEqual(len(restarted.records), 1)
+        restarted.append(self.user.id, 'comment_created', 'comment', 8)
+        self.assertEqual(restarted.flush(), 2)
+        self.assertEqual(sorted(Activity.objects.values_list('target_id', flat=True)), [7, 8])
+        restarted.spool.close()
+    
+    def test_spool_is_adopted_after_a_crash(self):
+        """Test that a new buffer writes what a dead process had spooled."""
+        buffer = self.make_buffer(spool_dir=self.spool_dir)
+        buffer.append(self.user.id, 'comment_created', 'comment', 7)
+        buffer.spool.close()
+        # Pretend the spool belongs to a process that has exited
+        os.rename(buffer.spool_path, os.path.join(self.spool_dir, 'activities-999999999.jsonl'))
+        
+        recovered = self.make_buffer(spool_dir=self.spool_dir)
+        self.assertEqual(metrics.get_counter('activities.buffer.recovered'), 1)
+        recovered.flush()
+        self.assertEqual(Activity.objects.get().target_id, 7)
+        self.assertEqual(os.listdir(self.spool_dir), [os.path.basename(recovered.spool_path)])
+        with open(recovered.spool_path) as spool:
+            self.assertEqual(spool.read(), '')
+        recovered.spool.close()
+    
+    @override_settings(ACTIVITY_BUFFER_INTERVAL=60, ACTIVITY_BUFFER_SPOOL_DIR='')
+    def test_shutdown_flushes_after_background_tasks(self):
+        """Test that exit drains queued tasks before flushing their activities."""
+        pool = BackgroundQueue(workers=1)
+        
+        def slow_task(target_id):
+            time.sleep(0.01)
+            get_buffer().append(self.user.id, 'post_created', 'post', target_id)
+        
+        with mock.patch('config.background._queue', pool), \
+                mock.patch('config.background._shutdown_hooks', []), \
+                mock.patch('notifications.activity_buffer._buffer', None):
+            for target_id in range(5):
+                pool.submit(slow_task, target_id)
+            background.shutdown()
+        self.assertEqual(sorted(Activity.objects.values_list('target_id', flat=True)), list(range(5)))
+    
+    @override_settings(ACTIVITY_BUFFER_ENABLED=True)
+    def test_comment_activity_is_buffered_after_commit(self):
+        """Test that task activities go through the buffer on commit."""
+        buffer = self.make_buffer()
+        post = Post.objects.create(author=self.user, content='Post')
+        with mock.patch('notifications.services.get_buffer', return_value=buffer):
+            with self.captureOnCommitCallbacks(execute=True):
+                Comment.objects.create(post=post, author=self.user, content='Comment')
+        self.assertEqual(len(buffer.records), 1)
+        self.assertFalse(Activity.objects.filter(action_type='comment_created').exists())
+        buffer.flush()
+        self.assertTrue(Activity.objects.filter(action_type='comment_created', target_type='comment').exists())
+
+
+class NotificationStreamTests(TestCase):
+    """Tests for the Server-Sent Events notification stream."""
+    
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.user2 = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        self.first = create_notification(self.user1, self.user2, 'comment_on_post', 'First')
+        self.token = str(AccessToken.for_user(self.user1))
+    
+    async def open_stream(self, **extra):
+        request = AsyncRequestFactory().get('/api/v1/notifications/stream/', {'token': self.token}, **extra)
+        response = await notification_stream(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response.streaming_content
+    
+    async def test_rejects_wsgi_requests(self):
+        """Test that the stream fails fast instead of hanging under WSGI."""
+        request = RequestFactory().get('/api/v1/notifications/stream/', {'token': self.token})
+        response = await notification_stream(request)
+        self.assertEqual(response.status_code, 501)
+    
+    async def test_requires_valid_token(self):
+        """Test that streams without a valid JWT are rejected."""
+        request = AsyncRequestFactory().get('/api/v1/notifications/stream/', {'token': 'bad'})
+        response = await notification_stream(request)
+        self.assertEqual(response.status_code, 401)
+    
+    async def test_ends_when_token_expires(self):
+        """Test that an open stream does not outlive its access token."""
+        stream = await self.open_stream()
+        try:
+            await anext(stream)
+            await anext(stream)
+            expiry = AccessToken(self.token)['exp']
+            with mock.patch('notifications.views.time') as clock:
+                clock.time.return_value = expiry + 1
+                self.assertEqual(parse_sse(await anext(stream))['event'], 'token_expired')
+                with self.assertRaises(StopAsyncIteration):
+                    await anext(stream)
+        finally:
+            await stream.aclose()
+    
+    async def test_pushes_new_notifications(self):
+        """Test that the stream starts with the count and pushes new rows."""
+        stream = await self.open_stream()
+        try:
+            self.assertTrue((await anext(stream)).startswith(b'retry: '))
+            self.assertEqual(parse_sse(await anext(stream))['data'], {'count': 1})
+            
+            def notify():
+                with self.captureOnCommitCallbacks(execute=True):
+                    return create_notification(self.user1, self.user2, 'comment_reply', 'Second')
+            second = await sync_to_async(notify)()
+            
+            events = [parse_sse(await anext(stream)) for _ in range(2)]
+            by_type = {event['event']: event for event in events}
+            self.assertEqual(by_type['unread_count']['data'], {'count': 2})
+            self.assertEqual(by_type['notification']['id'], str(second.id))
+            self.assertEqual(by_type['notification']['data']['message'], 'Second')
+        finally:
+            await stream.aclose()
+        # The inner generator is finalized by the event loop once released
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.assertFalse(get_broker().subscriptions.get(self.user1.id))
+    
+    async def test_resumes_from_last_event_id(self):
+        """Test that Last-Event-ID replays the notifications after it."""
+        second = await sync_to_async(create_notification)(self.user1, self.user2, 'comment_reply', 'Second')
+        stream = await self.open_stream(headers={'Last-Event-ID': str(self.first.id)})
+        try:
+            await anext(stream)
+            replayed = parse_sse(await anext(stream))
+            self.assertEqual(replayed['event'], 'notification')
+            self.assertEqual(replayed['id'], str(second.id))
+            self.assertEqual(parse_sse(await anext(stream))['data'], {'count': 2})
+        finally:
+            await stream.aclose()
+    
+    async def test_pushes_digest_updates_without_id(self):
+        """Test that a digest gaining an actor is pushed again, id-less."""
+        post = await sync_to_async(Post.objects.create)(author=self.user1, content='Post')
+        digest_id, _ = await sync_to_async(upsert_digest_notification)(
+            self.user1, self.user2, 'comment_on_post', 'commented on your post', post
+        )
+        user3 = await sync_to_async(User.objects.create_user)(
+            username='user3', email='user3@test.com', password='pass'
+        )
+        stream = await self.open_stream()
+        try:
+            await anext(stream)
+            self.assertEqual(parse_sse(await anext(stream))['data'], {'count': 2})
+            
+            def fold():
+                with self.captureOnCommitCallbacks(execute=True):
+                    upsert_digest_notification(self.user1, user3, 'comment_on_post', 'commented on your post', post)
+            await sync_to_async(fold)()
+            
+            event = parse_sse(await anext(stream))
+            self.assertEqual(event['event'], 'notification')
+            self.assertNotIn('id', event)
+            self.assertEqual(event['data']['id'], digest_id)
+            self.assertEqual(event['data']['actor_count'], 2)
+        finally:
+            await stream.aclose()
+    
+    @override_settings(NOTIFICATION_STREAM_HEARTBEAT=0.01)
+    async def test_sends_heartbeats(self):
+        """Test that idle streams send heartbeat comments."""
+        stream = await self.open_stream()
+        try:
+            await anext(stream)
+            await anext(stream)
+            self.assertEqual(await anext(stream), b': heartbeat\n\n')
+        finally:
+            await stream.aclose()
@@ -1,34 +1,76 @@
+import asyncio
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from config.fastpath import FastListMixin
+from config.renderers import ORJSONRenderer
+from config.sparse_fields import SparseFieldsetViewMixin
+from .events import OVERFLOW, get_broker
 from .models import Notification
-from .serializers import NotificationSerializer, NotificationMarkReadSerializer
-from .services import mark_notification_as_read, mark_all_notifications_as_read, get_unread_count
+from .pagination import InboxPagination
+from .serializers import (
+    NotificationSerializer,
+    NotificationValuesSerializer,
+    NotificationMarkReadSerializer,
+    NotificationBulkReadSerializer,
+)
+from .services import (
+    mark_notification_as_read,
+    mark_notifications_as_read,
+    mark_all_notifications_as_read,
+    get_unread_count,
+)
 
 
-class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+class NotificationViewSet(SparseFieldsetViewMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for Notification model.
     
     list: Get paginated notifications (unread first, then read)
     retrieve: Get single notification
     mark_as_read: Mark single notification as read
+    mark_read: Mark notifications as read by ids or watermark
     mark_all_read: Mark all notifications as read
     unread_count: Get count of unread notifications
+    
+    `?section=unread` or `?section=read` limits the list to one section of
+    the inbox. With `?cursor=` the list is keyset paginated newest first,
+    so clients page the unread and read sections with separate cursors.
     """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = NotificationSerializer
+    fast_serializer_class = NotificationValuesSerializer
+    pagination_class = InboxPagination
+    # Keyset pagination reads these from every row
+    sparse_required_fields = ('created_at',)
+    
+    SECTIONS = {'unread': False, 'read': True}
     
     def get_queryset(self):
         """
-        Return notifications for the current user.
+        Return notifications for the current user, optionally one section.
         Ordered by unread first, then by created_at descending.
         """
-        return Notification.objects.filter(
+        queryset = Notification.objects.filter(
             recipient=self.request.user
         ).select_related(
             'actor', 'actor__profile', 'content_type'
         ).order_by('is_read', '-created_at')
+        
+        section = self.request.query_params.get('section')
+        if section is not None and self.action == 'list':
+            if section not in self.SECTIONS:
+                raise ValidationError({'section': 'Must be "unread" or "read".'})
+            queryset = queryset.filter(is_read=self.SECTIONS[section])
+        return queryset
     
     @action(detail=True, methods=['patch'], url_path='read')
     def mark_as_read(self, request, pk=None):
@@ -36,11 +78,17 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         Mark a single notification as read.
         PATCH /api/v1/notifications/:id/read
         """
+        # An unread notification is flipped and returned by one statement
+        if pk.isdigit() and self.use_fast_list():
+            rows = mark_notifications_as_read(request.user, ids=[int(pk)])
+            if rows:
+                serializer = NotificationValuesSerializer(context=self.get_serializer_context())
+                return Response(serializer.serialize(rows)[0])
+        
         notification = self.get_object()
         success = mark_notification_as_read(notification.id, request.user)
         
         if success:
-            serializer = self.get_serializer(notification)
             # Refresh from database to get updated is_read value
             notification.refresh_from_db()
             serializer = self.get_serializer(notification)
@@ -51,6 +99,24 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    @action(detail=False, methods=['post'], url_path='read')
+    def mark_read(self, request):
+        """
+        Mark several notifications as read in one statement.
+        POST /api/v1/notifications/read
+        Body: {"ids": [...]}, {"up_to_id": id} or {"up_to": timestamp}
+        
+        Returns the notifications that were unread and are now read.
+        """
+        serializer = NotificationBulkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rows = mark_notifications_as_read(request.user, **serializer.validated_data)
+        results = NotificationValuesSerializer(context=self.get_serializer_context()).serialize(rows)
+        return Response({
+            'count': len(rows),
+            'results': results
+        })
+    
     @action(detail=False, methods=['post'], url_path='mark-all-read')
     def mark_all_read(self, request):
         """
@@ -74,3 +140,155 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({
             'count': count
         })
+
+
+# Newest notifications replayed to a stream resuming from Last-Event-ID;
+# anything older is covered by the unread count and the list endpoint
+STREAM_REPLAY_LIMIT = 100
+
+
+def format_event(event, data, event_id=None):
+    """Encode one Server-Sent Event."""
+    lines = [] if event_id is None else [f'id: {event_id}']
+    lines.append(f'event: {event}')
+    lines.append(f'data: {ORJSONRenderer().render(data).decode()}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def authenticate_stream(request):
+    """
+    Authenticate a stream request by JWT from the Authorization header or,
+    since EventSource cannot set headers, the ``token`` query parameter.
+    
+    Returns:
+        (user, expiry) with the token's ``exp`` as a Unix timestamp, or
+        (None, None) for missing or bad tokens
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else request.GET.get('token', '').encode()
+    if not raw_token:
+        return None, None
+    try:
+        token = auth.get_validated_token(raw_token)
+        user = auth.get_user(token)
+    except (InvalidToken, AuthenticationFailed):
+        return None, None
+    if not user.is_active:
+        return None, None
+    return user, token['exp']
+
+
+def load_stream_notifications(request, user, after_id=None, ids=None):
+    """Serialize notifications for the stream, oldest first."""
+    queryset = Notification.objects.filter(recipient=user).select_related(
+        'actor', 'actor__profile', 'content_type'
+    )
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    else:
+        queryset = queryset.filter(id__gt=after_id).order_by('-id')[:STREAM_REPLAY_LIMIT]
+    notifications = sorted(queryset, key=lambda notification: notification.id)
+    data = NotificationSerializer(notifications, many=True, context={'request': request}).data
+    return [(notification.id, item) for notification, item in zip(notifications, data)]
+
+
+def parse_last_event_id(request):
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of the current user's notifications.
+    GET /api/v1/notifications/stream/?token=<access token>
+    
+    Sends `notification` events (id = notification id) as they are
+    created, id-less ones when a digest gains an actor, and
+    `unread_count` events whenever the count changes. A reconnecting
+    client's Last-Event-ID replays what it missed. Comment lines are
+    sent as heartbeats. When the access token expires the stream sends
+    `token_expired` and ends, so the client refreshes its token and
+    reconnects. Must be served through ASGI (e.g. uvicorn); under WSGI
+    it answers 501.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the endless iterator would be buffered forever; fail
+        # fast so the client falls back to polling
+        return JsonResponse(
+            {'detail': 'The notification stream requires an ASGI server.'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    
+    user, expiry = await sync_to_async(authenticate_stream)(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided or are invalid.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    last_id = parse_last_event_id(request)
+    
+    async def events():
+        broker = get_broker()
+        # Subscribe before reading the database so nothing falls in between
+        subscription = broker.subscribe(user.id)
+        nonlocal last_id
+        try:
+            yield f'retry: {settings.NOTIFICATION_STREAM_RETRY_MS}\n\n'
+            if last_id is not None:
+                for notification_id, data in await sync_to_async(load_stream_notifications)(
+                    request, user, after_id=last_id
+                ):
+                    last_id = notification_id
+                    yield format_event('notification', data, event_id=notification_id)
+            count = await sync_to_async(get_unread_count)(user)
+            yield format_event('unread_count', {'count': count})
+            
+            while True:
+                # Authenticated once at open, so never outlive the token
+                remaining = expiry - time.time()
+                if remaining <= 0:
+                    yield format_event('token_expired', {})
+                    return
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.get(),
+                        timeout=min(settings.NOTIFICATION_STREAM_HEARTBEAT, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    if expiry > time.time():
+                        yield ': heartbeat\n\n'
+                    continue
+                if event is OVERFLOW:
+                    # Too far behind; the client reconnects and resumes
+                    return
+                if event['type'] == 'notification' and event.get('updated'):
+                    # A digest that gained an actor; its id was sent before,
+                    # so it carries none and leaves Last-Event-ID alone
+                    for _, data in await sync_to_async(load_stream_notifications)(
+                        request, user, ids=[event['id']]
+                    ):
+                        yield format_event('notification', data)
+                elif event['type'] == 'notification':
+                    if last_id is not None and event['id'] <= last_id:
+                        continue
+                    for notification_id, data in await sync_to_async(load_stream_notifications)(
+                        request, user, ids=[event['id']]
+                    ):
+                        last_id = max(last_id or 0, notification_id)
+                        yield format_event('notification', data, event_id=notification_id)
+                elif event['type'] == 'unread_count':
+                    count = await sync_to_async(get_unread_count)(user)
+                    yield format_event('unread_count', {'count': count})
+        finally:
+            broker.unsubscribe(subscription)
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,166 @@
+"""
+Response cache for the anonymous feed.
+
+Cached pages are keyed by a feed generation counter plus the full request
+tuple (host, path and query parameters). Any post or comment write bumps
+the generation, which orphans every cached page at once instead of
+tracking which pages a write touched.
+
+Individual feed rows are also cached as serialized fragments. A fragment
+key carries everything the row's JSON depends on (post id, updated_at,
+comment count, the author's version counter and the response variant),
+so edits never need to delete fragments: they simply stop being asked
+for and expire.
+
+Facet counts only depend on posts, so they have their own generation,
+bumped by post writes but not by comments.
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import urlencode
+from config import metrics
+from config.sparse_fields import FIELDS_QUERY_PARAM, OMIT_QUERY_PARAM
+
+FEED_GENERATION_KEY = 'posts:feed:generation'
+FACETS_GENERATION_KEY = 'posts:facets:generation'
+AUTHOR_VERSION_KEY = 'posts:author:{}:version'
+
+
+def get_generation(key):
+    """
+    Return the current value of a generation counter.
+    A missing counter (first use or eviction) is seeded from the clock in
+    microseconds, so it never falls back to a value already used for
+    cached pages.
+    """
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(key):
+    """Move a generation counter on, orphaning everything cached under it."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Counter was evicted; reseeding from the clock moves past it
+        get_generation(key)
+
+
+def get_feed_generation():
+    """Return the current feed generation."""
+    return get_generation(FEED_GENERATION_KEY)
+
+
+def bump_feed_generation():
+    """Invalidate every cached feed page."""
+    bump_generation(FEED_GENERATION_KEY)
+
+
+def get_facets_generation():
+    """Return the current facets generation (only posts affect facets)."""
+    return get_generation(FACETS_GENERATION_KEY)
+
+
+def bump_facets_generation():
+    """Invalidate every cached facet count."""
+    bump_generation(FACETS_GENERATION_KEY)
+
+
+def feed_request_digest(request):
+    """Hash the request tuple (host, path, sorted query parameters)."""
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    raw = f'{request.get_host()}{request.path}?{params}'
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def feed_cache_key(request, generation=None, namespace='list'):
+    """Build the cache key for a feed request under a feed generation."""
+    if generation is None:
+        generation = get_feed_generation()
+    return f'posts:feed:{namespace}:{generation}:{feed_request_digest(request)}'
+
+
+def get_author_versions(user_ids):
+    """
+    Return ``{user_id: version}`` for the given authors in one multi-get.
+    Missing counters are seeded from the clock, like the feed generation.
+    """
+    keys = {AUTHOR_VERSION_KEY.format(user_id): user_id for user_id in user_ids}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    missing = [key for key in keys if key not in found]
+    if missing:
+        seed = time.time_ns() // 1000
+        cache.set_many({key: seed for key in missing}, timeout=None)
+        versions.update({keys[key]: seed for key in missing})
+    return versions
+
+
+def bump_author_version(user_id):
+    """Invalidate every cached fragment that embeds this author."""
+    try:
+        cache.incr(AUTHOR_VERSION_KEY.format(user_id))
+    except ValueError:
+        # Counter was evicted; the next read reseeds it past any old value
+        pass
+
+
+def fragment_variant(request):
+    """
+    Hash the request details a fragment depends on besides the post:
+    the host (absolute avatar URLs) and the sparse fieldset.
+    """
+    if request is None:
+        return 'none'
+    params = [
+        request.query_params.get(FIELDS_QUERY_PARAM, ''),
+        request.query_params.get(OMIT_QUERY_PARAM, ''),
+    ]
+    raw = f'{request.get_host()}|{"|".join(params)}'
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def get_post_fragments(posts, serialize, variant):
+    """
+    Return the serialized dict of every post, reading cached fragments
+    with one multi-get and serializing only the misses.
+
+    Args:
+        posts: Post instances carrying updated_at, comment_count and author_id
+        serialize: Callable building the representation of one post
+        variant: Response variant from fragment_variant()
+
+    Returns:
+        list: One dict per post, in order
+    """
+    versions = get_author_versions({post.author_id for post in posts})
+    keys = [
+        'posts:fragment:{}:{}:{}:{}:{}'.format(
+            post.pk,
+            post.updated_at.timestamp(),
+            post.comment_count,
+            versions[post.author_id],
+            variant,
+        )
+        for post in posts
+    ]
+    cached = cache.get_many(keys)
+
+    fragments = []
+    misses = {}
+    for key, post in zip(keys, posts):
+        fragment = cached.get(key)
+        if fragment is None:
+            fragment = misses[key] = serialize(post)
+        fragments.append(fragment)
+    if misses:
+        cache.set_many(misses, settings.FRAGMENT_CACHE_TIMEOUT)
+
+    metrics.increment('posts.fragment_cache.hit', len(cached))
+    metrics.increment('posts.fragment_cache.miss', len(misses))
+    return fragments
@@ -0,0 +1,63 @@
+"""
+Management command to build home timelines for posts that predate fan-out.
+"""
+from django.core.management.base import BaseCommand
+from posts.models import Post
+from posts.timelines import (
+    TIMELINE_MAX_ENTRIES,
+    fan_out_post,
+    get_timeline_audience,
+    trim_timelines,
+)
+
+
+class Command(BaseCommand):
+    help = 'Fan existing posts out into home timelines, newest first, then trim to the cap'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts to read per batch',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Only backfill the newest N posts (defaults to all)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        limit = options['limit']
+        audiences = {}
+        touched = set()
+        processed = 0
+        last_id = None
+
+        while limit is None or processed < limit:
+            # Newest first, so the entries that survive trimming are written first
+            queryset = Post.objects.order_by('-id').only('id', 'author_id', 'created_at')
+            if last_id is not None:
+                queryset = queryset.filter(id__lt=last_id)
+            size = batch_size if limit is None else min(batch_size, limit - processed)
+            batch = list(queryset[:size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            for post in batch:
+                # Audience depends only on the author, so compute it once each
+                if post.author_id not in audiences:
+                    audiences[post.author_id] = get_timeline_audience(post)
+                fan_out_post(post, audience=audiences[post.author_id])
+                touched.update(audiences[post.author_id])
+            processed += len(batch)
+            self.stdout.write(f'Backfilled {processed} post(s)...')
+
+        trimmed = trim_timelines(touched, TIMELINE_MAX_ENTRIES)
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {processed} post(s) into {len(touched)} timeline(s), '
+            f'trimmed {trimmed} old entr{"y" if trimmed == 1 else "ies"}.'
+        ))
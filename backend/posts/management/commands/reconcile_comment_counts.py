@@ -0,0 +1,56 @@
+"""
+Management command to repair drift in the denormalized Post.comment_count.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from posts.models import Post, Comment
+
+
+class Command(BaseCommand):
+    help = 'Recount comments per post in batches and fix any drifted comment_count values'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of posts to reconcile per batch',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        checked = 0
+        fixed = 0
+
+        while True:
+            # Walk posts by primary key so each batch is an index range scan
+            batch = list(
+                Post.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', 'comment_count')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            checked += len(batch)
+
+            actual = dict(
+                Comment.objects.filter(post_id__in=[pk for pk, _ in batch])
+                .order_by()
+                .values_list('post_id')
+                .annotate(total=Count('id'))
+            )
+            for pk, stored in batch:
+                expected = actual.get(pk, 0)
+                if stored == expected:
+                    continue
+                # Only overwrite the value we read, so a comment that lands
+                # mid-batch (and bumps the counter itself) is not clobbered
+                fixed += Post.objects.filter(pk=pk, comment_count=stored).update(
+                    comment_count=expected
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} post(s), fixed {fixed} drifted comment count(s).'
+        ))
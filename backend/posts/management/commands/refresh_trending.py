@@ -0,0 +1,35 @@
+"""
+Management command to refresh trending post scores.
+Meant to run on a schedule (e.g. every minute from cron).
+"""
+import time
+from django.core.management.base import BaseCommand
+from posts.trending import refresh_trending_scores
+
+
+class Command(BaseCommand):
+    help = 'Rescore posts whose comments or activity changed since the last refresh'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rescore every recent post instead of only stale ones',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts rescored per batch',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rescored, pruned = refresh_trending_scores(
+            full=options['full'],
+            batch_size=options['batch_size'],
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rescored {rescored} post(s), pruned {pruned} expired score(s) in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending_score', serialize=False, to='posts.post')),
+                ('score', models.FloatField()),
+                ('recent_comments', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'trending_scores',
+                'indexes': [models.Index(fields=['score', 'post'], name='trending_score_idx'), models.Index(fields=['refreshed_at'], name='trending_refreshed_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-17 23:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_trendingscore'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['post_type', 'created_at', 'id'], name='posts_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['related_skill', 'created_at', 'id'], name='posts_skill_created_idx'),
+        ),
+    ]
@@ -1,5 +1,19 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+
+# Text search configuration used for both stored vectors and queries
+SEARCH_CONFIG = 'english'
+
+
+class DeferSearchVectorManager(models.Manager):
+    """
+    Leave the stored tsvector out of ordinary reads; it is only needed in
+    WHERE/ORDER BY clauses of search queries, never in serialized output.
+    """
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
 
 
 class Post(models.Model):
@@ -38,12 +52,30 @@ class Post(models.Model):
         blank=True,
         null=True
     )
+    # Maintained by posts.signals; repair drift with reconcile_comment_counts
+    comment_count = models.PositiveIntegerField(default=0)
+    # Computed by Postgres on every write to `content`
+    search_vector = models.GeneratedField(
+        expression=SearchVector('content', config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DeferSearchVectorManager()
+
     class Meta:
         db_table = 'posts'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination walks the feed on (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='posts_created_id_idx'),
+            # Filtered feeds stay index-ordered
+            models.Index(fields=['post_type', 'created_at', 'id'], name='posts_type_created_idx'),
+            models.Index(fields=['related_skill', 'created_at', 'id'], name='posts_skill_created_idx'),
+            GinIndex(fields=['search_vector'], name='posts_search_vector_idx'),
+        ]
 
     def __str__(self):
         return f"{self.author.username} - {self.post_type} - {self.created_at.strftime('%Y-%m-%d')}"
@@ -52,7 +84,14 @@ class Post(models.Model):
 class Comment(models.Model):
     """
     Comment model for post discussions.
+    Replies link to their parent comment. Each comment also stores a
+    materialized `path` of zero-padded ancestor ids ending in its own id
+    (e.g. "0000000012/0000000057"), so a whole subtree is one prefix
+    range scan and ordering by path yields depth-first thread order.
     """
+    PATH_SEGMENT_WIDTH = 10
+    MAX_DEPTH = 20
+    
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -63,13 +102,112 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         related_name='comments'
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        related_name='replies',
+        null=True,
+        blank=True
+    )
+    path = models.CharField(max_length=255, blank=True, default='')
+    depth = models.PositiveSmallIntegerField(default=0)
     content = models.TextField()
+    search_vector = models.GeneratedField(
+        expression=SearchVector('content', config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DeferSearchVectorManager()
+
     class Meta:
         db_table = 'comments'
         ordering = ['created_at']
+        indexes = [
+            # Comment pages walk one post's thread on (created_at, id)
+            models.Index(fields=['post', 'created_at', 'id'], name='comments_post_created_id_idx'),
+            # pattern_ops lets `path LIKE 'prefix/%'` use the index under any collation
+            models.Index(fields=['path'], name='comments_path_idx', opclasses=['varchar_pattern_ops']),
+            GinIndex(fields=['search_vector'], name='comments_search_vector_idx'),
+        ]
 
     def __str__(self):
         return f"{self.author.username} on {self.post.id} - {self.created_at.strftime('%Y-%m-%d')}"
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if adding and self.parent_id:
+            self.depth = self.parent.depth + 1
+        super().save(*args, **kwargs)
+        if adding and not self.path:
+            # The path ends in our own id, which only exists after the insert
+            segment = f'{self.pk:0{self.PATH_SEGMENT_WIDTH}d}'
+            self.path = f'{self.parent.path}/{segment}' if self.parent_id else segment
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+    def get_descendants(self):
+        """Return every reply below this comment with a single range query."""
+        return Comment.objects.filter(path__startswith=f'{self.path}/')
+
+
+class TimelineEntry(models.Model):
+    """
+    Precomputed home timeline row: `post` appears in `user`'s timeline.
+    Rows are fanned out when a post is created (see posts.timelines) and
+    read back with one range scan over (user, created_at, post).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    # Copied from the post so the timeline orders without joining posts
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'timelines'
+        ordering = ['-created_at', '-post']
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'post'], name='timelines_user_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry')
+        ]
+        verbose_name_plural = 'Timeline entries'
+
+    def __str__(self):
+        return f"{self.user_id} <- post {self.post_id}"
+
+
+class TrendingScore(models.Model):
+    """
+    Precomputed "hot" ranking score for a recent post.
+    Written only by posts.trending.refresh_trending_scores, so reading the
+    trending feed is a plain index scan on score.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending_score'
+    )
+    score = models.FloatField()
+    recent_comments = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'trending_scores'
+        indexes = [
+            models.Index(fields=['score', 'post'], name='trending_score_idx'),
+            models.Index(fields=['refreshed_at'], name='trending_refreshed_idx'),
+        ]
+
+    def __str__(self):
+        return f"post {self.post_id}: {self.score:.4f}"
@@ -0,0 +1,30 @@
+from config.pagination import KeysetPagination
+
+
+class CommentPagination(KeysetPagination):
+    """
+    Keyset pagination for a post's comment thread, oldest first.
+    """
+    ordering = ('created_at', 'id')
+
+
+class TimelinePagination(KeysetPagination):
+    """
+    Keyset pagination over a user's precomputed timeline entries.
+    """
+    ordering = ('-created_at', '-post_id')
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Keyset pagination over search results, best match first.
+    Expects the queryset to be annotated with `rank`.
+    """
+    ordering = ('-rank', '-id')
+
+
+class TrendingPagination(KeysetPagination):
+    """
+    Keyset pagination over precomputed trending scores, hottest first.
+    """
+    ordering = ('-score', '-post_id')
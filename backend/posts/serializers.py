@@ -1,11 +1,20 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.utils.urls import replace_query_param
+from config.fastpath import ValuesSerializer
+from config.identity_map import IdentityMapMixin
+from config.serializer_fields import RelativeTimestampField, format_relative_timestamp, get_serialization_now
+from config.sparse_fields import SparseFieldsetMixin
+from profiles.models import Profile
+from .cache import fragment_variant, get_post_fragments
 from .models import Post, Comment
+from .pagination import CommentPagination
 
 User = get_user_model()
 
 
-class CommentAuthorSerializer(serializers.ModelSerializer):
+class CommentAuthorSerializer(IdentityMapMixin, serializers.ModelSerializer):
     """
     Nested serializer for comment author information.
     """
@@ -22,36 +31,15 @@ class CommentSerializer(serializers.ModelSerializer):
     Serializer for Comment model with nested author info.
     """
     author = CommentAuthorSerializer(read_only=True)
-    formatted_timestamp = serializers.SerializerMethodField()
+    formatted_timestamp = RelativeTimestampField()
     
     class Meta:
         model = Comment
-        fields = ('id', 'author', 'content', 'created_at', 'formatted_timestamp')
-        read_only_fields = ('id', 'created_at', 'author')
-    
-    def get_formatted_timestamp(self, obj):
-        """Return human-readable timestamp."""
-        from django.utils import timezone
-        now = timezone.now()
-        diff = now - obj.created_at
-        
-        seconds = diff.total_seconds()
-        if seconds < 60:
-            return 'just now'
-        elif seconds < 3600:
-            minutes = int(seconds / 60)
-            return f'{minutes} {"minute" if minutes == 1 else "minutes"} ago'
-        elif seconds < 86400:
-            hours = int(seconds / 3600)
-            return f'{hours} {"hour" if hours == 1 else "hours"} ago'
-        elif seconds < 604800:
-            days = int(seconds / 86400)
-            return f'{days} {"day" if days == 1 else "days"} ago'
-        else:
-            return obj.created_at.strftime('%B %d, %Y')
-
-
-class PostAuthorSerializer(serializers.ModelSerializer):
+        fields = ('id', 'author', 'parent', 'depth', 'content', 'created_at', 'formatted_timestamp')
+        read_only_fields = ('id', 'created_at', 'author', 'parent', 'depth')
+
+
+class PostAuthorSerializer(IdentityMapMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Nested serializer for post author information.
     """
@@ -64,14 +52,35 @@ class PostAuthorSerializer(serializers.ModelSerializer):
         fields = ('username', 'display_name', 'avatar', 'playing_level')
 
 
-class PostListSerializer(serializers.ModelSerializer):
+class PostFragmentListSerializer(serializers.ListSerializer):
+    """
+    List serializer that reuses cached per-post fragments.
+    formatted_timestamp depends on the current time, so it is recomputed
+    for every row instead of being served from the cache.
+    """
+    
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        fragments = get_post_fragments(
+            posts,
+            self.child.to_representation,
+            fragment_variant(self.context.get('request')),
+        )
+        now = get_serialization_now(self.context)
+        for post, fragment in zip(posts, fragments):
+            if 'formatted_timestamp' in fragment:
+                fragment['formatted_timestamp'] = format_relative_timestamp(post.created_at, now)
+        return fragments
+
+
+class PostListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for Post list view (feed).
     Includes author info and comment count, but not full comments.
     """
     author = PostAuthorSerializer(read_only=True)
     comment_count = serializers.SerializerMethodField()
-    formatted_timestamp = serializers.SerializerMethodField()
+    formatted_timestamp = RelativeTimestampField()
     
     class Meta:
         model = Post
@@ -80,88 +89,85 @@ class PostListSerializer(serializers.ModelSerializer):
             'comment_count', 'created_at', 'formatted_timestamp'
         )
         read_only_fields = ('id', 'created_at', 'author')
+        sparse_sources = {'comment_count': ('comment_count',)}
+        list_serializer_class = PostFragmentListSerializer
     
     def get_comment_count(self, obj):
-        """
-        Return comment count from annotated queryset or calculate it.
-        Uses annotated value if available (from queryset), otherwise counts directly.
-        """
-        # Check if the value was annotated in the queryset
-        if hasattr(obj, 'comment_count'):
-            return obj.comment_count
-        # Fallback to counting directly
-        return obj.comments.count()
-    
-    def get_formatted_timestamp(self, obj):
-        """Return human-readable timestamp."""
-        from django.utils import timezone
-        now = timezone.now()
-        diff = now - obj.created_at
-        
-        seconds = diff.total_seconds()
-        if seconds < 60:
-            return 'just now'
-        elif seconds < 3600:
-            minutes = int(seconds / 60)
-            return f'{minutes} {"minute" if minutes == 1 else "minutes"} ago'
-        elif seconds < 86400:
-            hours = int(seconds / 3600)
-            return f'{hours} {"hour" if hours == 1 else "hours"} ago'
-        elif seconds < 604800:
-            days = int(seconds / 86400)
-            return f'{days} {"day" if days == 1 else "days"} ago'
-        else:
-            return obj.created_at.strftime('%B %d, %Y')
+        """Return the denormalized comment count stored on the post."""
+        return obj.comment_count
+
+
+class PostListValuesSerializer(ValuesSerializer):
+    """
+    Fast path for the feed: same JSON as PostListSerializer, built from
+    .values() rows.
+    """
+    columns = (
+        'id', 'content', 'post_type', 'related_skill', 'comment_count', 'created_at',
+        'author__username', 'author__profile__id', 'author__profile__display_name',
+        'author__profile__avatar', 'author__profile__playing_level',
+    )
+    avatar_storage = Profile._meta.get_field('avatar').storage
+    
+    def build_author(self, row):
+        author = {'username': row['author__username']}
+        # DRF skips profile-sourced fields when the profile row is missing
+        if row['author__profile__id'] is not None:
+            author['display_name'] = row['author__profile__display_name']
+            author['avatar'] = self.file_url(row['author__profile__avatar'], self.avatar_storage)
+            author['playing_level'] = row['author__profile__playing_level']
+        return author
+    
+    def build_row(self, row):
+        return {
+            'id': row['id'],
+            'author': self.build_author(row),
+            'content': row['content'],
+            'post_type': row['post_type'],
+            'related_skill': row['related_skill'],
+            'comment_count': row['comment_count'],
+            'created_at': self.datetime(row['created_at']),
+            'formatted_timestamp': self.timestamp(row['created_at']),
+        }
 
 
 class PostDetailSerializer(serializers.ModelSerializer):
     """
-    Serializer for single Post view with all comments.
+    Serializer for single Post view with the first page of comments.
+    Expects the post to carry a `preview_comments` prefetch; `comments_next`
+    links to the comments endpoint for the rest of the thread.
     """
     author = PostAuthorSerializer(read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = CommentSerializer(source='preview_comments', many=True, read_only=True)
+    comments_next = serializers.SerializerMethodField()
     comment_count = serializers.SerializerMethodField()
-    formatted_timestamp = serializers.SerializerMethodField()
+    formatted_timestamp = RelativeTimestampField()
     
     class Meta:
         model = Post
         fields = (
             'id', 'author', 'content', 'post_type', 'related_skill',
-            'comments', 'comment_count', 'created_at', 'formatted_timestamp'
+            'comments', 'comments_next', 'comment_count', 'created_at',
+            'formatted_timestamp'
         )
         read_only_fields = ('id', 'created_at', 'author')
     
+    def get_comments_next(self, obj):
+        """Return a cursor link to the comments after the preview, if any."""
+        preview = obj.preview_comments
+        if not preview or obj.comment_count <= len(preview):
+            return None
+        paginator = CommentPagination()
+        url = reverse('posts:post-comments-list', kwargs={'post_pk': obj.pk})
+        request = self.context.get('request')
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        cursor = paginator.encode_cursor(paginator.get_position(preview[-1]))
+        return replace_query_param(url, paginator.cursor_query_param, cursor)
+    
     def get_comment_count(self, obj):
-        """
-        Return comment count from annotated queryset or calculate it.
-        Uses annotated value if available (from queryset), otherwise counts directly.
-        """
-        # Check if the value was annotated in the queryset
-        if hasattr(obj, 'comment_count'):
-            return obj.comment_count
-        # Fallback to counting directly
-        return obj.comments.count()
-    
-    def get_formatted_timestamp(self, obj):
-        """Return human-readable timestamp."""
-        from django.utils import timezone
-        now = timezone.now()
-        diff = now - obj.created_at
-        
-        seconds = diff.total_seconds()
-        if seconds < 60:
-            return 'just now'
-        elif seconds < 3600:
-            minutes = int(seconds / 60)
-            return f'{minutes} {"minute" if minutes == 1 else "minutes"} ago'
-        elif seconds < 86400:
-            hours = int(seconds / 3600)
-            return f'{hours} {"hour" if hours == 1 else "hours"} ago'
-        elif seconds < 604800:
-            days = int(seconds / 86400)
-            return f'{days} {"day" if days == 1 else "days"} ago'
-        else:
-            return obj.created_at.strftime('%B %d, %Y')
+        """Return the denormalized comment count stored on the post."""
+        return obj.comment_count
 
 
 class PostCreateSerializer(serializers.ModelSerializer):
@@ -209,9 +215,15 @@ class CommentCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating comments.
     """
+    parent = serializers.PrimaryKeyRelatedField(
+        queryset=Comment.objects.all(),
+        required=False,
+        allow_null=True
+    )
+    
     class Meta:
         model = Comment
-        fields = ('content',)
+        fields = ('content', 'parent')
     
     def validate_content(self, value):
         """Validate that content is not empty."""
@@ -221,6 +233,16 @@ class CommentCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Content is too long (max 2000 characters).")
         return value.strip()
     
+    def validate_parent(self, value):
+        """Validate that a reply targets a comment on the same post."""
+        if value is None:
+            return value
+        if str(value.post_id) != str(self.context['post_id']):
+            raise serializers.ValidationError("Parent comment belongs to a different post.")
+        if value.depth >= Comment.MAX_DEPTH:
+            raise serializers.ValidationError("Reply thread is nested too deeply.")
+        return value
+    
     def create(self, validated_data):
         """Create comment with current user as author."""
         validated_data['author'] = self.context['request'].user
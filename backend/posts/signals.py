@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from profiles.models import Profile
+from .cache import bump_author_version, bump_facets_generation, bump_feed_generation
+from .models import Post, Comment
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """
+    Keep Post.comment_count in step with new comments.
+    Uses an F() expression so concurrent comments cannot lose updates.
+    """
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+        bump_feed_generation()
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """
+    Keep Post.comment_count in step with deleted comments.
+    The guard keeps the unsigned column from going negative after drift.
+    """
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1
+    )
+    bump_feed_generation()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_feed_cache(sender, instance, **kwargs):
+    """Drop cached feed pages and facets whenever a post is written or deleted."""
+    bump_feed_generation()
+    bump_facets_generation()
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_feed_on_profile_change(sender, instance, created, **kwargs):
+    """Author names and avatars are part of every feed page and fragment."""
+    if not created:
+        bump_author_version(instance.user_id)
+        bump_feed_generation()
+
+
+@receiver(pre_save, sender=User)
+def detect_username_change(sender, instance, update_fields=None, **kwargs):
+    """
+    Note whether this save changes the username. Most User saves (e.g.
+    last_login on every login) leave it alone and must not invalidate.
+    """
+    instance._username_changed = False
+    if instance.pk is None or (update_fields is not None and 'username' not in update_fields):
+        return
+    stored = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+    instance._username_changed = stored is not None and stored != instance.username
+
+
+@receiver(post_save, sender=User)
+def invalidate_fragments_on_user_change(sender, instance, created, **kwargs):
+    """Usernames are embedded in cached post fragments and feed pages."""
+    if not created and getattr(instance, '_username_changed', False):
+        bump_author_version(instance.pk)
+        bump_feed_generation()
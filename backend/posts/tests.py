@@ -1,3 +1,865 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import status
+from config import metrics
+from config.renderers import MessagePackRenderer, ORJSONRenderer
+from config.serializer_fields import format_relative_timestamp
+from notifications.models import Activity
+from .models import Post, Comment, TimelineEntry
+from .serializers import PostListSerializer, PostListValuesSerializer
+from .timelines import TIMELINE_AUDIENCE_WINDOW, trim_timelines
+from .trending import refresh_trending_scores
+from .views import COMMENT_PREVIEW_SIZE
 
-# Create your tests here.
+User = get_user_model()
+
+
+class PostFeedPaginationTests(TestCase):
+    """Tests for page-number and keyset pagination of the feed."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.feed_url = '/api/v1/posts/'
+        self.user1 = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.user2 = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        for i in range(25):
+            Post.objects.create(
+                author=self.user1 if i % 2 else self.user2,
+                content=f'Post {i}',
+                post_type='tip' if i % 3 else 'achievement',
+            )
+
+    def collect_cursor_pages(self, url):
+        """Follow next links until the feed is exhausted."""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_page_number_mode_is_default(self):
+        """Test that old clients still get page-number pagination."""
+        response = self.client.get(self.feed_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_cursor_mode_walks_whole_feed(self):
+        """Test that cursor pages cover every post once, newest first."""
+        ids = self.collect_cursor_pages(f'{self.feed_url}?cursor=&page_size=7')
+        expected = list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_cursor_mode_honors_filters(self):
+        """Test that author and post_type filters apply in cursor mode."""
+        ids = self.collect_cursor_pages(
+            f'{self.feed_url}?cursor=&page_size=3&author=user1&post_type=tip'
+        )
+        expected = list(
+            Post.objects.filter(author=self.user1, post_type='tip')
+            .order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor returns 404."""
+        for cursor in ('not-a-cursor', 'W3t9LDFd', 'WyJ4IiwgMV0', 'WyIyMDI0LTAxLTAxVDAwOjAwOjAwWiIsICJ4Il0'):
+            response = self.client.get(f'{self.feed_url}?cursor={cursor}')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, cursor)
+
+
+class CommentCountTests(TestCase):
+    """Tests for the denormalized Post.comment_count column."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.post = Post.objects.create(author=self.user, content='Post')
+
+    def test_counter_tracks_create_and_delete(self):
+        """Test that comment creation and deletion adjust the counter."""
+        first = Comment.objects.create(post=self.post, author=self.user, content='One')
+        Comment.objects.create(post=self.post, author=self.user, content='Two')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+
+        first.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_reconcile_command_fixes_drift(self):
+        """Test that reconcile_comment_counts repairs drifted values."""
+        Comment.objects.create(post=self.post, author=self.user, content='One')
+        Post.objects.filter(pk=self.post.pk).update(comment_count=7)
+
+        call_command('reconcile_comment_counts', batch_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_feed_reads_counter(self):
+        """Test that the feed serves the stored counter."""
+        Comment.objects.create(post=self.post, author=self.user, content='One')
+        response = APIClient().get('/api/v1/posts/')
+        self.assertEqual(response.data['results'][0]['comment_count'], 1)
+
+
+class CommentPaginationTests(TestCase):
+    """Tests for the comment preview on post detail and the comments endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.post = Post.objects.create(author=self.user, content='Post')
+        self.commenters = [
+            User.objects.create_user(username=f'commenter{i}', email=f'c{i}@test.com', password='pass')
+            for i in range(5)
+        ]
+        for i in range(COMMENT_PREVIEW_SIZE + 15):
+            Comment.objects.create(
+                post=self.post,
+                author=self.commenters[i % 5],
+                content=f'Comment {i}',
+            )
+        self.expected_ids = list(
+            Comment.objects.filter(post=self.post)
+            .order_by('created_at', 'id').values_list('id', flat=True)
+        )
+
+    def test_detail_embeds_preview_and_cursor(self):
+        """Test that post detail only embeds the first page of comments."""
+        response = self.client.get(f'/api/v1/posts/{self.post.pk}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [comment['id'] for comment in response.data['comments']]
+        self.assertEqual(ids, self.expected_ids[:COMMENT_PREVIEW_SIZE])
+        self.assertEqual(response.data['comment_count'], len(self.expected_ids))
+        self.assertIn('cursor=', response.data['comments_next'])
+
+    def test_comments_endpoint_continues_from_preview(self):
+        """Test that following comments_next yields the rest of the thread."""
+        response = self.client.get(f'/api/v1/posts/{self.post.pk}/')
+        ids = [comment['id'] for comment in response.data['comments']]
+        url = response.data['comments_next']
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(comment['id'] for comment in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, self.expected_ids)
+
+    def test_comment_page_query_count_is_constant(self):
+        """Test that a comment page loads authors without N+1 queries."""
+        # One existence check for the post, one query for the page
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/v1/posts/{self.post.pk}/comments/?page_size=20')
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_comments_for_missing_post(self):
+        """Test that listing comments of a missing post returns 404."""
+        response = self.client.get('/api/v1/posts/999999/comments/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CommentThreadingTests(TestCase):
+    """Tests for parent links and materialized comment paths."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.post = Post.objects.create(author=self.user, content='Post')
+        self.root = Comment.objects.create(post=self.post, author=self.user, content='Root')
+        self.reply = Comment.objects.create(post=self.post, author=self.user, content='Reply', parent=self.root)
+        self.nested = Comment.objects.create(post=self.post, author=self.user, content='Nested', parent=self.reply)
+        self.other = Comment.objects.create(post=self.post, author=self.user, content='Other')
+
+    def test_path_and_depth(self):
+        """Test that paths extend the parent path and depth counts ancestors."""
+        self.nested.refresh_from_db()
+        self.assertEqual(self.nested.depth, 2)
+        self.assertEqual(self.nested.path, f'{self.root.path}/{self.reply.pk:010d}/{self.nested.pk:010d}')
+
+    def test_subtree_query(self):
+        """Test that descendants come back from a single prefix query."""
+        with self.assertNumQueries(1):
+            ids = set(self.root.get_descendants().values_list('id', flat=True))
+        self.assertEqual(ids, {self.reply.pk, self.nested.pk})
+
+    def test_thread_filter_on_comments_endpoint(self):
+        """Test that ?thread= returns only replies below a comment."""
+        response = self.client.get(f'/api/v1/posts/{self.post.pk}/comments/?thread={self.root.pk}')
+        ids = [comment['id'] for comment in response.data['results']]
+        self.assertEqual(ids, [self.reply.pk, self.nested.pk])
+
+    def test_comments_of_malformed_post_id(self):
+        """Test that a non-numeric post id is a 404, not a server error."""
+        response = self.client.get('/api/v1/posts/abc/comments/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_thread_filter_rejects_non_integer(self):
+        """Test that a non-numeric ?thread= is a 400, not a server error."""
+        response = self.client.get(f'/api/v1/posts/{self.post.pk}/comments/?thread=abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reply_to_comment_on_other_post_rejected(self):
+        """Test that a reply cannot point at another post's comment."""
+        other_post = Post.objects.create(author=self.user, content='Other post')
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            f'/api/v1/posts/{other_post.pk}/comments/',
+            {'content': 'Reply', 'parent': self.root.pk},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TimelineTests(TestCase):
+    """Tests for fan-out-on-write home timelines."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', email='author@test.com', password='pass')
+        self.reader = User.objects.create_user(username='reader', email='reader@test.com', password='pass')
+        self.stranger = User.objects.create_user(username='stranger', email='stranger@test.com', password='pass')
+        first = Post.objects.create(author=self.author, content='First')
+        Comment.objects.create(post=first, author=self.reader, content='Nice')
+
+    def test_post_fans_out_to_audience(self):
+        """Test that new posts reach the author and engaged readers only."""
+        post = Post.objects.create(author=self.author, content='Second')
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+        self.assertTrue(TimelineEntry.objects.filter(user=self.author, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(user=self.stranger, post=post).exists())
+
+    def test_timeline_endpoint_pages_newest_first(self):
+        """Test that the timeline endpoint reads back entries by cursor."""
+        posts = [Post.objects.create(author=self.author, content=f'Post {i}') for i in range(5)]
+        self.client.force_authenticate(user=self.reader)
+        ids = []
+        url = '/api/v1/posts/timeline/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, [post.id for post in reversed(posts)])
+
+    def test_trim_keeps_newest_entries(self):
+        """Test that trimming drops entries beyond the per-user cap."""
+        posts = [Post.objects.create(author=self.author, content=f'Post {i}') for i in range(4)]
+        trim_timelines([self.reader.id], max_entries=2)
+        kept = set(TimelineEntry.objects.filter(user=self.reader).values_list('post_id', flat=True))
+        self.assertEqual(kept, {posts[-1].id, posts[-2].id})
+
+    def test_audience_skips_stale_commenters(self):
+        """Test that only readers who commented recently receive new posts."""
+        Comment.objects.filter(author=self.reader).update(
+            created_at=timezone.now() - TIMELINE_AUDIENCE_WINDOW - timedelta(days=1)
+        )
+        post = Post.objects.create(author=self.author, content='Second')
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+
+    def test_audience_is_capped(self):
+        """Test that the audience keeps only the most recent commenters."""
+        first = Post.objects.get(content='First')
+        latest = User.objects.create_user(username='latest', email='latest@test.com', password='pass')
+        Comment.objects.create(post=first, author=latest, content='Me too')
+        with mock.patch('posts.timelines.TIMELINE_AUDIENCE_LIMIT', 1):
+            post = Post.objects.create(author=self.author, content='Second')
+        readers = set(TimelineEntry.objects.filter(post=post).values_list('user_id', flat=True))
+        self.assertEqual(readers, {self.author.id, latest.id})
+
+    def test_fan_out_trims_full_timelines(self):
+        """Test that fan-out trims timelines in its slice that are over the cap."""
+        with mock.patch('posts.timelines.TIMELINE_MAX_ENTRIES', 2), \
+                mock.patch('posts.timelines.TIMELINE_TRIM_EVERY', 1):
+            posts = [Post.objects.create(author=self.author, content=f'Post {i}') for i in range(3)]
+        kept = set(TimelineEntry.objects.filter(user=self.reader).values_list('post_id', flat=True))
+        self.assertEqual(kept, {posts[-1].id, posts[-2].id})
+
+    def test_fan_out_only_checks_its_slice(self):
+        """Test that one fan-out does not probe the whole audience."""
+        with mock.patch('posts.timelines.TIMELINE_TRIM_EVERY', 2), \
+                mock.patch('posts.timelines.trim_timelines') as trim:
+            post = Post.objects.create(author=self.author, content='Second')
+        # Author and reader have consecutive ids, so exactly one is due
+        due = [user_id for user_id in (self.author.id, self.reader.id) if user_id % 2 == post.id % 2]
+        trim.assert_called_once()
+        self.assertEqual(list(trim.call_args.args[0]), due)
+
+    def test_backfill_command(self):
+        """Test that backfill_timelines rebuilds missing entries."""
+        TimelineEntry.objects.all().delete()
+        call_command('backfill_timelines', batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(),
+            Post.objects.filter(author=self.author).count()
+        )
+
+
+class PostSearchTests(TestCase):
+    """Tests for full-text search over posts and comments."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.direct = Post.objects.create(
+            author=self.user, content='Working on my backhand loop against backspin',
+            post_type='tip', related_skill='backhand'
+        )
+        self.via_comment = Post.objects.create(
+            author=self.user, content='Tournament recap', post_type='achievement'
+        )
+        Comment.objects.create(post=self.via_comment, author=self.user, content='Your loops looked great')
+        self.unrelated = Post.objects.create(author=self.user, content='Footwork drills', post_type='tip')
+
+    def search(self, query):
+        response = self.client.get(f'/api/v1/posts/search/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in response.data['results']]
+
+    def test_matches_posts_and_comments_ranked(self):
+        """Test that direct matches rank above comment-only matches."""
+        self.assertEqual(self.search('q=loop'), [self.direct.id, self.via_comment.id])
+
+    def test_search_combines_with_filters(self):
+        """Test that post_type and related_skill narrow search results."""
+        self.assertEqual(self.search('q=loop&post_type=achievement'), [self.via_comment.id])
+        self.assertEqual(self.search('q=loop&related_skill=backhand'), [self.direct.id])
+
+    def test_search_pages_by_cursor(self):
+        """Test that search results page through keyset cursors."""
+        response = self.client.get('/api/v1/posts/search/?q=loop&page_size=1')
+        self.assertEqual(response.data['results'][0]['id'], self.direct.id)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['results'][0]['id'], self.via_comment.id)
+        self.assertIsNone(response.data['next'])
+
+    def test_search_pages_through_tied_ranks(self):
+        """Test that posts with equal rank are not skipped between pages."""
+        tied = [
+            Post.objects.create(author=self.user, content='Serve loop', post_type='tip').id
+            for _ in range(5)
+        ]
+        ids = []
+        url = '/api/v1/posts/search/?q=serve&page_size=2'
+        while url:
+            response = self.client.get(url)
+            ids.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, sorted(tied, reverse=True))
+
+    def test_search_requires_query(self):
+        """Test that an empty query is rejected."""
+        response = self.client.get('/api/v1/posts/search/?q=')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FeedCacheTests(TestCase):
+    """Tests for the anonymous feed response cache."""
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.post = Post.objects.create(author=self.user, content='Post')
+
+    def test_anonymous_feed_is_cached(self):
+        """Test that repeated anonymous requests hit the cache."""
+        self.client.get('/api/v1/posts/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/posts/')
+        self.assertEqual(response.data['results'][0]['id'], self.post.id)
+        self.assertEqual(metrics.get_counter('posts.feed_cache.miss'), 1)
+        self.assertEqual(metrics.get_counter('posts.feed_cache.hit'), 1)
+
+    def test_cache_key_includes_query(self):
+        """Test that different filters are cached separately."""
+        self.client.get('/api/v1/posts/')
+        response = self.client.get('/api/v1/posts/?post_type=tip')
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(metrics.get_counter('posts.feed_cache.miss'), 2)
+
+    def test_writes_invalidate_cache(self):
+        """Test that new posts, comments and deletes show up immediately."""
+        self.client.get('/api/v1/posts/')
+        new_post = Post.objects.create(author=self.user, content='New post')
+        response = self.client.get('/api/v1/posts/')
+        self.assertEqual(response.data['results'][0]['id'], new_post.id)
+
+        Comment.objects.create(post=new_post, author=self.user, content='Comment')
+        response = self.client.get('/api/v1/posts/')
+        self.assertEqual(response.data['results'][0]['comment_count'], 1)
+
+        new_post.delete()
+        response = self.client.get('/api/v1/posts/')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_authenticated_feed_bypasses_cache(self):
+        """Test that logged-in users are not served cached pages."""
+        self.client.force_authenticate(user=self.user)
+        self.client.get('/api/v1/posts/')
+        self.assertEqual(metrics.get_counter('posts.feed_cache.miss'), 0)
+
+
+class ConditionalGetTests(TestCase):
+    """Tests for ETag/Last-Modified handling on feed and detail."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.post = Post.objects.create(author=self.user, content='Post')
+        self.client.force_authenticate(user=self.user)
+
+    def test_feed_not_modified(self):
+        """Test that an unchanged feed answers 304 without querying posts."""
+        response = self.client.get('/api/v1/posts/')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_feed_etag_changes_on_write(self):
+        """Test that a new post invalidates the feed ETag."""
+        etag = self.client.get('/api/v1/posts/')['ETag']
+        Post.objects.create(author=self.user, content='New post')
+        response = self.client.get('/api/v1/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_not_modified(self):
+        """Test that an unchanged post answers 304 after two cheap queries."""
+        url = f'/api/v1/posts/{self.post.pk}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_on_comment(self):
+        """Test that a new comment invalidates the post ETag."""
+        url = f'/api/v1/posts/{self.post.pk}/'
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.user, content='Comment')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['comments']), 1)
+
+    def test_detail_etag_changes_on_commenter_edit(self):
+        """Test that a preview commenter's profile or username edit invalidates the ETag."""
+        commenter = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        Comment.objects.create(post=self.post, author=commenter, content='Comment')
+        url = f'/api/v1/posts/{self.post.pk}/'
+        etag = self.client.get(url)['ETag']
+        commenter.profile.display_name = 'Renamed'
+        commenter.profile.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['comments'][0]['author']['display_name'], 'Renamed')
+        
+        etag = response['ETag']
+        commenter.username = 'user2b'
+        commenter.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_feed_etag_changes_on_rename(self):
+        """Test that renaming an author invalidates the feed ETag and cache."""
+        self.client.force_authenticate(user=None)
+        etag = self.client.get('/api/v1/posts/')['ETag']
+        self.user.username = 'renamed'
+        self.user.save()
+        response = self.client.get('/api/v1/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['author']['username'], 'renamed')
+
+    def test_detail_malformed_pk(self):
+        """Test that a non-numeric post id is a 404, not a server error."""
+        response = self.client.get('/api/v1/posts/abc/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_etag_depends_on_media_type(self):
+        """Test that a JSON ETag does not validate a msgpack request."""
+        for url in ('/api/v1/posts/', f'/api/v1/posts/{self.post.pk}/'):
+            response = self.client.get(url)
+            self.assertIn('Accept', response['Vary'])
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'], HTTP_ACCEPT='application/msgpack'
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['Content-Type'], 'application/msgpack')
+
+
+class TrendingTests(TestCase):
+    """Tests for precomputed trending scores."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.quiet = Post.objects.create(author=self.user, content='Quiet post')
+        self.busy = Post.objects.create(author=self.user, content='Busy post')
+        Post.objects.filter(pk=self.busy.pk).update(created_at=timezone.now() - timedelta(hours=3))
+        for i in range(50):
+            Comment.objects.create(post=self.busy, author=self.user, content=f'Comment {i}')
+
+    def trending_ids(self):
+        response = self.client.get('/api/v1/posts/trending/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in response.data['results']]
+
+    def test_velocity_outranks_recency(self):
+        """Test that a busy older post ranks above a quiet newer one."""
+        call_command('refresh_trending', stdout=StringIO())
+        self.assertEqual(self.trending_ids(), [self.busy.id, self.quiet.id])
+
+    def test_incremental_refresh_only_rescores_stale_posts(self):
+        """Test that a refresh picks up new posts without rescoring everything."""
+        earlier = timezone.now() - timedelta(hours=1)
+        Comment.objects.update(created_at=earlier)
+        Post.objects.filter(pk=self.quiet.pk).update(created_at=earlier)
+        refresh_trending_scores()
+        new_post = Post.objects.create(author=self.user, content='New post')
+        rescored, _ = refresh_trending_scores()
+        self.assertEqual(rescored, 1)
+        self.assertIn(new_post.id, self.trending_ids())
+
+    def test_refresh_finds_new_posts_without_activities(self):
+        """Test that new posts are found even before their activity is written."""
+        refresh_trending_scores()
+        new_post = Post.objects.create(author=self.user, content='New post')
+        Activity.objects.filter(target_type='post', target_id=new_post.id).delete()
+        refresh_trending_scores()
+        self.assertIn(new_post.id, self.trending_ids())
+
+    def test_old_posts_are_pruned(self):
+        """Test that posts past the max age leave the trending table."""
+        refresh_trending_scores()
+        Post.objects.filter(pk=self.quiet.pk).update(created_at=timezone.now() - timedelta(days=30))
+        refresh_trending_scores(full=True)
+        self.assertNotIn(self.quiet.id, self.trending_ids())
+
+
+class FacetTests(TestCase):
+    """Tests for feed facet counts and related_skill filtering."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        Post.objects.create(author=self.user, content='A', post_type='tip', related_skill='serve')
+        Post.objects.create(author=self.user, content='B', post_type='tip', related_skill='forehand')
+        Post.objects.create(author=self.user, content='C', post_type='struggle', related_skill='serve')
+        Post.objects.create(author=self.user, content='D', post_type='achievement')
+
+    def test_facet_counts_from_one_query(self):
+        """Test that every facet count comes back from a single query."""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/posts/facets/')
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual(response.data['post_type'], {'achievement': 1, 'struggle': 1, 'tip': 2})
+        self.assertEqual(response.data['related_skill']['serve'], 2)
+        self.assertEqual(response.data['related_skill']['backhand'], 0)
+
+    def test_facets_cached_until_post_write(self):
+        """Test that facet counts are cached and refreshed after writes."""
+        self.client.get('/api/v1/posts/facets/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/v1/posts/facets/')
+        Post.objects.create(author=self.user, content='E', post_type='tip')
+        response = self.client.get('/api/v1/posts/facets/')
+        self.assertEqual(response.data['post_type']['tip'], 3)
+
+    def test_comments_keep_facets_cached(self):
+        """Test that comments do not invalidate facet counts."""
+        self.client.get('/api/v1/posts/facets/')
+        Comment.objects.create(post=Post.objects.first(), author=self.user, content='Comment')
+        with self.assertNumQueries(0):
+            self.client.get('/api/v1/posts/facets/')
+
+    def test_feed_filters_by_related_skill(self):
+        """Test that the feed accepts a related_skill filter."""
+        response = self.client.get('/api/v1/posts/?related_skill=serve')
+        self.assertEqual(response.data['count'], 2)
+
+
+class RelativeTimestampTests(TestCase):
+    """Tests for the shared relative timestamp formatter."""
+
+    def test_buckets(self):
+        """Test each elapsed-time bucket and the date fallback."""
+        now = timezone.now()
+        cases = [
+            (timedelta(seconds=30), 'just now'),
+            (timedelta(minutes=1), '1 minute ago'),
+            (timedelta(minutes=59), '59 minutes ago'),
+            (timedelta(hours=2), '2 hours ago'),
+            (timedelta(days=1), '1 day ago'),
+            (timedelta(days=8), (now - timedelta(days=8)).strftime('%B %d, %Y')),
+        ]
+        for age, expected in cases:
+            self.assertEqual(format_relative_timestamp(now - age, now), expected)
+
+    def test_serializer_uses_one_now_per_pass(self):
+        """Test that a list is formatted against the context's reference time."""
+        user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        Post.objects.create(author=user, content='Post')
+        later = timezone.now() + timedelta(hours=3)
+        data = PostListSerializer(Post.objects.all(), many=True, context={'now': later}).data
+        self.assertEqual(data[0]['formatted_timestamp'], '3 hours ago')
+
+
+class PostFastPathTests(TestCase):
+    """Tests for the .values() fast path of the feed."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.user.profile.avatar = 'avatars/user1.png'
+        self.user.profile.playing_level = 'Advanced'
+        self.user.profile.save()
+        plain = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        Post.objects.create(author=self.user, content='Tip with ünïcode', post_type='tip', related_skill='serve')
+        old = Post.objects.create(author=plain, content='Older post')
+        Post.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=30))
+        Comment.objects.create(post=old, author=self.user, content='Comment')
+
+    def test_values_serializer_matches_post_list_serializer(self):
+        """Test that fast-path JSON is byte-identical to PostListSerializer."""
+        request = Request(APIRequestFactory().get('/api/v1/posts/'))
+        now = timezone.now()
+        queryset = Post.objects.select_related('author', 'author__profile').order_by('-created_at')
+        slow = PostListSerializer(queryset, many=True, context={'request': request, 'now': now}).data
+        fast_serializer = PostListValuesSerializer(context={'request': request, 'now': now})
+        fast = fast_serializer.serialize(fast_serializer.get_queryset(queryset))
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(slow))
+        self.assertIn('http://testserver/', fast[0]['author']['avatar'])
+
+
+class SparseFieldsetTests(TestCase):
+    """Tests for ?fields= and ?omit= on the feed."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        for i in range(3):
+            Post.objects.create(author=self.user, content=f'Post {i}')
+
+    def get_feed_sql(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        rows = [q['sql'] for q in queries.captured_queries if 'ORDER BY' in q['sql']]
+        return response.json(), rows[-1]
+
+    def test_fields_prunes_output_and_query(self):
+        """Test that ?fields= keeps only the named fields and their columns."""
+        data, sql = self.get_feed_sql('/api/v1/posts/?fields=id,author.username,content,created_at')
+        self.assertEqual(list(data['results'][0]), ['id', 'author', 'content', 'created_at'])
+        self.assertEqual(data['results'][0]['author'], {'username': 'user1'})
+        self.assertNotIn('profiles', sql)
+        self.assertNotIn('post_type', sql)
+        self.assertIn('"users"."username"', sql)
+
+    def test_omit_drops_fields_and_joins(self):
+        """Test that ?omit= removes fields, nested ones included."""
+        data, sql = self.get_feed_sql('/api/v1/posts/?omit=author,formatted_timestamp')
+        post = data['results'][0]
+        self.assertNotIn('author', post)
+        self.assertNotIn('formatted_timestamp', post)
+        self.assertIn('comment_count', post)
+        self.assertNotIn('"users"', sql)
+
+        data, sql = self.get_feed_sql('/api/v1/posts/?omit=author.avatar,author.display_name,author.playing_level')
+        self.assertEqual(data['results'][0]['author'], {'username': 'user1'})
+        self.assertNotIn('profiles', sql)
+
+    def test_fields_with_keyset_pagination(self):
+        """Test that cursor pages still work with a narrowed query."""
+        first = self.client.get('/api/v1/posts/?cursor=&page_size=2&fields=id').json()
+        self.assertEqual(list(first['results'][0]), ['id'])
+        self.assertIsNotNone(first['next'])
+        with self.assertNumQueries(1):
+            second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 1)
+
+
+class FragmentCacheTests(TestCase):
+    """Tests for the per-post serialized fragment cache."""
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.other = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        self.post = Post.objects.create(author=self.user, content='First')
+        Post.objects.create(author=self.other, content='Second')
+        self.request = Request(APIRequestFactory().get('/api/v1/posts/'))
+
+    def serialize(self, now=None):
+        queryset = Post.objects.select_related('author', 'author__profile').order_by('id')
+        context = {'request': self.request, 'now': now or timezone.now()}
+        return PostListSerializer(queryset, many=True, context=context).data
+
+    def test_second_pass_is_served_from_cache(self):
+        """Test that unchanged posts are not serialized again."""
+        first = self.serialize()
+        self.assertEqual(metrics.get_counter('posts.fragment_cache.miss'), 2)
+        second = self.serialize()
+        self.assertEqual(metrics.get_counter('posts.fragment_cache.hit'), 2)
+        self.assertEqual(JSONRenderer().render(first), JSONRenderer().render(second))
+
+    def test_profile_edit_invalidates_author_fragments(self):
+        """Test that a profile change bumps only that author's fragments."""
+        self.serialize()
+        self.user.profile.display_name = 'Renamed'
+        self.user.profile.save()
+        data = self.serialize()
+        self.assertEqual(data[0]['author']['display_name'], 'Renamed')
+        self.assertEqual(metrics.get_counter('posts.fragment_cache.miss'), 3)
+        self.assertEqual(metrics.get_counter('posts.fragment_cache.hit'), 1)
+
+    def test_username_change_invalidates_author_fragments(self):
+        """Test that renaming a user refreshes their fragments."""
+        self.serialize()
+        self.user.username = 'renamed'
+        self.user.save()
+        data = self.serialize()
+        self.assertEqual(data[0]['author']['username'], 'renamed')
+        self.assertEqual(metrics.get_counter('posts.fragment_cache.hit'), 1)
+
+    def test_login_keeps_author_fragments(self):
+        """Test that last_login and other user saves do not invalidate."""
+        self.serialize()
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=['last_login'])
+        self.user.email = 'changed@test.com'
+        self.user.save()
+        self.serialize()
+        self.assertEqual(metrics.get_counter('posts.fragment_cache.hit'), 2)
+
+    def test_new_comment_refreshes_row(self):
+        """Test that a comment count change produces a new fragment."""
+        self.serialize()
+        Comment.objects.create(post=self.post, author=self.other, content='Hi')
+        data = self.serialize()
+        self.assertEqual(data[0]['comment_count'], 1)
+
+    def test_formatted_timestamp_is_not_cached(self):
+        """Test that relative timestamps follow the clock on cache hits."""
+        self.serialize()
+        data = self.serialize(now=timezone.now() + timedelta(hours=3))
+        self.assertEqual(metrics.get_counter('posts.fragment_cache.hit'), 2)
+        self.assertEqual(data[0]['formatted_timestamp'], '3 hours ago')
+
+
+class RendererTests(TestCase):
+    """Tests for the orjson and MessagePack renderers."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        Post.objects.create(author=self.user, content='Tip with ünïcode "quotes"', post_type='tip')
+
+    def test_orjson_output_matches_json_renderer(self):
+        """Test that feed JSON is byte-identical to DRF's JSONRenderer."""
+        request = Request(APIRequestFactory().get('/api/v1/posts/'))
+        data = PostListSerializer(
+            Post.objects.select_related('author', 'author__profile'),
+            many=True,
+            context={'request': request}
+        ).data
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_orjson_handles_non_native_values(self):
+        """Test datetimes, Decimals and lazy strings like DRF's encoder."""
+        from decimal import Decimal
+        from django.utils.translation import gettext_lazy
+        data = {
+            'when': timezone.now(),
+            'amount': Decimal('1.50'),
+            'label': gettext_lazy('Post'),
+            1: 'int key',
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_orjson_escapes_line_separators(self):
+        """Test that U+2028/U+2029 are escaped like DRF's JSONRenderer."""
+        data = {'content': 'line\u2028separator\u2029paragraph'}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_orjson_falls_back_for_big_integers(self):
+        """Test that integers beyond 64 bits render instead of raising."""
+        data = {'id': 2 ** 70, 'negative': -(2 ** 70)}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_orjson_renders_nan_as_null(self):
+        """Test the one known difference: NaN/Infinity become null."""
+        data = {'nan': float('nan'), 'inf': float('inf')}
+        self.assertEqual(ORJSONRenderer().render(data), b'{"nan":null,"inf":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(data)
+
+    def test_msgpack_negotiation(self):
+        """Test that Accept: application/msgpack returns MessagePack."""
+        import msgpack
+        response = self.client.get('/api/v1/posts/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], MessagePackRenderer.media_type)
+        data = msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(data['results'][0]['content'], 'Tip with ünïcode "quotes"')
+
+    def test_msgpack_request_body(self):
+        """Test that MessagePack request bodies are parsed."""
+        import msgpack
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            '/api/v1/posts/',
+            data=msgpack.packb({'content': 'Packed post', 'post_type': 'tip'}),
+            content_type='application/msgpack'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Post.objects.filter(content='Packed post').exists())
+
+
+class IdentityMapTests(TestCase):
+    """Tests for the per-response author identity map."""
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = User.objects.create_user(username='user1', email='user1@test.com', password='pass')
+        self.other = User.objects.create_user(username='user2', email='user2@test.com', password='pass')
+        for i in range(3):
+            Post.objects.create(author=self.user, content=f'Post {i}')
+        Post.objects.create(author=self.other, content='Other')
+        self.request = Request(APIRequestFactory().get('/api/v1/posts/'))
+
+    def test_each_author_serialized_once(self):
+        """Test that repeated authors reuse one representation."""
+        queryset = Post.objects.select_related('author', 'author__profile').order_by('id')
+        data = PostListSerializer(queryset, many=True, context={'request': self.request}).data
+        self.assertIs(data[0]['author'], data[2]['author'])
+        self.assertEqual(data[3]['author']['username'], 'user2')
+        self.assertEqual(metrics.get_counter('serializers.identity_map.miss'), 2)
+        self.assertEqual(metrics.get_counter('serializers.identity_map.hit'), 2)
+        self.assertEqual(metrics.snapshot()['hit_ratios']['serializers.identity_map'], 0.5)
+
+    def test_comment_authors_share_map(self):
+        """Test that comment threads dedup their authors too."""
+        post = Post.objects.first()
+        for i in range(4):
+            Comment.objects.create(post=post, author=self.other, content=f'Comment {i}')
+        response = APIClient().get(f'/api/v1/posts/{post.id}/comments/')
+        self.assertEqual(len(response.json()['results']), 4)
+        self.assertEqual(metrics.get_counter('serializers.identity_map.miss'), 1)
+        self.assertEqual(metrics.get_counter('serializers.identity_map.hit'), 3)
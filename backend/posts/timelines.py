@@ -0,0 +1,106 @@
+"""
+Fan-out-on-write home timelines.
+When a post is created its id is copied into the timeline of every user
+in its audience, so reading a timeline never touches the full posts table.
+"""
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, F, Max, OuterRef, Window
+from django.db.models.functions import RowNumber
+from .models import Comment, TimelineEntry
+
+# Entries kept per user; older rows are trimmed away
+TIMELINE_MAX_ENTRIES = 800
+
+# Only readers who commented on the author's posts this recently, and at
+# most this many of them (most recent first), receive a new post
+TIMELINE_AUDIENCE_WINDOW = timedelta(days=90)
+TIMELINE_AUDIENCE_LIMIT = 1000
+
+# Trimming is amortized: each fan-out only checks the audience members
+# whose id falls in the post id's slice (1 in TIMELINE_TRIM_EVERY), so a
+# timeline is checked about every TIMELINE_TRIM_EVERY posts it receives
+# and can run that far past the cap in between
+TIMELINE_TRIM_EVERY = 20
+
+
+def get_timeline_audience(post):
+    """
+    Return the ids of users whose timeline should receive a post.
+    
+    There is no follow graph yet, so the audience is the author plus the
+    readers who commented on the author's posts within
+    TIMELINE_AUDIENCE_WINDOW before this post, capped at
+    TIMELINE_AUDIENCE_LIMIT so a popular author's fan-out stays bounded.
+    """
+    commenters = (
+        Comment.objects.filter(
+            post__author_id=post.author_id,
+            created_at__gte=post.created_at - TIMELINE_AUDIENCE_WINDOW,
+        )
+        .exclude(author_id=post.author_id)
+        .values('author_id')
+        .annotate(last_commented=Max('created_at'))
+        .order_by('-last_commented')
+        .values_list('author_id', flat=True)[:TIMELINE_AUDIENCE_LIMIT]
+    )
+    audience = set(commenters)
+    audience.add(post.author_id)
+    return audience
+
+
+def fan_out_post(post, audience=None):
+    """
+    Insert a post into the timelines of its audience.
+    
+    Args:
+        post: Newly created Post
+        audience: Optional iterable of user ids (defaults to get_timeline_audience)
+    
+    Returns:
+        Number of timelines written to
+    """
+    if audience is None:
+        audience = get_timeline_audience(post)
+    entries = [
+        TimelineEntry(user_id=user_id, post_id=post.id, created_at=post.created_at)
+        for user_id in audience
+    ]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    
+    trim_slice = post.id % TIMELINE_TRIM_EVERY
+    due = [user_id for user_id in audience if user_id % TIMELINE_TRIM_EVERY == trim_slice]
+    if due:
+        trim_timelines(due, TIMELINE_MAX_ENTRIES)
+    return len(entries)
+
+
+def trim_timelines(user_ids, max_entries=TIMELINE_MAX_ENTRIES):
+    """
+    Delete timeline entries beyond the newest `max_entries` per user.
+    
+    Each timeline is first probed for an entry past the cap, so only the
+    ones actually over it are ranked and trimmed.
+    
+    Returns:
+        Number of entries deleted
+    """
+    beyond_cap = TimelineEntry.objects.filter(user_id=OuterRef('pk'))[max_entries:max_entries + 1]
+    full = list(
+        get_user_model().objects.filter(pk__in=list(user_ids))
+        .filter(Exists(beyond_cap))
+        .values_list('pk', flat=True)
+    )
+    if not full:
+        return 0
+    
+    overflow = TimelineEntry.objects.filter(user_id__in=full).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=F('user_id'),
+            order_by=[F('created_at').desc(), F('post_id').desc()],
+        )
+    ).filter(position__gt=max_entries).values_list('pk', flat=True)
+    
+    deleted, _ = TimelineEntry.objects.filter(pk__in=list(overflow)).delete()
+    return deleted
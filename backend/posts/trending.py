@@ -0,0 +1,121 @@
+"""
+Trending ("hot") post ranking.
+
+Scores combine comment velocity with recency in the style of the classic
+"hot" formula: log10 of the comments received inside TRENDING_WINDOW plus
+the post's age expressed in RECENCY_SCALE units. Because the recency term
+grows with creation time instead of decaying with wall-clock time, scores
+only need recomputing when a post's window contents change, which keeps
+refreshes incremental.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import Comment, Post, TrendingScore
+
+# Comments newer than this count towards a post's velocity
+TRENDING_WINDOW = timedelta(hours=48)
+
+# Posts older than this drop out of the trending table
+TRENDING_MAX_AGE = timedelta(days=7)
+
+# Seconds of recency worth a tenfold increase in comment velocity
+RECENCY_SCALE = 45000
+
+# Re-read this much history before the watermark to catch late commits
+WATERMARK_OVERLAP = timedelta(minutes=1)
+
+SCORE_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def hot_score(created_at, recent_comments):
+    """Return the ranking score for a post."""
+    velocity = math.log10(max(recent_comments, 1))
+    recency = (created_at - SCORE_EPOCH).total_seconds() / RECENCY_SCALE
+    return round(velocity + recency, 7)
+
+
+def get_refresh_watermark():
+    """Return the time of the last refresh, or None if the table is empty."""
+    return TrendingScore.objects.aggregate(last=Max('refreshed_at'))['last']
+
+
+def find_stale_posts(since, now):
+    """
+    Return ids of recent posts whose score may have changed since `since`:
+    new posts, posts with new comments, and posts whose older comments slid
+    out of the velocity window.
+    """
+    since = since - WATERMARK_OVERLAP
+    window_start = now - TRENDING_WINDOW
+    
+    # Read from posts, not post_created activities: those are buffered and
+    # can be written well after the watermark has moved past them
+    stale = set(
+        Post.objects.filter(created_at__gte=since).values_list('id', flat=True)
+    )
+    stale.update(
+        Comment.objects.filter(created_at__gte=since)
+        .values_list('post_id', flat=True)
+    )
+    stale.update(
+        Comment.objects.filter(
+            created_at__gte=since - TRENDING_WINDOW,
+            created_at__lt=window_start
+        ).values_list('post_id', flat=True)
+    )
+    return stale
+
+
+def refresh_trending_scores(full=False, batch_size=500, now=None):
+    """
+    Recompute trending scores.
+    
+    Args:
+        full: Rescore every recent post instead of only stale ones
+        batch_size: Number of posts rescored per query batch
+        now: Reference time (defaults to timezone.now())
+    
+    Returns:
+        Tuple of (posts rescored, rows pruned)
+    """
+    now = now or timezone.now()
+    oldest = now - TRENDING_MAX_AGE
+    recent_posts = Post.objects.filter(created_at__gte=oldest)
+    
+    since = None if full else get_refresh_watermark()
+    if since is None:
+        post_ids = list(recent_posts.values_list('id', flat=True))
+    else:
+        stale = find_stale_posts(since, now)
+        post_ids = list(recent_posts.filter(id__in=stale).values_list('id', flat=True))
+    
+    window_start = now - TRENDING_WINDOW
+    for start in range(0, len(post_ids), batch_size):
+        batch = post_ids[start:start + batch_size]
+        created = dict(Post.objects.filter(id__in=batch).values_list('id', 'created_at'))
+        velocity = dict(
+            Comment.objects.filter(post_id__in=batch, created_at__gte=window_start)
+            .order_by()
+            .values_list('post_id')
+            .annotate(total=Count('id'))
+        )
+        scores = [
+            TrendingScore(
+                post_id=post_id,
+                score=hot_score(created_at, velocity.get(post_id, 0)),
+                recent_comments=velocity.get(post_id, 0),
+                refreshed_at=now,
+            )
+            for post_id, created_at in created.items()
+        ]
+        TrendingScore.objects.bulk_create(
+            scores,
+            update_conflicts=True,
+            unique_fields=['post'],
+            update_fields=['score', 'recent_comments', 'refreshed_at'],
+        )
+    
+    pruned, _ = TrendingScore.objects.filter(post__created_at__lt=oldest).delete()
+    return len(post_ids), pruned
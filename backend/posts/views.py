@@ -1,10 +1,34 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, mixins, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Count
-from .models import Post, Comment
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db.models import Count, F, FloatField, Max, Prefetch, Q
+from django.db.models.functions import Cast
+from config import metrics
+from config.conditional import make_etag, not_modified_response, set_validators
+from config.fastpath import FastListMixin
+from config.pagination import HybridPagination
+from config.sparse_fields import SparseFieldsetViewMixin
+from .cache import (
+    feed_cache_key,
+    feed_request_digest,
+    get_author_versions,
+    get_facets_generation,
+    get_feed_generation,
+)
+from .models import Post, Comment, TimelineEntry, TrendingScore, SEARCH_CONFIG
+from .pagination import (
+    CommentPagination,
+    SearchPagination,
+    TimelinePagination,
+    TrendingPagination,
+)
 from .serializers import (
     PostListSerializer,
+    PostListValuesSerializer,
     PostDetailSerializer,
     PostCreateSerializer,
     CommentSerializer,
@@ -12,28 +36,45 @@ from .serializers import (
 )
 from .permissions import IsAuthorOrReadOnly
 
+# Number of comments embedded in post detail; the rest are paged via
+# /posts/{id}/comments/?cursor=
+COMMENT_PREVIEW_SIZE = 10
 
-class PostViewSet(viewsets.ModelViewSet):
+
+class PostViewSet(SparseFieldsetViewMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for Post model.
     
-    list: Get paginated feed of posts
+    list: Get paginated feed of posts (?page=N, or keyset mode with ?cursor=)
     create: Create a new post (authenticated users only)
-    retrieve: Get single post with all comments
+    retrieve: Get single post with its first comments and a cursor for the rest
     destroy: Delete own post (author only)
+    timeline: Get the current user's precomputed home timeline
+    search: Full-text search over posts and their comments
+    trending: Recent posts ranked by comment velocity and recency
+    facets: Post counts per post_type and related_skill
     """
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
+    pagination_class = HybridPagination
+    fast_serializer_class = PostListValuesSerializer
+    # Keyset pagination and fragment cache keys read these from every row
+    sparse_required_fields = ('created_at', 'updated_at', 'comment_count', 'author')
     
     def get_queryset(self):
         """
-        Return posts with author profile info and comment count.
-        Supports filtering by author username and post_type.
+        Return posts with author profile info.
+        Supports filtering by author username, post_type and related_skill.
         """
-        queryset = Post.objects.select_related(
-            'author', 'author__profile'
-        ).annotate(
-            comment_count=Count('comments')
-        )
+        queryset = Post.objects.select_related('author', 'author__profile')
+        
+        if self.action == 'retrieve':
+            # Embed only the first page of comments, authors loaded in one query
+            preview = Comment.objects.select_related(
+                'author', 'author__profile'
+            ).order_by(*CommentPagination.ordering)[:COMMENT_PREVIEW_SIZE]
+            queryset = queryset.prefetch_related(
+                Prefetch('comments', queryset=preview, to_attr='preview_comments')
+            )
         
         # Filter by author username
         author_username = self.request.query_params.get('author', None)
@@ -45,8 +86,88 @@ class PostViewSet(viewsets.ModelViewSet):
         if post_type:
             queryset = queryset.filter(post_type=post_type)
         
+        # Filter by related skill
+        related_skill = self.request.query_params.get('related_skill', None)
+        if related_skill:
+            queryset = queryset.filter(related_skill=related_skill)
+        
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        """
+        Get a feed page.
+        Answers 304 when the client's ETag matches the current feed
+        generation; anonymous responses are served from the feed cache.
+        """
+        generation = get_feed_generation()
+        etag = make_etag(generation, feed_request_digest(request), request.accepted_media_type)
+        not_modified = not_modified_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        
+        if request.user.is_authenticated:
+            response = super().list(request, *args, **kwargs)
+            return set_validators(response, etag=etag)
+        
+        key = feed_cache_key(request, generation)
+        data = cache.get(key)
+        if data is not None:
+            metrics.increment('posts.feed_cache.hit')
+            return set_validators(Response(data), etag=etag)
+        
+        metrics.increment('posts.feed_cache.miss')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.FEED_CACHE_TIMEOUT)
+            set_validators(response, etag=etag)
+        return response
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get single post with a preview of its comment thread.
+        Validators come from two small queries (the post, its author's
+        profile and newest comment; the preview's commenters) and the
+        version counters of every embedded author, so an unchanged post
+        costs no serialization.
+        """
+        if not str(kwargs.get('pk')).isdigit():
+            # Let get_object() answer 404 for malformed ids
+            return super().retrieve(request, *args, **kwargs)
+        
+        stamp = Post.objects.filter(pk=kwargs.get('pk')).annotate(
+            last_comment_at=Max('comments__created_at')
+        ).values(
+            'author_id', 'updated_at', 'comment_count', 'last_comment_at',
+            'author__profile__updated_at'
+        ).first()
+        if stamp is None:
+            return super().retrieve(request, *args, **kwargs)
+        
+        # Usernames and profiles of everyone shown are versioned per author
+        preview_authors = Comment.objects.filter(post_id=kwargs.get('pk')).order_by(
+            *CommentPagination.ordering
+        ).values_list('author_id', flat=True)[:COMMENT_PREVIEW_SIZE]
+        author_ids = sorted({stamp['author_id'], *preview_authors})
+        versions = get_author_versions(author_ids)
+        
+        changes = (
+            stamp['updated_at'], stamp['last_comment_at'], stamp['author__profile__updated_at']
+        )
+        last_modified = max(value for value in changes if value is not None)
+        etag = make_etag(
+            kwargs.get('pk'),
+            stamp['comment_count'],
+            *(value.timestamp() if value else 0 for value in changes),
+            *(versions[author_id] for author_id in author_ids),
+            request.accepted_media_type
+        )
+        not_modified = not_modified_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        
+        response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag=etag, last_modified=last_modified)
+    
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
         if self.action == 'list':
@@ -61,32 +182,158 @@ class PostViewSet(viewsets.ModelViewSet):
         """Set the author to the current user."""
         serializer.save(author=self.request.user)
     
-    def retrieve(self, request, *args, **kwargs):
-        """Get single post with all comments."""
-        instance = self.get_object()
-        # Prefetch comments with author profile info
-        comments = instance.comments.select_related('author', 'author__profile').all()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated],
+        pagination_class=TimelinePagination,
+    )
+    def timeline(self, request):
+        """
+        Get the current user's home timeline, newest first.
+        GET /api/v1/posts/timeline/?cursor=
+        """
+        entries = TimelineEntry.objects.filter(user=request.user).select_related(
+            'post__author', 'post__author__profile'
+        ).defer('post__search_vector')
+        page = self.paginate_queryset(entries)
+        serializer = PostListSerializer(
+            [entry.post for entry in page],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'], pagination_class=TrendingPagination)
+    def trending(self, request):
+        """
+        Get the hot feed from precomputed scores (see refresh_trending).
+        GET /api/v1/posts/trending/?cursor=
+        """
+        scores = TrendingScore.objects.select_related(
+            'post__author', 'post__author__profile'
+        ).defer('post__search_vector')
+        page = self.paginate_queryset(scores)
+        serializer = PostListSerializer(
+            [score.post for score in page],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Get post counts per post_type and per related_skill.
+        GET /api/v1/posts/facets/?author=
+        Every count comes from one grouped query, cached until the next
+        post write.
+        """
+        key = feed_cache_key(request, get_facets_generation(), namespace='facets')
+        data = cache.get(key)
+        if data is not None:
+            metrics.increment('posts.facets_cache.hit')
+            return Response(data)
+        
+        metrics.increment('posts.facets_cache.miss')
+        queryset = Post.objects.order_by()
+        author_username = request.query_params.get('author', None)
+        if author_username:
+            queryset = queryset.filter(author__username=author_username)
+        
+        post_types = dict.fromkeys((choice[0] for choice in Post.POST_TYPE_CHOICES), 0)
+        skills = dict.fromkeys((choice[0] for choice in Post.SKILL_CHOICES), 0)
+        total = 0
+        groups = queryset.values_list('post_type', 'related_skill').annotate(total=Count('id'))
+        for post_type, related_skill, count in groups:
+            total += count
+            post_types[post_type] = post_types.get(post_type, 0) + count
+            if related_skill:
+                skills[related_skill] = skills.get(related_skill, 0) + count
+        
+        data = {'total': total, 'post_type': post_types, 'related_skill': skills}
+        cache.set(key, data, settings.FEED_CACHE_TIMEOUT)
+        return Response(data)
+    
+    @action(detail=False, methods=['get'], pagination_class=SearchPagination)
+    def search(self, request):
+        """
+        Search post and comment content, ranked by relevance.
+        GET /api/v1/posts/search/?q=&post_type=&related_skill=&cursor=
+        Posts that only match through a comment rank below direct matches.
+        """
+        terms = request.query_params.get('q', '').strip()
+        if not terms:
+            return Response(
+                {'error': 'Search query is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        query = SearchQuery(terms, search_type='websearch', config=SEARCH_CONFIG)
+        commented_posts = Comment.objects.filter(search_vector=query).values('post_id')
+        queryset = self.get_queryset().filter(
+            Q(search_vector=query) | Q(id__in=commented_posts)
+        ).annotate(
+            # ts_rank returns real; as float8 the cursor value round-trips
+            # exactly, so ties on rank still compare equal on the next page
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = PostListSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(mixins.ListModelMixin,
+                     mixins.CreateModelMixin,
+                     viewsets.GenericViewSet):
     """
     ViewSet for Comment model.
     
     Nested under posts: /posts/{post_id}/comments/
-    Only supports creating comments.
+    list: Page through a post's comments, oldest first (?cursor=, ?thread=)
+    create: Add a comment to a post (authenticated users only)
     """
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     serializer_class = CommentCreateSerializer
-    http_method_names = ['post']  # Only allow POST
+    pagination_class = CommentPagination
     
     def get_queryset(self):
-        """Return comments for a specific post."""
+        """
+        Return comments for a specific post.
+        ?thread=<comment_id> narrows to the replies below that comment.
+        """
         post_id = self.kwargs.get('post_pk')
-        return Comment.objects.filter(post_id=post_id).select_related(
+        queryset = Comment.objects.filter(post_id=post_id).select_related(
             'author', 'author__profile'
         )
+        
+        thread_id = self.request.query_params.get('thread', None)
+        if thread_id:
+            if not thread_id.isdigit():
+                raise ValidationError({'thread': 'Must be a comment id.'})
+            root = Comment.objects.filter(post_id=post_id, pk=thread_id).values('path').first()
+            if root is None:
+                return queryset.none()
+            queryset = queryset.filter(path__startswith=f"{root['path']}/")
+        
+        return queryset
+    
+    def get_serializer_class(self):
+        """Return appropriate serializer based on action."""
+        if self.action == 'list':
+            return CommentSerializer
+        return CommentCreateSerializer
+    
+    def list(self, request, *args, **kwargs):
+        """Get a page of comments on a post."""
+        post_id = self.kwargs.get('post_pk')
+        # Malformed ids are answered like missing posts
+        if not str(post_id).isdigit() or not Post.objects.filter(pk=post_id).exists():
+            return Response(
+                {'error': 'Post not found.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return super().list(request, *args, **kwargs)
     
     def create(self, request, *args, **kwargs):
         """Create a new comment on a post."""
@@ -1,7 +1,7 @@
 import { useState, useEffect, useRef } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import NotificationList from './notifications/NotificationList'
-import { getUnreadCount } from '@/services/notificationService'
+import { getUnreadCount, openNotificationStream } from '@/services/notificationService'
 import { fast } from '@/motion/transitions'
 
 function NotificationBell() {
@@ -13,12 +13,32 @@ function NotificationBell() {
   useEffect(() => {
     fetchUnreadCount()
 
-    // Auto-refresh unread count every 30 seconds
-    const interval = setInterval(() => {
-      fetchUnreadCount()
-    }, 30000)
+    let interval = null
+    const startPolling = () => {
+      // Fallback: refresh unread count every 30 seconds
+      if (!interval) {
+        interval = setInterval(() => {
+          fetchUnreadCount()
+        }, 30000)
+      }
+    }
+
+    // Push updates over Server-Sent Events; poll if the stream is unavailable
+    // (the stream refreshes an expired token and reconnects by itself)
+    const stream = openNotificationStream({
+      onUnreadCount: setUnreadCount,
+      onError: startPolling,
+    })
+    if (!stream) {
+      startPolling()
+    }
 
-    return () => clearInterval(interval)
+    return () => {
+      stream?.close()
+      if (interval) {
+        clearInterval(interval)
+      }
+    }
   }, [])
 
   // Close dropdown when clicking outside
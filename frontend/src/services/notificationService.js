@@ -1,6 +1,6 @@
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api/v1';
 
-import { getAuthHeader } from './authService';
+import { getAccessToken, getAuthHeader, refreshToken } from './authService';
 
 /**
  * Get paginated list of notifications
@@ -85,3 +85,83 @@ export const markAllAsRead = async () => {
 
   return data;
 };
+
+/**
+ * Open the Server-Sent Events stream of notification updates.
+ * Calls onUnreadCount(count) and onNotification(notification) as events
+ * arrive. Returns a handle (call .close() to stop), or null when streaming
+ * is unavailable. EventSource reconnects on its own and resumes from the
+ * last notification id it saw. The server ends the stream when the access
+ * token expires; the token is then refreshed and the stream reopened from
+ * the same id. onError(event) is only called once the stream cannot be
+ * (re)opened, e.g. the refresh failed or the server does not stream.
+ */
+export const openNotificationStream = ({ onUnreadCount, onNotification, onError } = {}) => {
+  if (!getAccessToken() || typeof EventSource === 'undefined') {
+    return null;
+  }
+
+  let source = null;
+  let lastEventId = null;
+  let closed = false;
+
+  const reopen = async (event) => {
+    const refreshed = await refreshToken();
+    if (closed) {
+      return;
+    }
+    if (refreshed) {
+      connect();
+    } else {
+      onError?.(event);
+    }
+  };
+
+  const connect = () => {
+    const params = new URLSearchParams({ token: getAccessToken() });
+    if (lastEventId) {
+      params.set('last_event_id', lastEventId);
+    }
+    const current = new EventSource(`${API_BASE_URL}/notifications/stream/?${params}`);
+    let opened = false;
+    source = current;
+
+    current.onopen = () => {
+      opened = true;
+    };
+    current.addEventListener('unread_count', (event) => {
+      onUnreadCount?.(JSON.parse(event.data).count);
+    });
+    current.addEventListener('notification', (event) => {
+      if (event.lastEventId) {
+        lastEventId = event.lastEventId;
+      }
+      onNotification?.(JSON.parse(event.data));
+    });
+    current.addEventListener('token_expired', (event) => {
+      current.close();
+      reopen(event);
+    });
+    current.onerror = (event) => {
+      // CLOSED means the browser gave up reconnecting (e.g. 401)
+      if (current.readyState !== EventSource.CLOSED) {
+        return;
+      }
+      if (opened) {
+        // It worked before, so the token most likely expired meanwhile
+        reopen(event);
+      } else {
+        onError?.(event);
+      }
+    };
+  };
+
+  connect();
+
+  return {
+    close() {
+      closed = true;
+      source?.close();
+    },
+  };
+};